@@ -0,0 +1,42 @@
+"""
+Configuración de pytest para las pruebas de outlook.
+
+Permite ejecutar test_mail_filtering.py con pytest, también en paralelo:
+    pytest -n auto --dist loadgroup outlook/test_mail_filtering.py
+"""
+import os
+import sys
+
+import pytest
+
+OUTLOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(OUTLOOK_DIR)
+
+# Clases de prueba que parchean módulos compartidos y deben ejecutarse en un solo worker
+SERIAL_TEST_CLASSES = {"TestIntegration"}
+
+
+def pytest_configure(config):
+    """Configuración que se ejecuta antes de importar los módulos de prueba"""
+    # Los módulos de outlook se importan por nombre (mail_reader, utils.*)
+    for path in (PROJECT_DIR, OUTLOOK_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    # config.py valida las credenciales al importarse; las pruebas usan mocks
+    os.environ.setdefault('TENANT_ID', '00000000-0000-0000-0000-000000000000')
+    os.environ.setdefault('CLIENT_ID', '00000000-0000-0000-0000-000000000000')
+    os.environ.setdefault('CLIENT_SECRET', 'test-client-secret')
+    os.environ.setdefault('MAIL_USER', 'test@empresa.com')
+
+    config.addinivalue_line("markers", "serial: ejecutar en un único worker de pytest-xdist")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Agrupa las pruebas serializadas para que xdist (--dist loadgroup) las asigne a un worker"""
+    xdist_activo = config.pluginmanager.hasplugin("xdist")
+    for item in items:
+        if item.cls is not None and item.cls.__name__ in SERIAL_TEST_CLASSES:
+            item.add_marker(pytest.mark.serial)
+        if xdist_activo and item.get_closest_marker("serial"):
+            item.add_marker(pytest.mark.xdist_group("serial"))
@@ -3,24 +3,59 @@ Módulo para leer correos de carpetas específicas de Outlook
 Especialmente diseñado para la carpeta Iniciativa4
 """
 
-from outlook.graph_client import get_authenticated_session
-from config import GRAPH_API_ENDPOINT, MAIL_USER
+from outlook.graph_client import get_authenticated_session, response_json, GRAPH_POOL_MAXSIZE
+from config import GRAPH_API_ENDPOINT, MAIL_USER, BASE_DIR
 from utils.logger_config import setup_logger
-from typing import List, Dict, Optional
+from utils.helpers import compilar_palabras_clave
+from typing import List, Dict, Optional, Pattern
+from concurrent.futures import ThreadPoolExecutor
 import json
+import os
 
 logger = setup_logger("folder_reader")
 
+# Peticiones simultáneas a Graph al recorrer subcarpetas. Nunca más que las
+# conexiones que conserva el pool de la sesión compartida (GRAPH_POOL_MAXSIZE),
+# para que cada hilo reutilice una conexión abierta en lugar de abrir otra
+MAX_CONCURRENT_REQUESTS = min(8, GRAPH_POOL_MAXSIZE)
+
+# Archivo donde se guarda el @odata.deltaLink de cada carpeta entre ejecuciones
+DELTA_LINK_CACHE_PATH = os.path.join(BASE_DIR, "logs", "delta_links.json")
+
+# Valor por defecto compartido para campos anidados ausentes (no se modifica)
+_EMPTY_DICT = {}
+
+# IDs de carpeta ya resueltos, por nombre en minúsculas. Solo se guardan las
+# búsquedas con éxito, para que un fallo puntual no quede memorizado.
+_folder_ids: Dict[str, str] = {}
+
 def get_folder_id(folder_name: str) -> Optional[str]:
     """
     Obtiene el ID de una carpeta específica por nombre
     
+    El resultado se memoriza por proceso; clear_folder_id_cache() lo descarta
+    (por ejemplo, si la carpeta se renombra o se recrea).
+    
     Args:
         folder_name: Nombre de la carpeta (ej: "Iniciativa4")
         
     Returns:
         str: ID de la carpeta o None si no se encuentra
     """
+    key = folder_name.lower()
+    folder_id = _folder_ids.get(key)
+    if folder_id is None:
+        folder_id = _find_folder_id(folder_name)
+        if folder_id:
+            _folder_ids[key] = folder_id
+    return folder_id
+
+def clear_folder_id_cache() -> None:
+    """Olvida los IDs de carpeta memorizados por get_folder_id"""
+    _folder_ids.clear()
+
+def _find_folder_id(folder_name: str) -> Optional[str]:
+    """Busca en Graph el ID de una carpeta por nombre (sin caché)"""
     logger.info(f"Buscando carpeta: {folder_name}")
     session = get_authenticated_session()
     
@@ -30,7 +65,7 @@ def get_folder_id(folder_name: str) -> Optional[str]:
     try:
         response = session.get(url)
         if response.ok:
-            folders = response.json().get("value", [])
+            folders = response_json(response).get("value", [])
             
             # Buscar la carpeta por nombre
             for folder in folders:
@@ -42,10 +77,9 @@ def get_folder_id(folder_name: str) -> Optional[str]:
             # Si no se encuentra en carpetas principales, buscar en subcarpetas
             logger.info(f"Carpeta '{folder_name}' no encontrada en carpetas principales, buscando en subcarpetas...")
             
-            for folder in folders:
-                subfolder_id = _search_in_subfolders(session, folder.get("id"), folder_name)
-                if subfolder_id:
-                    return subfolder_id
+            subfolder_id = _search_in_subfolders(session, folders, folder_name)
+            if subfolder_id:
+                return subfolder_id
             
             logger.warning(f"❌ Carpeta '{folder_name}' no encontrada")
             return None
@@ -57,47 +91,70 @@ def get_folder_id(folder_name: str) -> Optional[str]:
         logger.exception(f"Error buscando carpeta '{folder_name}': {e}")
         return None
 
-def _search_in_subfolders(session, parent_folder_id: str, folder_name: str) -> Optional[str]:
+def _has_children(folder: Dict) -> bool:
+    """Indica si vale la pena pedir las subcarpetas (childFolderCount puede no venir)"""
+    return folder.get("childFolderCount", 1) > 0
+
+def _get_child_folders(session, parent_folder_id: str) -> List[Dict]:
     """
-    Busca una carpeta en las subcarpetas de una carpeta padre
+    Obtiene las subcarpetas directas de una carpeta
     
     Args:
         session: Sesión autenticada
         parent_folder_id: ID de la carpeta padre
-        folder_name: Nombre de la carpeta a buscar
         
     Returns:
-        str: ID de la carpeta o None si no se encuentra
+        List[Dict]: Subcarpetas (vacía si hay error)
     """
     url = f"{GRAPH_API_ENDPOINT}/users/{MAIL_USER}/mailFolders/{parent_folder_id}/childFolders"
     
     try:
         response = session.get(url)
         if response.ok:
-            subfolders = response.json().get("value", [])
-            
-            for subfolder in subfolders:
-                if subfolder.get("displayName", "").lower() == folder_name.lower():
-                    subfolder_id = subfolder.get("id")
-                    logger.info(f"✅ Carpeta '{folder_name}' encontrada en subcarpetas con ID: {subfolder_id}")
-                    return subfolder_id
-                
-                # Buscar recursivamente en subcarpetas anidadas
-                nested_id = _search_in_subfolders(session, subfolder.get("id"), folder_name)
-                if nested_id:
-                    return nested_id
-            
-            return None
-        else:
-            logger.error(f"Error HTTP al obtener subcarpetas: {response.status_code} - {response.text}")
-            return None
-            
+            return response_json(response).get("value", [])
+        logger.error(f"Error HTTP al obtener subcarpetas: {response.status_code} - {response.text}")
     except Exception as e:
         logger.exception(f"Error buscando en subcarpetas: {e}")
-        return None
+    return []
+
+def _search_in_subfolders(session, parent_folders: List[Dict], folder_name: str) -> Optional[str]:
+    """
+    Busca una carpeta en las subcarpetas de las carpetas dadas, nivel a nivel
+    
+    Las subcarpetas de todas las carpetas de un mismo nivel se piden en
+    paralelo (hasta MAX_CONCURRENT_REQUESTS a la vez), así que el tiempo
+    depende de la profundidad del árbol y no del número de carpetas.
+    
+    Args:
+        session: Sesión autenticada
+        parent_folders: Carpetas cuyo árbol se recorre
+        folder_name: Nombre de la carpeta a buscar
+        
+    Returns:
+        str: ID de la carpeta o None si no se encuentra
+    """
+    target = folder_name.lower()
+    level = [folder.get("id") for folder in parent_folders if _has_children(folder)]
+    
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        while level:
+            next_level = []
+            for subfolders in executor.map(lambda folder_id: _get_child_folders(session, folder_id), level):
+                for subfolder in subfolders:
+                    if subfolder.get("displayName", "").lower() == target:
+                        subfolder_id = subfolder.get("id")
+                        logger.info(f"✅ Carpeta '{folder_name}' encontrada en subcarpetas con ID: {subfolder_id}")
+                        return subfolder_id
+                    if _has_children(subfolder):
+                        next_level.append(subfolder.get("id"))
+            level = next_level
+    
+    return None
 
 def get_messages_from_folder(folder_name: str, top: int = 50, 
-                           order_by: str = "receivedDateTime desc") -> List[Dict]:
+                           order_by: str = "receivedDateTime desc",
+                           search: Optional[str] = None,
+                           select: Optional[List[str]] = None) -> List[Dict]:
     """
     Obtiene mensajes de una carpeta específica
     
@@ -105,6 +162,9 @@ def get_messages_from_folder(folder_name: str, top: int = 50,
         folder_name: Nombre de la carpeta (ej: "Iniciativa4")
         top: Número máximo de mensajes a obtener
         order_by: Criterio de ordenamiento
+        search: Consulta KQL para $search (Graph no admite $orderby junto con
+            $search, así que en ese caso se ordena por fecha de recepción aquí)
+        select: Campos a devolver ($select); None devuelve el recurso completo
         
     Returns:
         List[Dict]: Lista de mensajes de la carpeta
@@ -119,12 +179,24 @@ def get_messages_from_folder(folder_name: str, top: int = 50,
     
     # Obtener mensajes de la carpeta
     session = get_authenticated_session()
-    url = f"{GRAPH_API_ENDPOINT}/users/{MAIL_USER}/mailFolders/{folder_id}/messages?$top={top}&$orderby={order_by}"
+    url = f"{GRAPH_API_ENDPOINT}/users/{MAIL_USER}/mailFolders/{folder_id}/messages"
+    params = {"$top": top}
+    if select:
+        # Con $search el orden se aplica aquí y necesita la fecha de recepción
+        if search and "receivedDateTime" not in select:
+            select = [*select, "receivedDateTime"]
+        params["$select"] = ",".join(select)
+    if search:
+        params["$search"] = f'"{search}"'
+    else:
+        params["$orderby"] = order_by
     
     try:
-        response = session.get(url)
+        response = session.get(url, params=params)
         if response.ok:
-            messages = response.json().get("value", [])
+            messages = response_json(response).get("value", [])
+            if search:
+                messages.sort(key=lambda m: m.get("receivedDateTime", ""), reverse=True)
             logger.info(f"✅ {len(messages)} mensajes obtenidos de la carpeta '{folder_name}'")
             return messages
         else:
@@ -140,10 +212,19 @@ def get_messages_from_folder_with_filter(folder_name: str,
                                         blocked_senders: Optional[List[str]] = None,
                                         subject_keywords: Optional[List[str]] = None,
                                         subject_exclude_keywords: Optional[List[str]] = None,
-                                        top: int = 50) -> List[Dict]:
+                                        top: int = 50,
+                                        server_side: bool = False,
+                                        select: Optional[List[str]] = None) -> List[Dict]:
     """
     Obtiene mensajes de una carpeta específica con filtros
     
+    Los filtros locales se aplican siempre y comparan por subcadena. Con
+    server_side, además, los remitentes permitidos y las palabras clave se
+    envían antes a Graph como $search para descargar menos mensajes; como KQL
+    solo encuentra palabras completas o prefijos, ese prefiltro puede
+    descartar mensajes que los filtros locales aceptarían (p. ej. una palabra
+    clave en medio de otra palabra), por eso es opcional.
+    
     Args:
         folder_name: Nombre de la carpeta
         allowed_senders: Lista de remitentes permitidos
@@ -151,89 +232,126 @@ def get_messages_from_folder_with_filter(folder_name: str,
         subject_keywords: Palabras clave que deben estar en el subject
         subject_exclude_keywords: Palabras clave que NO deben estar en el subject
         top: Número máximo de mensajes a obtener
+        server_side: Prefiltrar en Graph con $search (KQL busca palabras y
+            prefijos, no subcadenas arbitrarias). False por defecto
+        select: Campos a devolver ($select); subject y from se añaden siempre
+            porque los usan los filtros
         
     Returns:
         List[Dict]: Lista de mensajes filtrados de la carpeta
     """
     logger.info(f"Obteniendo mensajes filtrados de la carpeta '{folder_name}'")
     
-    # Obtener todos los mensajes de la carpeta
-    messages = get_messages_from_folder(folder_name, top=top)
+    search = build_search_query(allowed_senders, subject_keywords) if server_side else None
+    if select:
+        select = list(dict.fromkeys([*select, "subject", "from"]))
+    messages = get_messages_from_folder(folder_name, top=top, search=search, select=select)
     
     if not messages:
         return []
     
-    # Aplicar filtros
-    filtered_messages = []
-    
-    for message in messages:
-        if _apply_filters(message, allowed_senders, blocked_senders, subject_keywords, subject_exclude_keywords):
-            filtered_messages.append(message)
+    filtered_messages = filter_folder_messages(messages, allowed_senders, blocked_senders,
+                                               subject_keywords, subject_exclude_keywords)
     
     logger.info(f"✅ {len(filtered_messages)} mensajes aprobados por filtros de {len(messages)} totales en '{folder_name}'")
     return filtered_messages
 
+def _kql_term(value: str) -> str:
+    """Escapa un término para KQL dentro del $search entre comillas"""
+    value = value.replace('\\', '').replace('"', '')
+    return f'\\"{value}\\"' if ' ' in value else value
+
+def build_search_query(allowed_senders: Optional[List[str]] = None,
+                       subject_keywords: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Construye la consulta KQL de $search para los filtros positivos
+    
+    Los remitentes se buscan sin los '@' de los extremos ("@empresa.com" ->
+    from:empresa.com) y se combinan con AND con las palabras del subject.
+    
+    Returns:
+        str: Consulta KQL, o None si no hay filtros que enviar a Graph
+    """
+    clauses = []
+    
+    senders = [sender.strip('@') for sender in allowed_senders or [] if sender.strip('@')]
+    if senders:
+        clauses.append("(" + " OR ".join(f"from:{_kql_term(sender)}" for sender in senders) + ")")
+    
+    keywords = [keyword for keyword in subject_keywords or [] if keyword.strip()]
+    if keywords:
+        clauses.append("(" + " OR ".join(f"subject:{_kql_term(keyword)}" for keyword in keywords) + ")")
+    
+    return " AND ".join(clauses) or None
+
+def filter_folder_messages(messages: List[Dict],
+                           allowed_senders: Optional[List[str]] = None,
+                           blocked_senders: Optional[List[str]] = None,
+                           subject_keywords: Optional[List[str]] = None,
+                           subject_exclude_keywords: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Aplica los filtros de remitente y subject a mensajes ya descargados
+    
+    Cada lista de filtros se compila una sola vez en una alternancia literal,
+    así cada mensaje se evalúa con una búsqueda por filtro en lugar de un
+    recorrido por palabra clave.
+    
+    Returns:
+        List[Dict]: Mensajes que pasan todos los filtros, en el orden original
+    """
+    allowed_re = compilar_palabras_clave(allowed_senders)
+    blocked_re = compilar_palabras_clave(blocked_senders)
+    keywords_re = compilar_palabras_clave(subject_keywords)
+    exclude_re = compilar_palabras_clave(subject_exclude_keywords)
+    
+    return [
+        message for message in messages
+        if _apply_filters(message, allowed_re, blocked_re, keywords_re, exclude_re)
+    ]
+
 def _apply_filters(message: Dict, 
-                  allowed_senders: Optional[List[str]] = None,
-                  blocked_senders: Optional[List[str]] = None,
-                  subject_keywords: Optional[List[str]] = None,
-                  subject_exclude_keywords: Optional[List[str]] = None) -> bool:
+                  allowed_re: Optional[Pattern] = None,
+                  blocked_re: Optional[Pattern] = None,
+                  keywords_re: Optional[Pattern] = None,
+                  exclude_re: Optional[Pattern] = None) -> bool:
     """
     Aplica filtros a un mensaje
     
     Args:
         message: Mensaje a filtrar
-        allowed_senders: Remitentes permitidos
-        blocked_senders: Remitentes bloqueados
-        subject_keywords: Palabras clave requeridas en subject
-        subject_exclude_keywords: Palabras clave excluidas del subject
+        allowed_re: Remitentes permitidos (compilados)
+        blocked_re: Remitentes bloqueados (compilados)
+        keywords_re: Palabras clave requeridas en subject (compiladas)
+        exclude_re: Palabras clave excluidas del subject (compiladas)
         
     Returns:
         bool: True si el mensaje pasa todos los filtros
     """
     # Extraer información del mensaje
-    sender_email = _extract_sender_email(message)
-    subject = message.get('subject', '')
+    # Graph puede enviar emailAddress.address: null
+    sender_email = (_extract_sender_email(message) or '').lower()
+    subject = message.get('subject') or ''
+    subject_lower = subject.lower()
     
     # Verificar remitente bloqueado
-    if blocked_senders:
-        for blocked in blocked_senders:
-            if blocked.lower() in sender_email.lower():
-                logger.debug(f"Mensaje bloqueado por remitente: {sender_email}")
-                return False
+    if blocked_re and blocked_re.search(sender_email):
+        logger.debug(f"Mensaje bloqueado por remitente: {sender_email}")
+        return False
     
     # Verificar remitente permitido
-    if allowed_senders:
-        sender_allowed = False
-        for allowed in allowed_senders:
-            if allowed.lower() in sender_email.lower():
-                sender_allowed = True
-                break
-        
-        if not sender_allowed:
-            logger.debug(f"Mensaje rechazado - remitente no permitido: {sender_email}")
-            return False
+    if allowed_re and not allowed_re.search(sender_email):
+        logger.debug(f"Mensaje rechazado - remitente no permitido: {sender_email}")
+        return False
     
     # Verificar palabras excluidas en subject
-    if subject_exclude_keywords:
-        subject_lower = subject.lower()
-        for exclude_keyword in subject_exclude_keywords:
-            if exclude_keyword.lower() in subject_lower:
-                logger.debug(f"Mensaje rechazado por palabra excluida en subject: '{subject}'")
-                return False
+    if exclude_re and exclude_re.search(subject_lower):
+        logger.debug(f"Mensaje rechazado por palabra excluida en subject: '{subject}'")
+        return False
     
     # Verificar palabras clave requeridas en subject
-    if subject_keywords:
-        subject_lower = subject.lower()
-        subject_valid = False
-        for keyword in subject_keywords:
-            if keyword.lower() in subject_lower:
-                subject_valid = True
-                break
-        
-        if not subject_valid:
-            logger.debug(f"Mensaje rechazado - no contiene palabras clave requeridas: '{subject}'")
-            return False
+    if keywords_re and not keywords_re.search(subject_lower):
+        logger.debug(f"Mensaje rechazado - no contiene palabras clave requeridas: '{subject}'")
+        return False
     
     return True
 
@@ -247,14 +365,108 @@ def _extract_sender_email(message: Dict) -> str:
     Returns:
         str: Email del remitente
     """
-    sender = message.get('from', {})
+    sender = message.get('from', _EMPTY_DICT)
     if isinstance(sender, dict):
-        email = sender.get('emailAddress', {}).get('address', '')
+        email = (sender.get('emailAddress') or _EMPTY_DICT).get('address', '')
     else:
         email = str(sender)
     
     return email
 
+def _load_delta_links(cache_path: str) -> Dict[str, str]:
+    """Lee los deltaLink guardados (vacío si el archivo no existe o está dañado)"""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_delta_links(cache_path: str, delta_links: Dict[str, str]) -> None:
+    """Guarda los deltaLink de forma atómica (archivo temporal + reemplazo)"""
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(delta_links, f)
+    os.replace(tmp_path, cache_path)
+
+def get_messages_delta(folder_id: str,
+                       delta_link_cache_path: str = DELTA_LINK_CACHE_PATH,
+                       select: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Obtiene solo los mensajes nuevos o modificados desde la última llamada
+    
+    La primera llamada recorre la carpeta completa; las siguientes reanudan
+    desde el @odata.deltaLink guardado en disco, así que solo se transfieren
+    los cambios. Los mensajes eliminados llegan con la clave "@removed".
+    
+    Args:
+        folder_id: ID de la carpeta
+        delta_link_cache_path: Archivo JSON con los deltaLink por carpeta
+        select: Campos a devolver ($select) en la sincronización inicial
+        
+    Returns:
+        List[Dict]: Mensajes cambiados desde la última sincronización
+    """
+    session = get_authenticated_session()
+    delta_links = _load_delta_links(delta_link_cache_path)
+    
+    url = delta_links.get(folder_id)
+    params = None
+    if not url:
+        url = f"{GRAPH_API_ENDPOINT}/users/{MAIL_USER}/mailFolders/{folder_id}/messages/delta"
+        params = {"$select": ",".join(select)} if select else None
+    
+    messages = []
+    try:
+        while url:
+            response = session.get(url, params=params)
+            params = None  # nextLink y deltaLink ya incluyen la consulta
+            
+            if response.status_code == 410 and folder_id in delta_links:
+                # El token delta caducó: se descarta y se sincroniza de nuevo
+                logger.warning("⚠️ deltaLink caducado, reiniciando sincronización completa")
+                del delta_links[folder_id]
+                _save_delta_links(delta_link_cache_path, delta_links)
+                return get_messages_delta(folder_id, delta_link_cache_path, select)
+            
+            if not response.ok:
+                logger.error(f"Error HTTP en consulta delta: {response.status_code} - {response.text}")
+                return messages
+            
+            page = response_json(response)
+            messages.extend(page.get("value", []))
+            url = page.get("@odata.nextLink")
+            
+            delta_link = page.get("@odata.deltaLink")
+            if delta_link:
+                delta_links[folder_id] = delta_link
+                _save_delta_links(delta_link_cache_path, delta_links)
+        
+        logger.info(f"✅ {len(messages)} mensajes cambiados desde la última sincronización")
+        return messages
+        
+    except Exception as e:
+        logger.exception(f"Error en consulta delta de la carpeta '{folder_id}': {e}")
+        return messages
+
+def build_folder_summary(folder_name: str, folder_id: str, folder_info: Dict, messages: List[Dict]) -> Dict:
+    """
+    Construye el resumen de una carpeta a partir de su información y sus mensajes
+    
+    Returns:
+        Dict: Resumen de la carpeta (mismo formato que get_folder_summary)
+    """
+    return {
+        'success': True,
+        'folder_name': folder_name,
+        'folder_id': folder_id,
+        'total_messages': len(messages),
+        'unread_count': folder_info.get('unreadItemCount', 0),
+        'total_item_count': folder_info.get('totalItemCount', 0),
+        'display_name': folder_info.get('displayName', folder_name),
+        'parent_folder_id': folder_info.get('parentFolderId', None)
+    }
+
 def get_folder_summary(folder_name: str) -> Dict:
     """
     Obtiene un resumen de la carpeta especificada
@@ -283,21 +495,12 @@ def get_folder_summary(folder_name: str) -> Dict:
     try:
         response = session.get(url)
         if response.ok:
-            folder_info = response.json()
+            folder_info = response_json(response)
             
             # Obtener conteo de mensajes
             messages = get_messages_from_folder(folder_name, top=1000)
             
-            summary = {
-                'success': True,
-                'folder_name': folder_name,
-                'folder_id': folder_id,
-                'total_messages': len(messages),
-                'unread_count': folder_info.get('unreadItemCount', 0),
-                'total_item_count': folder_info.get('totalItemCount', 0),
-                'display_name': folder_info.get('displayName', folder_name),
-                'parent_folder_id': folder_info.get('parentFolderId', None)
-            }
+            summary = build_folder_summary(folder_name, folder_id, folder_info, messages)
             
             logger.info(f"✅ Resumen de '{folder_name}': {summary['total_messages']} mensajes, {summary['unread_count']} no leídos")
             return summary
@@ -317,6 +520,23 @@ def get_folder_summary(folder_name: str) -> Dict:
             'folder_name': folder_name
         }
 
+def build_folder_list(folders: List[Dict]) -> List[Dict]:
+    """
+    Convierte las carpetas devueltas por Graph al formato de list_available_folders
+    
+    Returns:
+        List[Dict]: Carpetas con id, nombre y conteos
+    """
+    return [
+        {
+            'id': folder.get('id'),
+            'display_name': folder.get('displayName'),
+            'total_item_count': folder.get('totalItemCount', 0),
+            'unread_item_count': folder.get('unreadItemCount', 0)
+        }
+        for folder in folders
+    ]
+
 def list_available_folders() -> List[Dict]:
     """
     Lista todas las carpetas disponibles
@@ -331,17 +551,7 @@ def list_available_folders() -> List[Dict]:
     try:
         response = session.get(url)
         if response.ok:
-            folders = response.json().get("value", [])
-            
-            folder_list = []
-            for folder in folders:
-                folder_info = {
-                    'id': folder.get('id'),
-                    'display_name': folder.get('displayName'),
-                    'total_item_count': folder.get('totalItemCount', 0),
-                    'unread_item_count': folder.get('unreadItemCount', 0)
-                }
-                folder_list.append(folder_info)
+            folder_list = build_folder_list(response_json(response).get("value", []))
             
             logger.info(f"✅ {len(folder_list)} carpetas encontradas")
             return folder_list
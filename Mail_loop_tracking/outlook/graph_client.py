@@ -5,21 +5,101 @@ Este módulo proporciona funcionalidades para:
 - Autenticación con Microsoft Graph API usando MSAL
 - Gestión de tokens de acceso
 - Sesiones autenticadas para llamadas a la API
+- Peticiones agrupadas mediante JSON batching ($batch)
 """
+import threading
 import msal
 import requests
-from config import CLIENT_ID, CLIENT_SECRET, AUTHORITY_URL, GRAPH_SCOPE
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+from config import CLIENT_ID, CLIENT_SECRET, AUTHORITY_URL, GRAPH_SCOPE, GRAPH_API_ENDPOINT
 from utils.logger_config import setup_logger
 from utils.retry_utils import (
     retry_on_failure, 
     handle_graph_api_errors, 
     rate_limit,
+    get_bucket,
+    get_retry_after,
     AuthenticationError,
-    GraphAPIError
+    GraphAPIError,
+    RateLimitError
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = setup_logger("graph_client")
 
+# Máximo de subpeticiones que Graph admite en un mismo $batch
+GRAPH_BATCH_LIMIT = 20
+
+# Cuota compartida de llamadas a Graph: 50 por minuto, ajustada con las
+# cabeceras de throttling que devuelve la API
+GRAPH_RATE_LIMITER = get_bucket(urlparse(GRAPH_API_ENDPOINT).netloc, rate=50 / 60.0, capacity=50)
+
+# Conexiones keep-alive que se conservan por host en la sesión compartida
+GRAPH_POOL_MAXSIZE = 64
+
+# Timeout (segundos) de la petición que abre la primera conexión TLS con Graph
+GRAPH_WARMUP_TIMEOUT = 5
+
+def _response_json_stdlib(response: requests.Response) -> Any:
+    """Decodifica el cuerpo JSON de una respuesta"""
+    return response.json()
+
+
+if orjson is not None:
+    def response_json(response: requests.Response) -> Any:
+        """Decodifica el cuerpo JSON de una respuesta con orjson (fijado en requirements.txt)"""
+        return orjson.loads(response.content)
+else:
+    response_json = _response_json_stdlib
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+# Serializa la renovación de la cabecera Authorization de la sesión compartida
+_auth_header_lock = threading.Lock()
+
+def _get_shared_session() -> requests.Session:
+    """
+    Devuelve la sesión HTTP compartida por todo el proceso.
+    
+    Reutilizar la misma sesión mantiene abiertas las conexiones TLS con Graph,
+    de modo que el handshake se paga una vez y no en cada llamada.
+    """
+    global _shared_session
+    
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=GRAPH_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            })
+            _warm_up(session)
+            _shared_session = session
+        return _shared_session
+
+def _warm_up(session: requests.Session) -> None:
+    """
+    Abre por adelantado la conexión TLS con Graph.
+    
+    Un HEAD a la raíz de la API no consume cuota ni necesita token, y deja la
+    conexión en el pool para que la primera petición real no pague el handshake.
+    Un fallo aquí no es grave: la conexión se abrirá con la primera petición.
+    """
+    try:
+        session.head(GRAPH_API_ENDPOINT, timeout=GRAPH_WARMUP_TIMEOUT)
+        logger.debug("Conexión con Graph precalentada")
+    except requests.RequestException as e:
+        logger.debug(f"No se pudo precalentar la conexión con Graph: {e}")
+
 @retry_on_failure(max_retries=3, delay=2.0)
 @handle_graph_api_errors
 def get_token() -> str:
@@ -63,11 +143,17 @@ def get_token() -> str:
         logger.exception(f"Excepción durante autenticación: {str(ex)}")
         raise GraphAPIError(f"Error de autenticación: {str(ex)}")
 
-@rate_limit(max_calls=50, time_window=60.0)  # 50 llamadas por minuto
+@rate_limit(bucket=GRAPH_RATE_LIMITER)
 def get_authenticated_session() -> requests.Session:
     """
     Prepara una sesión autenticada para llamadas a Microsoft Graph API.
     
+    Todas las llamadas devuelven la misma sesión (con sus conexiones
+    keep-alive); solo se renueva el token de la cabecera Authorization.
+    Las cabeceras nunca se modifican en el sitio: se sustituyen por una copia
+    con el token nuevo, de modo que las peticiones en curso en otros hilos
+    siguen usando el diccionario anterior, intacto.
+    
     Returns:
         requests.Session: Sesión con headers de autenticación configurados
         
@@ -81,13 +167,14 @@ def get_authenticated_session() -> requests.Session:
         # Obtener token
         token = get_token()
         
-        # Crear sesión con headers
-        session = requests.Session()
-        session.headers.update({
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        })
+        # Reutilizar la sesión compartida con el token actualizado
+        session = _get_shared_session()
+        authorization = f"Bearer {token}"
+        with _auth_header_lock:
+            if session.headers.get("Authorization") != authorization:
+                headers = CaseInsensitiveDict(session.headers)
+                headers["Authorization"] = authorization
+                session.headers = headers
         
         logger.info("✅ Sesión autenticada preparada correctamente.")
         return session
@@ -184,6 +271,7 @@ def make_graph_request(session: requests.Session, method: str, url: str, **kwarg
         
         # Realizar petición
         response = session.request(method, url, **kwargs)
+        GRAPH_RATE_LIMITER.consume_headers(response)
         
         # Manejar códigos de error específicos
         if response.status_code == 401:
@@ -191,7 +279,7 @@ def make_graph_request(session: requests.Session, method: str, url: str, **kwarg
             raise AuthenticationError("Token expirado o inválido")
         elif response.status_code == 429:
             logger.warning("⚠️ Rate limit alcanzado en Graph API")
-            raise GraphAPIError("Rate limit excedido")
+            raise RateLimitError("Rate limit excedido", get_retry_after(response))
         elif response.status_code >= 500:
             logger.error(f"❌ Error del servidor Graph API: {response.status_code}")
             raise GraphAPIError(f"Error del servidor: {response.status_code}")
@@ -203,3 +291,49 @@ def make_graph_request(session: requests.Session, method: str, url: str, **kwarg
     except Exception as e:
         logger.exception(f"Error inesperado en petición Graph API: {e}")
         raise GraphAPIError(f"Error en petición: {str(e)}")
+
+def graph_batch(session: requests.Session, requests_list: List[Dict]) -> List[Dict]:
+    """
+    Ejecuta varias peticiones independientes con JSON batching de Graph.
+    
+    Las peticiones se envían en grupos de GRAPH_BATCH_LIMIT a /$batch, de modo
+    que N lecturas cuestan un ida y vuelta por grupo en lugar de uno por petición.
+    
+    Args:
+        session: Sesión autenticada
+        requests_list: Subpeticiones con "id", "method" y "url" relativa a la
+            versión de la API (ej: "/users/{usuario}/mailFolders")
+        
+    Returns:
+        List[Dict]: Respuestas ("id", "status", "headers", "body") en el mismo
+            orden que requests_list
+        
+    Raises:
+        GraphAPIError: Si la petición $batch falla
+    """
+    batch_url = f"{GRAPH_API_ENDPOINT}/$batch"
+    responses = {}
+    
+    for start in range(0, len(requests_list), GRAPH_BATCH_LIMIT):
+        chunk = requests_list[start:start + GRAPH_BATCH_LIMIT]
+        logger.debug(f"Enviando $batch con {len(chunk)} peticiones")
+        
+        try:
+            GRAPH_RATE_LIMITER.acquire()
+            response = session.post(batch_url, json={"requests": chunk})
+            GRAPH_RATE_LIMITER.consume_headers(response)
+        except Exception as e:
+            logger.exception(f"Error enviando $batch a Graph API: {e}")
+            raise GraphAPIError(f"Error en $batch: {str(e)}")
+        
+        if not response.ok:
+            logger.error(f"❌ Error HTTP en $batch: {response.status_code} - {response.text}")
+            raise GraphAPIError(f"Error en $batch: {response.status_code}")
+        
+        for item in response_json(response).get("responses", []):
+            responses[str(item.get("id"))] = item
+    
+    return [
+        responses.get(str(request["id"]), {"id": request["id"], "status": None, "body": {}})
+        for request in requests_list
+    ]
@@ -15,6 +15,9 @@ PREDEFINED_FILTERS = {
     }
 }
 
+# Nombres de filtros disponibles, calculados una sola vez
+_AVAILABLE_FILTERS = tuple(PREDEFINED_FILTERS)
+
 def get_predefined_filter(filter_name: str) -> MessageFilter:
     """
     Obtiene un filtro predefinido por nombre
@@ -28,11 +31,10 @@ def get_predefined_filter(filter_name: str) -> MessageFilter:
     Raises:
         ValueError: Si el filtro no existe
     """
-    if filter_name not in PREDEFINED_FILTERS:
-        available_filters = list(PREDEFINED_FILTERS.keys())
-        raise ValueError(f"Filtro '{filter_name}' no encontrado. Filtros disponibles: {available_filters}")
+    config = PREDEFINED_FILTERS.get(filter_name)
+    if config is None:
+        raise ValueError(f"Filtro '{filter_name}' no encontrado. Filtros disponibles: {list(_AVAILABLE_FILTERS)}")
     
-    config = PREDEFINED_FILTERS[filter_name]
     return MessageFilter(
         allowed_senders=config.get("allowed_senders", []),
         blocked_senders=config.get("blocked_senders", []),
@@ -47,7 +49,7 @@ def get_available_filters() -> List[str]:
     Returns:
         List[str]: Lista de nombres de filtros disponibles
     """
-    return list(PREDEFINED_FILTERS.keys())
+    return list(_AVAILABLE_FILTERS)
 
 def create_custom_filter(allowed_senders: List[str] = None,
                         blocked_senders: List[str] = None,
@@ -109,20 +111,3 @@ def combine_filters(*filters: MessageFilter) -> MessageFilter:
         subject_keywords=all_subject_keywords,
         subject_exclude_keywords=all_subject_exclude_keywords
     )
-
-# Ejemplos de uso de filtros combinados
-def get_urgent_business_reports() -> MessageFilter:
-    """
-    Combina filtros para obtener mensajes urgentes de negocio y reportes
-    """
-    urgent_filter = get_predefined_filter("Mail_Classification")
-    reports_filter = get_predefined_filter("reports")
-    return combine_filters(urgent_filter, reports_filter)
-
-def get_project_meetings() -> MessageFilter:
-    """
-    Combina filtros para obtener mensajes de proyectos y reuniones
-    """
-    projects_filter = get_predefined_filter("projects")
-    meetings_filter = get_predefined_filter("meetings")
-    return combine_filters(projects_filter, meetings_filter) 
\ No newline at end of file
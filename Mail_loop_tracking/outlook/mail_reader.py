@@ -1,10 +1,21 @@
 from outlook.graph_client import get_authenticated_session
 from config import GRAPH_API_ENDPOINT, MAIL_USER
 from utils.logger_config import setup_logger
+from utils.helpers import compilar_palabras_clave
 from typing import List, Dict, Optional
+from itertools import compress
 
 logger = setup_logger("mail_reader")
 
+# A partir de este número de mensajes se filtra por lotes (sin log por mensaje)
+BATCH_FILTER_THRESHOLD = 200
+
+# Por debajo de este tamaño filter_messages evalúa mensaje a mensaje
+BATCH_FILTER_MIN_SIZE = 8
+
+# Diccionario vacío compartido (solo lectura) para búsquedas anidadas sin asignar
+_EMPTY_DICT = {}
+
 def get_messages(top=5):
     """
     Función original para obtener mensajes sin filtros
@@ -52,11 +63,46 @@ class MessageFilter:
         self.subject_keywords = subject_keywords or []
         self.subject_exclude_keywords = subject_exclude_keywords or []
         
+        # {lista: (contenido con que se compiló, patrón)}; ver _compiled
+        self._patterns = {}
+        
         logger.debug(f"Filtro inicializado - Remitentes permitidos: {len(self.allowed_senders)}, "
                     f"Remitentes bloqueados: {len(self.blocked_senders)}, "
                     f"Palabras clave subject: {len(self.subject_keywords)}, "
                     f"Palabras excluidas subject: {len(self.subject_exclude_keywords)}")
 
+    def _compiled(self, field: str):
+        """
+        Patrón compilado de una de las listas del filtro
+        
+        Cada lista se compila en una sola alternancia (una búsqueda por
+        remitente o subject en lugar de un bucle por patrón). Se recompila si
+        la lista cambió desde la última vez, de modo que los elementos que se
+        añadan después de crear el filtro también cuentan.
+        """
+        words = getattr(self, field)
+        key = tuple(words)
+        cached = self._patterns.get(field)
+        if cached is None or cached[0] != key:
+            cached = self._patterns[field] = (key, compilar_palabras_clave(words))
+        return cached[1]
+
+    @property
+    def _allowed_re(self):
+        return self._compiled('allowed_senders')
+
+    @property
+    def _blocked_re(self):
+        return self._compiled('blocked_senders')
+
+    @property
+    def _keywords_re(self):
+        return self._compiled('subject_keywords')
+
+    @property
+    def _exclude_re(self):
+        return self._compiled('subject_exclude_keywords')
+
     def is_sender_allowed(self, sender_email: str) -> bool:
         """
         Verifica si el remitente está permitido según los filtros
@@ -74,17 +120,20 @@ class MessageFilter:
         sender_email = sender_email.lower()
         
         # Verificar remitentes bloqueados primero
-        for blocked in self.blocked_senders:
-            if blocked.lower() in sender_email:
-                logger.debug(f"Remitente bloqueado: {sender_email} (coincide con: {blocked})")
+        blocked_re = self._blocked_re
+        if blocked_re is not None:
+            match = blocked_re.search(sender_email)
+            if match:
+                logger.debug(f"Remitente bloqueado: {sender_email} (coincide con: {match.group()})")
                 return False
         
         # Si hay remitentes permitidos específicos, verificar que esté en la lista
-        if self.allowed_senders:
-            for allowed in self.allowed_senders:
-                if allowed.lower() in sender_email:
-                    logger.debug(f"Remitente permitido: {sender_email} (coincide con: {allowed})")
-                    return True
+        allowed_re = self._allowed_re
+        if allowed_re is not None:
+            match = allowed_re.search(sender_email)
+            if match:
+                logger.debug(f"Remitente permitido: {sender_email} (coincide con: {match.group()})")
+                return True
             logger.debug(f"Remitente no permitido: {sender_email}")
             return False
         
@@ -109,17 +158,20 @@ class MessageFilter:
         subject_lower = subject.lower()
         
         # Verificar palabras excluidas primero
-        for exclude_keyword in self.subject_exclude_keywords:
-            if exclude_keyword.lower() in subject_lower:
-                logger.debug(f"Subject rechazado por palabra excluida: '{subject}' (contiene: '{exclude_keyword}')")
+        exclude_re = self._exclude_re
+        if exclude_re is not None:
+            match = exclude_re.search(subject_lower)
+            if match:
+                logger.debug(f"Subject rechazado por palabra excluida: '{subject}' (contiene: '{match.group()}')")
                 return False
         
         # Si hay palabras clave requeridas, verificar que al menos una esté presente
-        if self.subject_keywords:
-            for keyword in self.subject_keywords:
-                if keyword.lower() in subject_lower:
-                    logger.debug(f"Subject aceptado por palabra clave: '{subject}' (contiene: '{keyword}')")
-                    return True
+        keywords_re = self._keywords_re
+        if keywords_re is not None:
+            match = keywords_re.search(subject_lower)
+            if match:
+                logger.debug(f"Subject aceptado por palabra clave: '{subject}' (contiene: '{match.group()}')")
+                return True
             logger.debug(f"Subject rechazado - no contiene palabras clave requeridas: '{subject}'")
             return False
         
@@ -153,6 +205,51 @@ class MessageFilter:
         logger.info(f"Mensaje aprobado por filtros - Remitente: {sender_email}, Subject: '{subject}'")
         return True
 
+    def filter_messages(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Aplica todos los filtros a un lote de mensajes
+        
+        Evalúa cada criterio columna a columna sobre todo el lote, con los
+        patrones ya compilados, en lugar de recorrer mensaje a mensaje. Los
+        lotes de menos de BATCH_FILTER_MIN_SIZE mensajes usan filter_message.
+        
+        Args:
+            messages: Lista de mensajes a filtrar
+            
+        Returns:
+            List[Dict]: Mensajes que pasan todos los filtros, en el orden original
+        """
+        # Las subclases que redefinen filter_message conservan su lógica
+        if (type(self).filter_message is not MessageFilter.filter_message
+                or len(messages) < BATCH_FILTER_MIN_SIZE):
+            return [message for message in messages if self.filter_message(message)]
+        
+        # Graph puede enviar emailAddress.address: null (filter_message lo rechaza)
+        senders = [(self._extract_sender_email(m) or '').lower() for m in messages]
+        subjects = [(m.get('subject') or '').lower() for m in messages]
+        
+        # Remitente y subject vacíos se rechazan igual que en filter_message
+        mask = [bool(sender) and bool(subject) for sender, subject in zip(senders, subjects)]
+        
+        blocked_re = self._blocked_re
+        if blocked_re is not None:
+            search = blocked_re.search
+            mask = [keep and search(sender) is None for keep, sender in zip(mask, senders)]
+        allowed_re = self._allowed_re
+        if allowed_re is not None:
+            search = allowed_re.search
+            mask = [keep and search(sender) is not None for keep, sender in zip(mask, senders)]
+        exclude_re = self._exclude_re
+        if exclude_re is not None:
+            search = exclude_re.search
+            mask = [keep and search(subject) is None for keep, subject in zip(mask, subjects)]
+        keywords_re = self._keywords_re
+        if keywords_re is not None:
+            search = keywords_re.search
+            mask = [keep and search(subject) is not None for keep, subject in zip(mask, subjects)]
+        
+        return list(compress(messages, mask))
+
     def _extract_sender_email(self, message: Dict) -> str:
         """
         Extrae el email del remitente del mensaje
@@ -164,9 +261,9 @@ class MessageFilter:
             str: Email del remitente
         """
         # Intentar diferentes campos donde puede estar el remitente
-        sender = message.get('from', {})
+        sender = message.get('from', _EMPTY_DICT)
         if isinstance(sender, dict):
-            email = sender.get('emailAddress', {}).get('address', '')
+            email = (sender.get('emailAddress') or _EMPTY_DICT).get('address', '')
         else:
             email = str(sender)
         
@@ -195,10 +292,13 @@ def get_messages_with_filter(top: int = 5, message_filter: Optional[MessageFilte
             
             # Aplicar filtros si se proporcionan
             if message_filter:
-                filtered_messages = []
-                for message in messages:
-                    if message_filter.filter_message(message):
-                        filtered_messages.append(message)
+                if len(messages) >= BATCH_FILTER_THRESHOLD:
+                    filtered_messages = message_filter.filter_messages(messages)
+                else:
+                    filtered_messages = []
+                    for message in messages:
+                        if message_filter.filter_message(message):
+                            filtered_messages.append(message)
                 
                 logger.info(f"{len(filtered_messages)} correos aprobados por filtros de {len(messages)} totales")
                 return filtered_messages
@@ -1,19 +1,47 @@
 import os
-import uuid
+import re
+import time
 import base64
+from concurrent.futures import ThreadPoolExecutor
 import config
 from utils.helpers import decodificar_header
+from utils.logger_config import setup_logger
 
-def extraer_info_mensaje(service, mensaje_id):
-    mensaje = service.users().messages().get(userId='me', id=mensaje_id, format='full').execute()
+try:
+    # pybase64 usa decodificadores SIMD (AVX2/AVX-512) cuando están disponibles
+    from pybase64 import urlsafe_b64decode as _urlsafe_b64decode
+except ImportError:
+    from base64 import urlsafe_b64decode as _urlsafe_b64decode
+
+# Gmail recomienda no superar 50 peticiones por lote (el máximo admitido es 100)
+GMAIL_BATCH_SIZE = 50
+
+# Los adjuntos se decodifican por bloques de 256 KiB (múltiplo de 4 caracteres
+# base64) para no duplicar el archivo completo en memoria
+B64_CHUNK_SIZE = 256 * 1024
+
+# Los adjuntos mayores (tamaño decodificado) se descargan fuera de los lotes, de
+# uno en uno: un lote mantiene en memoria todas sus respuestas a la vez
+ADJUNTO_GRANDE_BYTES = 5 * 1024 * 1024
+
+# Hilos que decodifican y escriben adjuntos mientras se descarga el siguiente;
+# las peticiones a la API siguen en el hilo principal (httplib2 no es thread-safe)
+ESCRITORES_ADJUNTOS = 4
 
-    headers = mensaje['payload'].get('headers', [])
-    asunto = remitente = ""
-    for header in headers:
-        if header['name'] == 'Subject':
-            asunto = header['value']
-        elif header['name'] == 'From':
-            remitente = header['value']
+# Reintentos de las sub-peticiones de un lote que fallan por límite de cuota
+# (429) o error temporal del servidor; las demás se registran y se descartan
+LOTE_REINTENTOS = 3
+ESTADOS_REINTENTABLES = frozenset({429, 500, 502, 503, 504})
+
+_ESPACIOS_RE = re.compile(r'\s+')
+
+logger = setup_logger("parser")
+
+
+def _info_desde_mensaje(mensaje):
+    headers = {h['name']: h['value'] for h in mensaje['payload'].get('headers', [])}
+    asunto = headers.get('Subject', "")
+    remitente = headers.get('From', "")
 
     cuerpo = ""
     partes = mensaje['payload'].get('parts', [])
@@ -22,20 +50,170 @@ def extraer_info_mensaje(service, mensaje_id):
             data = parte['body'].get('data')
             if data:
                 cuerpo = base64.urlsafe_b64decode(data.encode()).decode(errors="ignore")
+                break
 
     return asunto, remitente, cuerpo
 
 
+def _guardar_adjunto(data, nombre_archivo, carpeta_destino):
+    # Prefijo ordenado por tiempo: los archivos quedan contiguos en el índice del directorio
+    nombre_unico = f"{time.time_ns():x}_{os.urandom(4).hex()}_{_ESPACIOS_RE.sub('_', nombre_archivo)}"
+    ruta = os.path.join(carpeta_destino, nombre_unico)
+    # Los decodificadores aceptan str ASCII directamente y cada bloque decodificado
+    # va al archivo sin pasar por el buffer de Python (buffering=0)
+    with open(ruta, "wb", buffering=0) as f:
+        for inicio in range(0, len(data), B64_CHUNK_SIZE):
+            bloque = _urlsafe_b64decode(data[inicio:inicio + B64_CHUNK_SIZE])
+            vista = memoryview(bloque)
+            while vista:
+                vista = vista[f.write(vista):]
+    return ruta
+
+
+def _estado_http(exception):
+    # (estado HTTP, segundos de Retry-After) de un HttpError de una sub-petición
+    resp = getattr(exception, 'resp', None)
+    if resp is None:
+        return None, None
+    try:
+        retry_after = float(resp.get('retry-after'))
+    except (TypeError, ValueError):
+        retry_after = None
+    return getattr(resp, 'status', None), retry_after
+
+
+def _ejecutar_en_lotes(service, peticiones, callback):
+    # peticiones: lista de (request_id, petición HTTP sin ejecutar). callback
+    # solo recibe las respuestas correctas; las sub-peticiones fallidas se
+    # registran y, si el error es temporal, se reintentan respetando Retry-After
+    pendientes = peticiones
+    for intento in range(LOTE_REINTENTOS + 1):
+        fallidas = {}
+
+        def _on_respuesta(request_id, response, exception):
+            if exception is None:
+                callback(request_id, response, None)
+            else:
+                fallidas[request_id] = exception
+
+        for inicio in range(0, len(pendientes), GMAIL_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=_on_respuesta)
+            for request_id, peticion in pendientes[inicio:inicio + GMAIL_BATCH_SIZE]:
+                batch.add(peticion, request_id=request_id)
+            batch.execute()
+
+        reintentar, espera = [], 0.0
+        for request_id, peticion in pendientes:
+            if request_id not in fallidas:
+                continue
+            exception = fallidas[request_id]
+            estado, retry_after = _estado_http(exception)
+            if estado in ESTADOS_REINTENTABLES and intento < LOTE_REINTENTOS:
+                logger.warning(f"⚠️ Petición {request_id} del lote falló ({estado}); se reintentará")
+                reintentar.append((request_id, peticion))
+                espera = max(espera, retry_after if retry_after is not None else 2 ** intento)
+            else:
+                logger.error(f"❌ Petición {request_id} del lote falló: {exception}")
+
+        if not reintentar:
+            return
+        time.sleep(espera)
+        pendientes = reintentar
+
+
+def _obtener_mensajes_batch(service, mensaje_ids):
+    mensajes = {}
+
+    def _on_msg(request_id, response, exception):
+        if exception is None:
+            mensajes[request_id] = response
+
+    peticiones = [
+        (mid, service.users().messages().get(userId='me', id=mid, format='full'))
+        for mid in mensaje_ids
+    ]
+    _ejecutar_en_lotes(service, peticiones, _on_msg)
+    return mensajes
+
+
+def extraer_info_mensaje(service, mensaje_id):
+    mensaje = service.users().messages().get(userId='me', id=mensaje_id, format='full').execute()
+    return _info_desde_mensaje(mensaje)
+
+
+def extraer_info_mensajes_batch(service, mensaje_ids):
+    """
+    Versión por lotes de extraer_info_mensaje: una petición HTTP por cada
+    GMAIL_BATCH_SIZE mensajes. Devuelve {mensaje_id: (asunto, remitente, cuerpo)};
+    los mensajes cuya descarga falla (tras los reintentos) se registran en el
+    log y no aparecen en el resultado.
+    """
+    mensajes = _obtener_mensajes_batch(service, mensaje_ids)
+    return {mid: _info_desde_mensaje(mensaje) for mid, mensaje in mensajes.items()}
+
+
+def _descargar_adjuntos_de(service, mensaje_id, mensaje, carpeta_destino):
+    with ThreadPoolExecutor(max_workers=ESCRITORES_ADJUNTOS) as escritores:
+        escrituras = []
+        for parte in mensaje['payload'].get('parts', []):
+            if parte['filename'] and parte['body'] and 'attachmentId' in parte['body']:
+                att_id = parte['body']['attachmentId']
+                att = service.users().messages().attachments().get(userId='me', messageId=mensaje_id, id=att_id).execute()
+                escrituras.append(escritores.submit(_guardar_adjunto, att['data'], parte['filename'], carpeta_destino))
+        return [escritura.result() for escritura in escrituras]
+
+
 def descargar_adjuntos(service, mensaje_id, carpeta_destino):
     mensaje = service.users().messages().get(userId='me', id=mensaje_id).execute()
-    partes = mensaje['payload'].get('parts', [])
+    _descargar_adjuntos_de(service, mensaje_id, mensaje, carpeta_destino)
 
-    for parte in partes:
-        if parte['filename'] and parte['body'] and 'attachmentId' in parte['body']:
-            att_id = parte['body']['attachmentId']
-            att = service.users().messages().attachments().get(userId='me', messageId=mensaje_id, id=att_id).execute()
-            data = base64.urlsafe_b64decode(att['data'].encode())
-            nombre_unico = f"{uuid.uuid4()}_{parte['filename'].replace(' ', '_')}"
-            ruta = os.path.join(carpeta_destino, nombre_unico)
-            with open(ruta, "wb") as f:
-                f.write(data)
+
+def procesar_mensaje(service, mensaje_id, carpeta_destino):
+    """
+    Equivale a extraer_info_mensaje + descargar_adjuntos con una sola
+    lectura del mensaje. Devuelve (asunto, remitente, cuerpo, rutas_adjuntos).
+    """
+    mensaje = service.users().messages().get(userId='me', id=mensaje_id, format='full').execute()
+    asunto, remitente, cuerpo = _info_desde_mensaje(mensaje)
+    rutas = _descargar_adjuntos_de(service, mensaje_id, mensaje, carpeta_destino)
+    return asunto, remitente, cuerpo, rutas
+
+
+def descargar_adjuntos_batch(service, mensaje_ids, carpeta_destino):
+    """
+    Versión por lotes de descargar_adjuntos: un lote para los mensajes y otro
+    para todos sus adjuntos. Devuelve las rutas de los archivos guardados.
+    """
+    mensajes = _obtener_mensajes_batch(service, mensaje_ids)
+
+    nombres = {}
+    peticiones = []
+    grandes = []
+    for mid, mensaje in mensajes.items():
+        for indice, parte in enumerate(mensaje['payload'].get('parts', [])):
+            if parte['filename'] and parte['body'] and 'attachmentId' in parte['body']:
+                if parte['body'].get('size', 0) > ADJUNTO_GRANDE_BYTES:
+                    grandes.append((mid, parte))
+                    continue
+                request_id = f"{mid}:{indice}"
+                nombres[request_id] = parte['filename']
+                peticiones.append((request_id, service.users().messages().attachments().get(
+                    userId='me', messageId=mid, id=parte['body']['attachmentId'])))
+
+    with ThreadPoolExecutor(max_workers=ESCRITORES_ADJUNTOS) as escritores:
+        escrituras = []
+
+        def _on_att(request_id, response, exception):
+            if exception is None:
+                escrituras.append(escritores.submit(
+                    _guardar_adjunto, response['data'], nombres[request_id], carpeta_destino))
+
+        _ejecutar_en_lotes(service, peticiones, _on_att)
+        rutas = [escritura.result() for escritura in escrituras]
+    
+    # Adjuntos grandes: cada respuesta se libera antes de pedir la siguiente
+    for mid, parte in grandes:
+        att = service.users().messages().attachments().get(
+            userId='me', messageId=mid, id=parte['body']['attachmentId']).execute()
+        rutas.append(_guardar_adjunto(att.pop('data'), parte['filename'], carpeta_destino))
+    return rutas
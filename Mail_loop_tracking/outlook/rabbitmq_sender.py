@@ -2,19 +2,331 @@
 Módulo para enviar mensajes a RabbitMQ desde el procesador de correos
 """
 
+import os
 import pika
 import json
+import time
+import queue
 import logging
-from typing import Dict, Any, Optional
+import threading
+from itertools import takewhile
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, List
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
+from rabbitmq_config import get_publisher_config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Número máximo de canales que el pool mantiene abiertos por conexión compartida
+MAX_CHANNEL_POOL_SIZE = int(os.getenv('RABBITMQ_MAX_CHANNEL_POOL_SIZE', 16))
+
+# Mensajes publicados por tanda antes de esperar las confirmaciones del broker
+CONFIRM_BATCH_SIZE = int(os.getenv('RABBITMQ_CONFIRM_BATCH_SIZE', 64))
+
+# Intentos de publicación de un mensaje antes de darlo por rechazado (nack)
+_MAX_PUBLISH_ATTEMPTS = 2
+
+# Ajustes de conexión propios de los publicadores
+_PUBLISHER_DEFAULTS = {
+    key: value for key, value in get_publisher_config().items()
+    if key in ('heartbeat', 'blocked_connection_timeout')
+}
+
+# Partes constantes de los sobres JSON, serializadas una sola vez por proceso.
+# Solo los campos variables (timestamp, datos del correo) se serializan por mensaje.
+_PDF_ENVELOPE_PREFIX = (
+    '{"processing_info": {"source": "robot001_outlook", "robot_id": "robot001", "timestamp": '
+).encode('utf-8')
+_SUMMARY_ENVELOPE_PREFIX = '{"type": "email_summary", "robot_id": "robot001", "timestamp": '.encode('utf-8')
+
+
+def _json_default(obj: Any) -> str:
+    """Serializar fechas en ISO 8601, igual que orjson"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_stdlib(obj: Any) -> bytes:
+    """Serializar a JSON en UTF-8 con la librería estándar"""
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+if orjson is not None:
+    def _dumps(obj: Any) -> bytes:
+        """
+        Serializar a JSON en UTF-8 con orjson (devuelve bytes directamente)
+        
+        Produce el mismo JSON que _dumps_stdlib salvo los espacios: claves no
+        str convertidas a texto y fechas en ISO 8601. Los float NaN/inf pasan a
+        null (la librería estándar escribe NaN); los mensajes no llevan floats.
+        """
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+else:
+    _dumps = _dumps_stdlib
+
+
+# (segundo, fecha ISO de ese segundo) del último timestamp generado
+_timestamp_cache = (None, '')
+
+
+def _timestamp() -> str:
+    """
+    Hora local en formato ISO con microsegundos, como datetime.now().isoformat()
+    
+    La parte de fecha y hora se formatea una vez por segundo; dentro del mismo
+    segundo solo se añaden los microsegundos.
+    """
+    global _timestamp_cache
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_second, prefix = _timestamp_cache
+    if seconds != cached_second:
+        prefix = datetime.fromtimestamp(seconds).isoformat()
+        _timestamp_cache = (seconds, prefix)
+    return f"{prefix}.{micros:06d}"
+
+
+def _encode_pdf_envelope(message: Dict[str, Any], timestamp: str) -> bytes:
+    """Componer el sobre de un PDF a partir del prefijo constante y sus campos variables"""
+    body = _dumps(message)
+    separator = b'}, ' if len(body) > 2 else b'}'
+    return _PDF_ENVELOPE_PREFIX + _dumps(timestamp) + separator + body[1:]
+
+
+def _encode_summary_envelope(email_summary: Dict[str, Any], timestamp: str) -> bytes:
+    """Componer el sobre de un resumen de correo"""
+    return _SUMMARY_ENVELOPE_PREFIX + _dumps(timestamp) + b', "data": ' + _dumps(email_summary) + b'}'
+
+
+def _build_pdf_message(pdf_path: str, email_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Crear los campos variables del mensaje de un PDF
+    
+    El bloque processing_info lo añade _encode_pdf_envelope.
+    
+    Returns:
+        Dict: Campos del mensaje, o None si el PDF no existe
+    """
+    pdf_file = Path(pdf_path)
+    if not pdf_file.exists():
+        logger.error(f"❌ El archivo PDF no existe: {pdf_path}")
+        return None
+    
+    return {
+        "host_absolute_path": str(pdf_file.absolute()),
+        "file_name": pdf_file.name,
+        "original_name": pdf_file.name,
+        "email_info": {
+            "subject": email_info.get('subject', ''),
+            "sender": email_info.get('sender', ''),
+            "received_date": email_info.get('received_date', ''),
+            "folder": email_info.get('folder', ''),
+            "message_id": email_info.get('message_id', ''),
+            "has_attachments": email_info.get('has_attachments', False),
+            "attachment_count": email_info.get('attachment_count', 0)
+        }
+    }
+
+
+# Propiedades comunes: mensaje persistente en formato JSON
+_PERSISTENT_JSON = pika.BasicProperties(
+    delivery_mode=2,
+    content_type='application/json'
+)
+
+
+class RabbitMQConnectionPool:
+    """
+    Conexión persistente a RabbitMQ con un pool acotado de canales
+    
+    Todos los senders con el mismo (host, puerto, vhost, usuario) comparten
+    una única conexión, de modo que el handshake TCP + AMQP se paga una sola
+    vez por proceso. pika.BlockingConnection no es thread-safe, por lo que el
+    pool debe usarse desde un mismo hilo.
+    """
+    
+    _pools: Dict[Tuple, 'RabbitMQConnectionPool'] = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, rabbitmq_config: Dict[str, Any], max_channels: int = MAX_CHANNEL_POOL_SIZE):
+        """
+        Abrir la conexión compartida
+        
+        Args:
+            rabbitmq_config: Configuración de RabbitMQ (ver RabbitMQSender)
+            max_channels: Número máximo de canales abiertos simultáneamente
+        """
+        self.key = self.pool_key(rabbitmq_config)
+        self.max_channels = max_channels
+        self.connection = pika.BlockingConnection(self._build_parameters(rabbitmq_config))
+        self.declared = set()
+        self._channels = queue.Queue(maxsize=max_channels)
+        self._opened = 0
+        self._overflow = set()
+        self._users = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def pool_key(rabbitmq_config: Dict[str, Any]) -> Tuple:
+        """Clave que identifica una conexión reutilizable"""
+        return (
+            rabbitmq_config.get('host', 'localhost'),
+            rabbitmq_config.get('port', 5672),
+            rabbitmq_config.get('virtual_host', '/'),
+            rabbitmq_config.get('username', 'guest')
+        )
+    
+    @staticmethod
+    def _build_parameters(rabbitmq_config: Dict[str, Any]) -> pika.ConnectionParameters:
+        """Crear los parámetros de conexión"""
+        credentials = pika.PlainCredentials(
+            rabbitmq_config.get('username', 'guest'),
+            rabbitmq_config.get('password', 'guest')
+        )
+        return pika.ConnectionParameters(
+            host=rabbitmq_config.get('host', 'localhost'),
+            port=rabbitmq_config.get('port', 5672),
+            credentials=credentials,
+            virtual_host=rabbitmq_config.get('virtual_host', '/'),
+            heartbeat=rabbitmq_config.get('heartbeat', _PUBLISHER_DEFAULTS['heartbeat']),
+            blocked_connection_timeout=rabbitmq_config.get(
+                'blocked_connection_timeout', _PUBLISHER_DEFAULTS['blocked_connection_timeout']
+            )
+        )
+    
+    @classmethod
+    def get_pool(cls, rabbitmq_config: Dict[str, Any]) -> 'RabbitMQConnectionPool':
+        """
+        Obtener el pool compartido para la configuración dada
+        
+        Reabre la conexión si la anterior se cerró. Cada llamada debe
+        emparejarse con release() cuando el llamador deja de usar el pool.
+        """
+        key = cls.pool_key(rabbitmq_config)
+        with cls._registry_lock:
+            pool = cls._pools.get(key)
+            if pool is None or pool.is_closed:
+                pool = cls(rabbitmq_config)
+                cls._pools[key] = pool
+            pool._users += 1
+            return pool
+    
+    @property
+    def is_closed(self) -> bool:
+        return self.connection is None or self.connection.is_closed
+    
+    def open_channel(self):
+        """
+        Abrir un canal fuera del pool, que no cuenta para max_channels
+        
+        Es para canales de larga vida (el canal propio de cada sender); quien
+        lo abre debe cerrarlo con close_channel().
+        """
+        return self.connection.channel()
+    
+    @staticmethod
+    def close_channel(channel):
+        """Cerrar un canal abierto con open_channel()"""
+        if channel.is_open:
+            channel.close()
+    
+    def acquire_channel(self):
+        """
+        Obtener un canal del pool, abriendo uno nuevo si hay cupo
+        
+        Si ya hay max_channels prestados se abre un canal adicional que se
+        cierra al devolverlo. No se espera a que otro lo devuelva: la conexión
+        se usa desde un solo hilo, así que nadie podría devolverlo mientras
+        tanto y la espera no terminaría nunca.
+        """
+        while True:
+            try:
+                channel = self._channels.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pooled = self._opened < self.max_channels
+                    if pooled:
+                        self._opened += 1
+                try:
+                    channel = self.open_channel()
+                except Exception:
+                    if pooled:
+                        with self._lock:
+                            self._opened -= 1
+                    raise
+                if not pooled:
+                    logger.warning(f"⚠️ Pool de canales lleno ({self.max_channels}); se abre un canal adicional")
+                    self._overflow.add(channel)
+                return channel
+            
+            if channel.is_open:
+                return channel
+            # El broker cerró el canal: se descarta y se libera su cupo
+            with self._lock:
+                self._opened -= 1
+    
+    def release_channel(self, channel):
+        """Devolver un canal al pool (los adicionales se cierran)"""
+        if channel in self._overflow:
+            self._overflow.discard(channel)
+            self.close_channel(channel)
+        elif channel.is_open:
+            self._channels.put_nowait(channel)
+        else:
+            with self._lock:
+                self._opened -= 1
+    
+    @contextmanager
+    def pooled_channel(self):
+        """Context manager que presta un canal del pool (ver acquire_channel)"""
+        channel = self.acquire_channel()
+        try:
+            yield channel
+        finally:
+            self.release_channel(channel)
+    
+    def declare_queue(self, channel, queue_name: str):
+        """Declarar una cola durable una sola vez por conexión"""
+        if ('queue', queue_name) not in self.declared:
+            channel.queue_declare(queue=queue_name, durable=True)
+            self.declared.add(('queue', queue_name))
+    
+    def declare_exchange(self, channel, exchange: str):
+        """Declarar un exchange directo una sola vez por conexión"""
+        if ('exchange', exchange) not in self.declared:
+            channel.exchange_declare(exchange=exchange, exchange_type='direct')
+            self.declared.add(('exchange', exchange))
+    
+    def release(self) -> bool:
+        """
+        Liberar una referencia al pool
+        
+        Returns:
+            bool: True si era la última referencia y la conexión se cerró
+        """
+        cls = type(self)
+        with cls._registry_lock:
+            self._users -= 1
+            if self._users > 0:
+                return False
+            if cls._pools.get(self.key) is self:
+                del cls._pools[self.key]
+        
+        if not self.is_closed:
+            self.connection.close()
+        return True
+
+
 class RabbitMQSender:
     """Clase para enviar mensajes a RabbitMQ"""
     
-    def __init__(self, rabbitmq_config: Dict[str, Any]):
+    def __init__(self, rabbitmq_config: Dict[str, Any], shared_connection: bool = True):
         """
         Inicializar el sender de RabbitMQ
         
@@ -27,41 +339,44 @@ class RabbitMQSender:
                 - queue_name: Nombre de la cola
                 - exchange: Exchange (opcional)
                 - routing_key: Routing key (opcional)
+                - heartbeat / blocked_connection_timeout: por defecto los de
+                  la conexión de publicación (rabbitmq_config.get_publisher_config)
+            shared_connection: False para abrir una conexión exclusiva, necesaria
+                si el sender se usa desde un hilo distinto al de los demás
         """
-        self.config = rabbitmq_config
+        self.config = {**_PUBLISHER_DEFAULTS, **rabbitmq_config}
+        self.shared_connection = shared_connection
+        self.summary_queue = self.config.get('summary_queue', 'email_summary_queue')
+        self.pool = None
         self.connection = None
         self.channel = None
+        self._confirm_publisher = None
         self._connect()
     
     def _connect(self):
-        """Conectar a RabbitMQ"""
+        """Conectar a RabbitMQ reutilizando la conexión compartida"""
         try:
-            # Crear credenciales
-            credentials = pika.PlainCredentials(
-                self.config.get('username', 'guest'),
-                self.config.get('password', 'guest')
-            )
+            if self.shared_connection:
+                self.pool = RabbitMQConnectionPool.get_pool(self.config)
+            else:
+                # Pool fuera del registro: release() cierra la conexión al terminar
+                self.pool = RabbitMQConnectionPool(self.config)
+                self.pool._users = 1
+            self.connection = self.pool.connection
             
-            # Crear parámetros de conexión
-            parameters = pika.ConnectionParameters(
-                host=self.config.get('host', 'localhost'),
-                port=self.config.get('port', 5672),
-                credentials=credentials,
-                virtual_host=self.config.get('virtual_host', '/')
-            )
-            
-            # Establecer conexión
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
+            # Canal propio del sender, expuesto para quien publica directamente.
+            # Vive tanto como el sender, así que no ocupa cupo del pool.
+            self.channel = self.pool.open_channel()
             
-            # Declarar cola
+            # Declarar colas; la de resúmenes también aquí para no declararla en cada envío
             queue_name = self.config.get('queue_name', 'pdf_processing_queue')
-            self.channel.queue_declare(queue=queue_name, durable=True)
+            self.pool.declare_queue(self.channel, queue_name)
+            self.pool.declare_queue(self.channel, self.summary_queue)
             
             # Declarar exchange si se especifica
             exchange = self.config.get('exchange')
             if exchange:
-                self.channel.exchange_declare(exchange=exchange, exchange_type='direct')
+                self.pool.declare_exchange(self.channel, exchange)
             
             logger.info(f"✅ Conectado a RabbitMQ en {self.config.get('host')}:{self.config.get('port')}")
             
@@ -73,6 +388,9 @@ class RabbitMQSender:
         """
         Enviar mensaje con información del PDF y correo
         
+        Se publica sin esperar confirmación del broker; para confirmaciones
+        usar send_pdf_message_batch o BackgroundPdfPublisher.
+        
         Args:
             pdf_path: Ruta local del PDF descargado
             email_info: Información del correo (asunto, remitente, etc.)
@@ -81,59 +399,64 @@ class RabbitMQSender:
             bool: True si se envió correctamente
         """
         try:
-            # Verificar que el archivo existe
-            pdf_file = Path(pdf_path)
-            if not pdf_file.exists():
-                logger.error(f"❌ El archivo PDF no existe: {pdf_path}")
+            message = _build_pdf_message(pdf_path, email_info)
+            if message is None:
                 return False
             
-            # Crear mensaje
-            message = {
-                "host_absolute_path": str(pdf_file.absolute()),
-                "file_name": pdf_file.name,
-                "original_name": pdf_file.name,
-                "email_info": {
-                    "subject": email_info.get('subject', ''),
-                    "sender": email_info.get('sender', ''),
-                    "received_date": email_info.get('received_date', ''),
-                    "folder": email_info.get('folder', ''),
-                    "message_id": email_info.get('message_id', ''),
-                    "has_attachments": email_info.get('has_attachments', False),
-                    "attachment_count": email_info.get('attachment_count', 0)
-                },
-                "processing_info": {
-                    "source": "robot001_outlook",
-                    "timestamp": datetime.now().isoformat(),
-                    "robot_id": "robot001"
-                }
-            }
-            
-            # Convertir a JSON
-            message_json = json.dumps(message, ensure_ascii=False)
-            
-            # Enviar mensaje
             queue_name = self.config.get('queue_name', 'pdf_processing_queue')
-            routing_key = self.config.get('routing_key', queue_name)
-            
-            self.channel.basic_publish(
-                exchange=self.config.get('exchange', ''),
-                routing_key=routing_key,
-                body=message_json.encode('utf-8'),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Hacer el mensaje persistente
-                    content_type='application/json'
+            with self.pool.pooled_channel() as channel:
+                channel.basic_publish(
+                    exchange=self.config.get('exchange', ''),
+                    routing_key=self.config.get('routing_key', queue_name),
+                    body=_encode_pdf_envelope(message, _timestamp()),
+                    properties=_PERSISTENT_JSON
                 )
-            )
-            
-            logger.info(f"✅ Mensaje enviado a RabbitMQ: {pdf_file.name}")
-            logger.debug(f"Mensaje: {message}")
             
+            logger.info(f"✅ Mensaje enviado a RabbitMQ: {message['file_name']}")
             return True
             
         except Exception as e:
             logger.error(f"❌ Error enviando mensaje a RabbitMQ: {e}")
             return False
     
+    def send_pdf_message_batch(self, items: List[Tuple[str, Dict[str, Any]]],
+                               batch_size: Optional[int] = None) -> int:
+        """
+        Enviar varios PDFs con publisher confirms
+        
+        Los mensajes se publican seguidos por la conexión asíncrona de
+        BackgroundPdfPublisher (creada en el primer uso) y se espera una sola
+        vez por tanda de batch_size a que el broker los confirme. Los
+        rechazados (nack) se reenvían una vez.
+        
+        Args:
+            items: Lista de tuplas (ruta del PDF, información del correo)
+            batch_size: Mensajes por tanda (por defecto RABBITMQ_CONFIRM_BATCH_SIZE)
+            
+        Returns:
+            int: Número de mensajes confirmados por el broker
+            
+        Raises:
+            RuntimeError: Si se perdió la conexión de publicación
+        """
+        batch_size = batch_size or CONFIRM_BATCH_SIZE
+        if self._confirm_publisher is None:
+            self._confirm_publisher = BackgroundPdfPublisher(self.config)
+        publisher = self._confirm_publisher
+        
+        confirmed_before = publisher.confirmed
+        in_flight = 0
+        for pdf_path, email_info in items:
+            if publisher.publish(pdf_path, email_info):
+                in_flight += 1
+            if in_flight >= batch_size:
+                publisher.flush()
+                in_flight = 0
+        if in_flight:
+            publisher.flush()
+        
+        return publisher.confirmed - confirmed_before
+    
     def send_email_summary(self, email_summary: Dict[str, Any]) -> bool:
         """
         Enviar resumen de correo procesado
@@ -145,28 +468,16 @@ class RabbitMQSender:
             bool: True si se envió correctamente
         """
         try:
-            message = {
-                "type": "email_summary",
-                "data": email_summary,
-                "timestamp": datetime.now().isoformat(),
-                "robot_id": "robot001"
-            }
-            
-            message_json = json.dumps(message, ensure_ascii=False)
-            
-            # Enviar a cola de resúmenes
-            summary_queue = self.config.get('summary_queue', 'email_summary_queue')
-            self.channel.queue_declare(queue=summary_queue, durable=True)
-            
-            self.channel.basic_publish(
-                exchange='',
-                routing_key=summary_queue,
-                body=message_json.encode('utf-8'),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                    content_type='application/json'
+            body = _encode_summary_envelope(email_summary, _timestamp())
+            
+            # Enviar a cola de resúmenes (declarada en _connect)
+            with self.pool.pooled_channel() as channel:
+                channel.basic_publish(
+                    exchange='',
+                    routing_key=self.summary_queue,
+                    body=body,
+                    properties=_PERSISTENT_JSON
                 )
-            )
             
             logger.info(f"✅ Resumen de correo enviado a RabbitMQ")
             return True
@@ -176,10 +487,18 @@ class RabbitMQSender:
             return False
     
     def close(self):
-        """Cerrar conexión con RabbitMQ"""
+        """Liberar el canal y cerrar la conexión si ningún otro sender la usa"""
         try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
+            if self._confirm_publisher is not None:
+                self._confirm_publisher.close()
+                self._confirm_publisher = None
+            if self.pool is None:
+                return
+            if self.channel is not None:
+                self.pool.close_channel(self.channel)
+                self.channel = None
+            pool, self.pool = self.pool, None
+            if pool.release():
                 logger.info("✅ Conexión con RabbitMQ cerrada")
         except Exception as e:
             logger.error(f"❌ Error cerrando conexión con RabbitMQ: {e}")
@@ -189,3 +508,290 @@ class RabbitMQSender:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+
+class BackgroundPdfPublisher:
+    """
+    Publica mensajes desde un hilo de IO con publisher confirms asíncronos
+    
+    El hilo mantiene su propia pika.SelectConnection. publish() encola el
+    mensaje y lo entrega al hilo con add_callback_threadsafe, así que retorna
+    sin esperar al broker. Cada publicación queda registrada por su delivery
+    tag hasta que llega el ack/nack correspondiente (que puede confirmar varios
+    a la vez con multiple=True); los rechazados se reenvían una vez. flush()
+    espera una sola vez a que se confirme todo lo enviado.
+    
+    Si la conexión o el canal se cierran por un error, los mensajes pendientes
+    y los no confirmados se cuentan como fallidos y publish()/flush() lanzan
+    RuntimeError con el error original como causa.
+    """
+    
+    def __init__(self, rabbitmq_config: Dict[str, Any]):
+        """
+        Arrancar el hilo de IO y esperar a que el canal esté listo
+        
+        Args:
+            rabbitmq_config: Configuración de RabbitMQ (ver RabbitMQSender)
+            
+        Raises:
+            Exception: El error de conexión, si el hilo no pudo conectarse
+        """
+        self.config = {**_PUBLISHER_DEFAULTS, **rabbitmq_config}
+        self.queue_name = self.config.get('queue_name', 'pdf_processing_queue')
+        self.routing_key = self.config.get('routing_key', self.queue_name)
+        self.exchange = self.config.get('exchange', '')
+        self.confirmed = 0
+        self.failed = 0
+        self._submitted = 0
+        self._processed = 0
+        # Mensajes aceptados por publish() que el hilo de IO aún no publicó
+        self._pending = queue.SimpleQueue()
+        # delivery tag -> (etiqueta, routing key, cuerpo, intentos); solo lo usa el hilo de IO
+        self._unconfirmed: Dict[int, Tuple[str, str, bytes, int]] = {}
+        self._next_tag = 0
+        self._progress = threading.Condition()
+        self._ready = threading.Event()
+        self._error = None
+        self._closing = False
+        self._stopped = False
+        self._connection = None
+        self._channel = None
+        self._thread = threading.Thread(target=self._run, name="rabbitmq-pdf-publisher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+    
+    def _check_alive(self):
+        """Lanzar RuntimeError si ya no se aceptan mensajes (con _progress tomado)"""
+        if self._error is not None:
+            raise RuntimeError(f"El hilo de publicación terminó por un error: {self._error}") from self._error
+        if self._stopped or self._closing:
+            raise RuntimeError("El publicador de PDFs está cerrado")
+    
+    def publish_message(self, body: bytes, routing_key: Optional[str] = None, label: str = "mensaje"):
+        """
+        Encolar un mensaje ya serializado para publicarlo en segundo plano
+        
+        Args:
+            body: Cuerpo JSON del mensaje
+            routing_key: Routing key (por defecto la de la configuración)
+            label: Nombre con el que aparece el mensaje en el log
+            
+        Raises:
+            RuntimeError: Si el hilo de publicación ya terminó
+        """
+        with self._progress:
+            self._check_alive()
+            self._submitted += 1
+            self._pending.put((label, routing_key or self.routing_key, body))
+            # Dentro del lock: el hilo no puede cerrar el ioloop entre la comprobación y el aviso
+            self._connection.ioloop.add_callback_threadsafe(self._drain)
+    
+    def publish_json(self, message: Dict[str, Any], routing_key: Optional[str] = None, label: str = "mensaje"):
+        """Encolar un mensaje JSON (ver publish_message)"""
+        self.publish_message(_dumps(message), routing_key, label)
+    
+    def publish(self, pdf_path: str, email_info: Dict[str, Any]) -> bool:
+        """
+        Encolar el mensaje de un PDF para publicarlo en segundo plano
+        
+        Returns:
+            bool: False si el PDF no existe (no se encola nada)
+            
+        Raises:
+            RuntimeError: Si el hilo de publicación ya terminó
+        """
+        message = _build_pdf_message(pdf_path, email_info)
+        if message is None:
+            return False
+        self.publish_message(_encode_pdf_envelope(message, _timestamp()), label=message["file_name"])
+        return True
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que el broker confirme (o rechace) todo lo encolado
+        
+        Returns:
+            bool: True si no quedan mensajes pendientes
+            
+        Raises:
+            RuntimeError: Si el hilo de publicación terminó por un error
+        """
+        with self._progress:
+            done = self._progress.wait_for(lambda: self._processed >= self._submitted, timeout)
+            if self._error is not None:
+                self._check_alive()
+            return done
+    
+    def close(self, timeout: Optional[float] = None):
+        """Esperar las confirmaciones pendientes y cerrar la conexión"""
+        with self._progress:
+            if self._stopped or self._closing:
+                already_closing = True
+            else:
+                already_closing = False
+                self._closing = True
+        if not already_closing:
+            try:
+                self.flush(timeout)
+            except RuntimeError:
+                pass
+            with self._progress:
+                if not self._stopped:
+                    self._connection.ioloop.add_callback_threadsafe(self._close_connection)
+        self._thread.join(timeout)
+    
+    # ---- Hilo de IO ----
+    
+    def _run(self):
+        """Bucle del hilo: atiende la conexión hasta que se cierra"""
+        try:
+            self._connection = pika.SelectConnection(
+                RabbitMQConnectionPool._build_parameters(self.config),
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed
+            )
+            self._connection.ioloop.start()
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._fail_pending()
+            self._ready.set()
+    
+    def _fail(self, error: BaseException):
+        """Registrar el primer error que detiene la publicación"""
+        with self._progress:
+            if self._error is None:
+                logger.error(f"❌ El hilo de publicación de PDFs terminó por un error: {error}")
+                self._error = error
+            self._progress.notify_all()
+    
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+    
+    def _on_connection_open_error(self, connection, error):
+        self._fail(error)
+        connection.ioloop.stop()
+    
+    def _on_connection_closed(self, connection, reason):
+        if not self._closing:
+            self._fail(reason)
+        connection.ioloop.stop()
+    
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(ack_nack_callback=self._on_delivery_confirmation,
+                                 callback=self._on_confirm_mode)
+    
+    def _on_confirm_mode(self, frame):
+        self._channel.queue_declare(queue=self.queue_name, durable=True, callback=self._on_queue_declared)
+    
+    def _on_queue_declared(self, frame):
+        if self.exchange:
+            self._channel.exchange_declare(exchange=self.exchange, exchange_type='direct',
+                                           callback=self._on_channel_ready)
+        else:
+            self._on_channel_ready(frame)
+    
+    def _on_channel_ready(self, frame):
+        logger.info(f"✅ Publicador de PDFs conectado a RabbitMQ en {self.config.get('host')}:{self.config.get('port')}")
+        self._ready.set()
+        self._drain()
+    
+    def _on_channel_closed(self, channel, reason):
+        if not self._closing:
+            self._fail(reason)
+        self._close_connection()
+    
+    def _close_connection(self):
+        if self._connection.is_open:
+            self._connection.close()
+    
+    def _drain(self):
+        """Publicar todo lo encolado (el canal puede no estar listo todavía)"""
+        if self._channel is None or not self._channel.is_open or not self._ready.is_set():
+            return
+        while True:
+            try:
+                label, routing_key, body = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            self._basic_publish(label, routing_key, body, 1)
+    
+    def _basic_publish(self, label: str, routing_key: str, body: bytes, attempt: int):
+        """Publicar un mensaje y registrarlo con su delivery tag hasta que se confirme"""
+        try:
+            self._channel.basic_publish(exchange=self.exchange, routing_key=routing_key,
+                                        body=body, properties=_PERSISTENT_JSON)
+        except Exception:
+            self._record(0, 1)
+            raise
+        # Con confirms activos el broker numera las publicaciones del canal desde 1
+        self._next_tag += 1
+        self._unconfirmed[self._next_tag] = (label, routing_key, body, attempt)
+    
+    def _on_delivery_confirmation(self, frame):
+        """Ack/nack del broker: con multiple=True cubre todos los tags hasta delivery_tag"""
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            # Los tags se insertan en orden creciente, así que basta con recorrer el principio
+            tags = list(takewhile(lambda tag: tag <= method.delivery_tag, self._unconfirmed))
+        else:
+            tags = [method.delivery_tag]
+        
+        confirmed = failed = 0
+        for tag in tags:
+            entry = self._unconfirmed.pop(tag, None)
+            if entry is None:
+                continue
+            label, routing_key, body, attempt = entry
+            if acked:
+                confirmed += 1
+                logger.info(f"✅ Mensaje enviado a RabbitMQ: {label}")
+            elif attempt < _MAX_PUBLISH_ATTEMPTS:
+                # Reenvío: sigue pendiente, con un delivery tag nuevo
+                logger.warning(f"⚠️ RabbitMQ rechazó el mensaje, se reenvía: {label}")
+                self._basic_publish(label, routing_key, body, attempt + 1)
+            else:
+                failed += 1
+                logger.error(f"❌ RabbitMQ rechazó el mensaje: {label}")
+        if confirmed or failed:
+            self._record(confirmed, failed)
+    
+    def _record(self, confirmed: int, failed: int):
+        """Sumar mensajes resueltos a los contadores y despertar a flush()"""
+        with self._progress:
+            self.confirmed += confirmed
+            self.failed += failed
+            self._processed += confirmed + failed
+            self._progress.notify_all()
+    
+    def _fail_pending(self):
+        """Marcar el publicador como detenido y contar lo no confirmado como fallido"""
+        with self._progress:
+            self._stopped = True
+            lost = len(self._unconfirmed)
+            self._unconfirmed.clear()
+            while True:
+                try:
+                    self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                lost += 1
+            if lost:
+                logger.error(f"❌ {lost} mensajes de PDF no se confirmaron")
+            self.failed += lost
+            self._processed += lost
+            self._progress.notify_all()
+            if self._connection is not None:
+                self._connection.ioloop.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,171 @@
+"""
+Pruebas para la lectura de carpetas de Outlook (sesión de Graph simulada)
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+import outlook.folder_reader as folder_reader
+
+
+def _response(payload, status=200):
+    """Respuesta de requests simulada con el JSON indicado"""
+    response = Mock()
+    response.status_code = status
+    response.ok = status < 400
+    response.json.return_value = payload
+    response.content = b"{}"
+    response.text = ""
+    return response
+
+
+def _message(message_id, sender, subject, received="2024-01-15T10:30:00Z"):
+    return {
+        'id': message_id,
+        'subject': subject,
+        'from': {'emailAddress': {'address': sender}},
+        'receivedDateTime': received,
+    }
+
+
+class TestFolderFilters(unittest.TestCase):
+    """Pruebas del filtrado de mensajes de una carpeta"""
+
+    def setUp(self):
+        self.session = Mock()
+        for target, value in (('outlook.folder_reader.get_authenticated_session', Mock(return_value=self.session)),
+                              ('outlook.folder_reader.get_folder_id', Mock(return_value='folder-1')),
+                              ('outlook.folder_reader.response_json', lambda response: response.json())):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_default_keeps_substring_matches(self):
+        """Sin server_side no se pierde ningún mensaje que aceptan los filtros locales"""
+        messages = [
+            _message('1', 'ana@empresa.com', 'Prenotificación de pago'),
+            _message('2', 'jefe@subempresa.com', 'NOTIFICACIÓN'),
+            _message('3', 'spam@otro.com', 'notificación'),
+            _message('4', 'ana@empresa.com', 'Sin palabra clave'),
+        ]
+        self.session.get.return_value = _response({'value': messages})
+
+        result = folder_reader.get_messages_from_folder_with_filter(
+            'Iniciativa4', allowed_senders=['empresa.com'], subject_keywords=['notificación'])
+
+        params = self.session.get.call_args.kwargs['params']
+        self.assertNotIn('$search', params)
+        expected = folder_reader.filter_folder_messages(
+            messages, allowed_senders=['empresa.com'], subject_keywords=['notificación'])
+        self.assertEqual(result, expected)
+        self.assertEqual([m['id'] for m in result], ['1', '2'])
+
+    def test_server_side_is_opt_in(self):
+        """Con server_side=True se envía $search y se vuelven a aplicar los filtros locales"""
+        messages = [
+            _message('1', 'ana@empresa.com', 'Notificación', '2024-01-14T10:00:00Z'),
+            _message('2', 'ana@empresa.com', 'Otra cosa', '2024-01-15T10:00:00Z'),
+        ]
+        self.session.get.return_value = _response({'value': messages})
+
+        result = folder_reader.get_messages_from_folder_with_filter(
+            'Iniciativa4', allowed_senders=['@empresa.com'], subject_keywords=['notificación'],
+            server_side=True)
+
+        params = self.session.get.call_args.kwargs['params']
+        self.assertEqual(params['$search'], '"(from:empresa.com) AND (subject:notificación)"')
+        self.assertEqual([m['id'] for m in result], ['1'])
+
+    def test_null_sender_address(self):
+        """Un remitente con address null no rompe el filtrado"""
+        message = _message('1', None, 'Notificación')
+        self.assertEqual(folder_reader.filter_folder_messages([message], subject_keywords=['notificación']),
+                         [message])
+        self.assertEqual(folder_reader.filter_folder_messages([message], allowed_senders=['empresa.com']), [])
+        self.assertEqual(folder_reader.filter_folder_messages([message], blocked_senders=['spam.com']),
+                         [message])
+
+
+class TestMessagesDelta(unittest.TestCase):
+    """Pruebas de la sincronización incremental con /messages/delta"""
+
+    def setUp(self):
+        self.session = Mock()
+        for target, value in (('outlook.folder_reader.get_authenticated_session', Mock(return_value=self.session)),
+                              ('outlook.folder_reader.response_json', lambda response: response.json())):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = os.path.join(tmp_dir.name, 'delta_links.json')
+
+    def _stored_links(self):
+        with open(self.cache_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_follows_next_link_and_stores_delta_link(self):
+        """Se recorren todas las páginas y se guarda el deltaLink final"""
+        self.session.get.side_effect = [
+            _response({'value': [{'id': '1'}], '@odata.nextLink': 'https://graph/next'}),
+            _response({'value': [{'id': '2'}], '@odata.deltaLink': 'https://graph/delta?token=a'}),
+        ]
+
+        messages = folder_reader.get_messages_delta('folder-1', self.cache_path, select=['id', 'subject'])
+
+        self.assertEqual([m['id'] for m in messages], ['1', '2'])
+        first, second = self.session.get.call_args_list
+        self.assertTrue(first.args[0].endswith('/mailFolders/folder-1/messages/delta'))
+        self.assertEqual(first.kwargs['params'], {'$select': 'id,subject'})
+        self.assertEqual(second.args[0], 'https://graph/next')
+        self.assertIsNone(second.kwargs['params'])
+        self.assertEqual(self._stored_links(), {'folder-1': 'https://graph/delta?token=a'})
+
+    def test_reuses_stored_delta_link(self):
+        """La siguiente llamada reanuda desde el deltaLink guardado y lo actualiza"""
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'folder-1': 'https://graph/delta?token=a', 'otra': 'https://graph/delta?token=x'}, f)
+        self.session.get.return_value = _response(
+            {'value': [{'id': '3', '@removed': {'reason': 'deleted'}}],
+             '@odata.deltaLink': 'https://graph/delta?token=b'})
+
+        messages = folder_reader.get_messages_delta('folder-1', self.cache_path, select=['id'])
+
+        self.assertEqual(messages, [{'id': '3', '@removed': {'reason': 'deleted'}}])
+        self.session.get.assert_called_once_with('https://graph/delta?token=a', params=None)
+        self.assertEqual(self._stored_links(), {'folder-1': 'https://graph/delta?token=b',
+                                                'otra': 'https://graph/delta?token=x'})
+
+    def test_expired_delta_link_restarts_sync(self):
+        """Un 410 descarta el deltaLink guardado y repite la sincronización completa"""
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'folder-1': 'https://graph/delta?token=viejo'}, f)
+        self.session.get.side_effect = [
+            _response({}, status=410),
+            _response({'value': [{'id': '1'}], '@odata.deltaLink': 'https://graph/delta?token=nuevo'}),
+        ]
+
+        with self.assertLogs('folder_reader', level='WARNING'):
+            messages = folder_reader.get_messages_delta('folder-1', self.cache_path)
+
+        self.assertEqual([m['id'] for m in messages], ['1'])
+        expired, restarted = self.session.get.call_args_list
+        self.assertEqual(expired.args[0], 'https://graph/delta?token=viejo')
+        self.assertTrue(restarted.args[0].endswith('/mailFolders/folder-1/messages/delta'))
+        self.assertEqual(self._stored_links(), {'folder-1': 'https://graph/delta?token=nuevo'})
+
+    def test_410_without_stored_link_does_not_loop(self):
+        """Un 410 en la sincronización inicial se registra como error sin reintentar"""
+        self.session.get.return_value = _response({}, status=410)
+        with self.assertLogs('folder_reader', level='ERROR'):
+            messages = folder_reader.get_messages_delta('folder-1', self.cache_path)
+
+        self.assertEqual(messages, [])
+        self.session.get.assert_called_once()
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
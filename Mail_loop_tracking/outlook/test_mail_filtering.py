@@ -83,6 +83,14 @@ class TestMessageFilter(unittest.TestCase):
         }
         self.assertFalse(filtro.filter_message(mensaje_sin_keyword))
     
+    def test_filter_subject_keywords_case_insensitive(self):
+        """Prueba que las palabras clave ignoran mayúsculas y caracteres especiales"""
+        filtro = MessageFilter(subject_keywords=["NOTIFICACIÓN", "c++"])
+        
+        self.assertTrue(filtro.is_subject_valid('Nueva notificación de pago'))
+        self.assertTrue(filtro.is_subject_valid('Curso de C++'))
+        self.assertFalse(filtro.is_subject_valid('Curso de C'))
+    
     def test_filter_subject_exclude_keywords(self):
         """Prueba filtrado por palabras excluidas en el subject"""
         # Configurar filtro con palabras excluidas
@@ -143,6 +151,41 @@ class TestMessageFilter(unittest.TestCase):
         }
         self.assertTrue(filtro.filter_message(mensaje))
     
+    def test_filter_messages_batch(self):
+        """Prueba que el filtrado por lotes coincide con el filtrado individual"""
+        filtro = MessageFilter(
+            allowed_senders=["@empresa.com"],
+            blocked_senders=["noreply@"],
+            subject_keywords=["urgente"],
+            subject_exclude_keywords=["spam"]
+        )
+
+        mensajes = [
+            {'id': '1', 'from': {'emailAddress': {'address': 'jefe@empresa.com'}}, 'subject': 'Urgente'},
+            {'id': '2', 'from': {'emailAddress': {'address': 'noreply@empresa.com'}}, 'subject': 'urgente'},
+            {'id': '3', 'from': {'emailAddress': {'address': 'jefe@otro.com'}}, 'subject': 'urgente'},
+            {'id': '4', 'from': {'emailAddress': {'address': 'jefe@empresa.com'}}, 'subject': 'spam urgente'},
+            {'id': '5', 'from': {'emailAddress': {'address': 'jefe@empresa.com'}}, 'subject': ''},
+            {'id': '6', 'from': {}, 'subject': 'urgente'}
+        ] * 2
+
+        esperados = [m for m in mensajes if filtro.filter_message(m)]
+        self.assertEqual(filtro.filter_messages(mensajes), esperados)
+        self.assertEqual([m['id'] for m in esperados], ['1', '1'])
+        
+        # Los lotes pequeños se evalúan mensaje a mensaje con el mismo resultado
+        self.assertEqual(filtro.filter_messages(mensajes[:6]), esperados[:1])
+
+    def test_filter_messages_null_sender(self):
+        """Prueba que un remitente con address null se rechaza igual en lote que uno a uno"""
+        filtro = MessageFilter(subject_keywords=["urgente"])
+        nulo = {'id': 'nulo', 'from': {'emailAddress': {'address': None}}, 'subject': 'urgente'}
+        valido = {'id': 'ok', 'from': {'emailAddress': {'address': 'jefe@empresa.com'}}, 'subject': 'urgente'}
+        self.assertFalse(filtro.filter_message(nulo))
+
+        with patch('mail_reader.BATCH_FILTER_MIN_SIZE', 2):
+            self.assertEqual(filtro.filter_messages([nulo, valido, nulo]), [valido])
+
     def test_extract_sender_email(self):
         """Prueba la extracción del email del remitente"""
         filtro = MessageFilter()
@@ -176,6 +219,23 @@ class TestPredefinedFilters(unittest.TestCase):
         with self.assertRaises(ValueError):
             get_predefined_filter("filtro_inexistente")
     
+    def test_predefined_filter_lists_can_be_extended(self):
+        """Prueba que lo añadido a las listas de un filtro ya creado se aplica"""
+        filtro = get_predefined_filter("Mail_Classification")
+        mensaje = {
+            'subject': 'Factura de septiembre',
+            'from': {'emailAddress': {'address': 'cliente@empresa.com'}}
+        }
+        self.assertFalse(filtro.filter_message(mensaje))
+
+        filtro.subject_keywords.append("factura")
+        self.assertTrue(filtro.filter_message(mensaje))
+        self.assertEqual(filtro.filter_messages([mensaje] * 10), [mensaje] * 10)
+
+        filtro.blocked_senders.append("@empresa.com")
+        self.assertFalse(filtro.filter_message(mensaje))
+        self.assertEqual(filtro.filter_messages([mensaje] * 10), [])
+
     def test_combine_filters(self):
         """Prueba combinar filtros"""
         filtro1 = MessageFilter(allowed_senders=["@empresa.com"])
@@ -243,11 +303,12 @@ def run_tests():
     
     # Crear suite de pruebas
     test_suite = unittest.TestSuite()
+    loader = unittest.TestLoader()
     
     # Agregar pruebas
-    test_suite.addTest(unittest.makeSuite(TestMessageFilter))
-    test_suite.addTest(unittest.makeSuite(TestPredefinedFilters))
-    test_suite.addTest(unittest.makeSuite(TestIntegration))
+    test_suite.addTest(loader.loadTestsFromTestCase(TestMessageFilter))
+    test_suite.addTest(loader.loadTestsFromTestCase(TestPredefinedFilters))
+    test_suite.addTest(loader.loadTestsFromTestCase(TestIntegration))
     
     # Ejecutar pruebas
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,190 @@
+"""
+Pruebas para la lectura de correos de Gmail por lotes (servicio simulado)
+"""
+import base64
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import parser
+
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+
+class FakeResp(dict):
+    """Respuesta httplib2 simulada: cabeceras en minúsculas y atributo status"""
+
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    """Equivalente mínimo de googleapiclient.errors.HttpError"""
+
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = FakeResp(status, headers)
+
+
+class FakeBatch:
+    """Lote simulado: al ejecutarse entrega el siguiente resultado de cada petición"""
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append([request_id for request_id, _ in self.requests])
+        for request_id, request in self.requests:
+            outcome = self.service.outcomes[request].pop(0)
+            if isinstance(outcome, Exception):
+                self.callback(request_id, None, outcome)
+            else:
+                self.callback(request_id, outcome, None)
+
+
+class FakeService:
+    """
+    Servicio de Gmail simulado. outcomes: {petición: [resultados en orden]},
+    donde cada petición es ('msg', id) o ('att', id_mensaje, id_adjunto)
+    """
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.batches = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def attachments(self):
+        return _FakeAttachments()
+
+    def get(self, userId, id, format=None):
+        return ('msg', id)
+
+
+class _FakeAttachments:
+    def get(self, userId, messageId, id):
+        return ('att', messageId, id)
+
+
+def _mensaje(asunto):
+    return {'payload': {'headers': [{'name': 'Subject', 'value': asunto},
+                                    {'name': 'From', 'value': 'a@b.com'}]}}
+
+
+class TestLotesGmail(unittest.TestCase):
+    """Pruebas de las sub-peticiones fallidas en los lotes de Gmail"""
+
+    def setUp(self):
+        patcher = patch('parser.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reintenta_429_respetando_retry_after(self):
+        """Un 429 se reintenta tras esperar lo indicado por Retry-After"""
+        service = FakeService({
+            ('msg', '1'): [_mensaje('uno')],
+            ('msg', '2'): [FakeHttpError(429, {'retry-after': '7'}), _mensaje('dos')],
+        })
+        with self.assertLogs('parser', level='WARNING'):
+            info = parser.extraer_info_mensajes_batch(service, ['1', '2'])
+
+        self.assertEqual(info, {'1': ('uno', 'a@b.com', ''), '2': ('dos', 'a@b.com', '')})
+        self.assertEqual(service.batches, [['1', '2'], ['2']])
+        self.sleep.assert_called_once_with(7.0)
+
+    def test_error_permanente_se_registra(self):
+        """Un 404 no se reintenta, pero queda registrado en el log"""
+        service = FakeService({
+            ('msg', '1'): [FakeHttpError(404)],
+            ('msg', '2'): [_mensaje('dos')],
+        })
+        with self.assertLogs('parser', level='ERROR') as logs:
+            info = parser.extraer_info_mensajes_batch(service, ['1', '2'])
+
+        self.assertEqual(list(info), ['2'])
+        self.assertEqual(service.batches, [['1', '2']])
+        self.assertTrue(any('1' in linea and '404' in linea for linea in logs.output))
+        self.sleep.assert_not_called()
+
+    def test_agota_reintentos(self):
+        """Tras LOTE_REINTENTOS fallos temporales la petición se registra como error"""
+        fallos = [FakeHttpError(503) for _ in range(parser.LOTE_REINTENTOS + 1)]
+        service = FakeService({('msg', '1'): fallos})
+        with self.assertLogs('parser', level='ERROR'):
+            info = parser.extraer_info_mensajes_batch(service, ['1'])
+
+        self.assertEqual(info, {})
+        self.assertEqual(len(service.batches), parser.LOTE_REINTENTOS + 1)
+        # Sin Retry-After la espera crece exponencialmente
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [1, 2, 4])
+
+    def test_adjuntos_reintentados(self):
+        """Los adjuntos con error temporal se descargan en el reintento"""
+        mensaje = {'payload': {'parts': [
+            {'filename': 'a.pdf', 'body': {'attachmentId': 'x', 'size': 10}},
+            {'filename': 'b.pdf', 'body': {'attachmentId': 'y', 'size': 10}},
+        ]}}
+        service = FakeService({
+            ('msg', 'm'): [mensaje],
+            ('att', 'm', 'x'): [{'data': 'YQ=='}],
+            ('att', 'm', 'y'): [FakeHttpError(500), {'data': 'Yg=='}],
+        })
+        with patch('parser._guardar_adjunto', side_effect=lambda data, nombre, carpeta: nombre):
+            with self.assertLogs('parser', level='WARNING'):
+                rutas = parser.descargar_adjuntos_batch(service, ['m'], '/tmp')
+
+        self.assertEqual(sorted(rutas), ['a.pdf', 'b.pdf'])
+
+
+class TestGuardarAdjunto(unittest.TestCase):
+    """Pruebas de la decodificación por bloques de los adjuntos"""
+
+    # Bytes que en base64 url-safe usan '-' y '_', más texto no ASCII
+    CONTENIDO = bytes(range(256)) * 3 + 'Notificación'.encode('utf-8')
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.carpeta = tmp_dir.name
+        self.data = base64.urlsafe_b64encode(self.CONTENIDO).decode()
+
+    def _leer(self, ruta):
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    def test_bloques_reconstruyen_el_archivo(self):
+        """Decodificar por bloques produce el mismo archivo que decodificar de una vez"""
+        with patch('parser.B64_CHUNK_SIZE', 8):
+            ruta = parser._guardar_adjunto(self.data, 'mi adjunto.pdf', self.carpeta)
+        self.assertEqual(self._leer(ruta), self.CONTENIDO)
+        self.assertTrue(os.path.basename(ruta).endswith('_mi_adjunto.pdf'))
+
+    @unittest.skipIf(pybase64 is None, "pybase64 no está instalado")
+    def test_pybase64_igual_que_base64(self):
+        """pybase64 y la librería estándar escriben los mismos bytes"""
+        self.assertIs(parser._urlsafe_b64decode, pybase64.urlsafe_b64decode)
+        rutas = [parser._guardar_adjunto(self.data, 'a.pdf', self.carpeta)]
+        with patch('parser._urlsafe_b64decode', base64.urlsafe_b64decode):
+            rutas.append(parser._guardar_adjunto(self.data, 'b.pdf', self.carpeta))
+        self.assertEqual(self._leer(rutas[0]), self._leer(rutas[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,435 @@
+"""
+Pruebas para el envío de mensajes a RabbitMQ (sin broker: conexión simulada)
+"""
+import json
+import queue
+from datetime import date, datetime, timezone
+import tempfile
+import time
+import types
+import unittest
+from unittest.mock import patch
+
+import pika
+
+import rabbitmq_sender
+from rabbitmq_sender import BackgroundPdfPublisher, RabbitMQConnectionPool, RabbitMQSender
+
+
+# Mensajes con los tipos que orjson y la librería estándar tratan distinto
+_SERIALIZATION_CASES = [
+    {'subject': 'Notificación — año 2024 ✓', 'sender': 'ana@empresa.com', 'attachment_count': 2},
+    {'has_attachments': False, 'folder': None, 'nested': {'list': [1, 'dos', None, True]}},
+    {1: 'uno', 2.5: 'dos', False: 'tres', None: 'cuatro'},
+    {'received': datetime(2024, 1, 15, 10, 30, 0, 123456), 'day': date(2024, 1, 15),
+     'utc': datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)},
+    {},
+]
+
+
+class FakeChannel:
+    """Canal simulado que registra lo publicado"""
+
+    def __init__(self):
+        self.is_open = True
+        self.confirming = False
+        self.published = []
+
+    def confirm_delivery(self):
+        self.confirming = True
+
+    def queue_declare(self, queue, durable):
+        pass
+
+    def exchange_declare(self, exchange, exchange_type):
+        pass
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.published.append((exchange, routing_key, body))
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeConnection:
+    """Conexión simulada: cada channel() abre un FakeChannel nuevo"""
+
+    def __init__(self, parameters=None):
+        self.is_closed = False
+        self.channels = []
+
+    def channel(self):
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        self.is_closed = True
+
+
+class TestJsonSerialization(unittest.TestCase):
+    """Pruebas de la serialización de mensajes con y sin orjson"""
+
+    def test_stdlib_serialization(self):
+        """La librería estándar admite claves no str y fechas, como orjson"""
+        body = rabbitmq_sender._dumps_stdlib(_SERIALIZATION_CASES[3])
+        self.assertEqual(json.loads(body), {
+            'received': '2024-01-15T10:30:00.123456',
+            'day': '2024-01-15',
+            'utc': '2024-01-15T10:30:00+00:00',
+        })
+        self.assertEqual(json.loads(rabbitmq_sender._dumps_stdlib(_SERIALIZATION_CASES[2])),
+                         {'1': 'uno', '2.5': 'dos', 'false': 'tres', 'null': 'cuatro'})
+        self.assertIn('año'.encode('utf-8'), rabbitmq_sender._dumps_stdlib(_SERIALIZATION_CASES[0]))
+        with self.assertRaises(TypeError):
+            rabbitmq_sender._dumps_stdlib({'valor': object()})
+
+    @unittest.skipIf(rabbitmq_sender.orjson is None, "orjson no está instalado")
+    def test_orjson_matches_stdlib(self):
+        """orjson y la librería estándar generan el mismo JSON para cada mensaje"""
+        for case in _SERIALIZATION_CASES:
+            self.assertEqual(json.loads(rabbitmq_sender._dumps(case)),
+                             json.loads(rabbitmq_sender._dumps_stdlib(case)), case)
+
+    def test_envelopes_are_identical_with_both_serializers(self):
+        """Los sobres de PDF y de resumen son el mismo JSON con cualquiera de los dos"""
+        serializers = [rabbitmq_sender._dumps_stdlib]
+        if rabbitmq_sender.orjson is not None:
+            serializers.append(rabbitmq_sender._dumps)
+
+        for case in _SERIALIZATION_CASES:
+            payloads = []
+            for dumps in serializers:
+                with patch('rabbitmq_sender._dumps', dumps):
+                    payloads.append((
+                        json.loads(rabbitmq_sender._encode_pdf_envelope(case, '2024-01-15T10:30:00.000001')),
+                        json.loads(rabbitmq_sender._encode_summary_envelope(case, '2024-01-15T10:30:00.000001')),
+                    ))
+            pdf, summary = payloads[0]
+            self.assertEqual(pdf['processing_info'], {'source': 'robot001_outlook', 'robot_id': 'robot001',
+                                                      'timestamp': '2024-01-15T10:30:00.000001'})
+            self.assertEqual(summary['data'], json.loads(rabbitmq_sender._dumps_stdlib(case)))
+            self.assertTrue(all(payload == payloads[0] for payload in payloads), case)
+
+
+class TestRabbitMQConnectionPool(unittest.TestCase):
+    """Pruebas del pool de canales"""
+
+    def setUp(self):
+        patcher = patch('rabbitmq_sender.pika.BlockingConnection', FakeConnection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(RabbitMQConnectionPool._pools.clear)
+
+    def test_acquire_over_cap_opens_extra_channel(self):
+        """Con el pool lleno se abre un canal adicional en lugar de bloquear"""
+        pool = RabbitMQConnectionPool({}, max_channels=1)
+        first = pool.acquire_channel()
+        extra = pool.acquire_channel()
+        self.assertIsNot(first, extra)
+        self.assertEqual(pool._opened, 1)
+
+        # El adicional se cierra al devolverlo; el del pool se reutiliza
+        pool.release_channel(extra)
+        self.assertFalse(extra.is_open)
+        pool.release_channel(first)
+        self.assertIs(pool.acquire_channel(), first)
+
+    def test_sender_channel_does_not_use_pool_slot(self):
+        """El canal propio de cada sender no cuenta para max_channels"""
+        # Pool compartido con un único cupo, como RABBITMQ_MAX_CHANNEL_POOL_SIZE=1
+        pool = RabbitMQConnectionPool({'host': 'h'}, max_channels=1)
+        RabbitMQConnectionPool._pools[pool.key] = pool
+
+        senders = [RabbitMQSender({'host': 'h'}) for _ in range(3)]
+        self.assertTrue(all(sender.pool is pool for sender in senders))
+        self.assertEqual(pool._opened, 0)
+
+        # El primer envío usa el único cupo del pool y lo devuelve
+        self.assertTrue(senders[0].send_email_summary({'id': '1'}))
+        self.assertTrue(senders[1].send_email_summary({'id': '2'}))
+        self.assertEqual(pool._opened, 1)
+
+        for sender in senders:
+            sender.close()
+        self.assertTrue(pool.connection.is_closed)
+
+    def test_send_pdf_message_is_fire_and_forget(self):
+        """send_pdf_message publica en un canal del pool sin publisher confirms"""
+        sender = RabbitMQSender({'host': 'h', 'queue_name': 'pdfs'})
+        self.addCleanup(sender.close)
+
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            self.assertTrue(sender.send_pdf_message(pdf.name, {'subject': 'a'}))
+            self.assertTrue(sender.send_pdf_message(pdf.name, {'subject': 'b'}))
+        self.assertFalse(sender.send_pdf_message('/no/existe.pdf', {}))
+
+        channels = sender.connection.channels
+        self.assertFalse(any(channel.confirming for channel in channels))
+        # Canal propio del sender + un único canal del pool, reutilizado
+        self.assertEqual(len(channels), 2)
+        self.assertEqual([key for _, key, _ in channels[-1].published], ['pdfs', 'pdfs'])
+
+
+class FakeIOLoop:
+    """ioloop simulado: ejecuta en orden los callbacks encolados hasta stop()"""
+
+    def __init__(self):
+        self._callbacks = queue.SimpleQueue()
+        self._stopped = False
+        self.closed = False
+
+    def add_callback_threadsafe(self, callback):
+        if self.closed:
+            raise RuntimeError("ioloop cerrado")
+        self._callbacks.put(callback)
+
+    def start(self):
+        while not self._stopped:
+            self._callbacks.get()()
+
+    def stop(self):
+        self._stopped = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBroker:
+    """
+    Broker simulado para pika.SelectConnection. nacks: {cuerpo: nº de nacks}
+    antes de aceptarlo; con hold=True los acks se retienen hasta release()
+    """
+
+    def __init__(self):
+        self.open_error = None
+        self.nacks = {}
+        self.hold = False
+        self.connections = []
+
+    def connect(self, parameters, on_open_callback, on_open_error_callback, on_close_callback):
+        connection = FakeSelectConnection(self, on_open_callback, on_open_error_callback, on_close_callback)
+        self.connections.append(connection)
+        return connection
+
+    @property
+    def channel(self):
+        return self.connections[-1].channels[-1]
+
+    def release(self):
+        """Confirmar con un único ack (multiple=True) todo lo retenido"""
+        channel = self.channel
+        channel.connection.ioloop.add_callback_threadsafe(channel.ack_held)
+
+
+class FakeSelectConnection:
+    """Conexión asíncrona simulada: los eventos se entregan por su ioloop"""
+
+    def __init__(self, broker, on_open, on_open_error, on_close):
+        self.broker = broker
+        self.ioloop = FakeIOLoop()
+        self.is_open = True
+        self.channels = []
+        self._on_close = on_close
+        if broker.open_error is not None:
+            self.is_open = False
+            self.ioloop.add_callback_threadsafe(lambda: on_open_error(self, broker.open_error))
+        else:
+            self.ioloop.add_callback_threadsafe(lambda: on_open(self))
+
+    def channel(self, on_open_callback):
+        channel = FakeAsyncChannel(self)
+        self.channels.append(channel)
+        self.ioloop.add_callback_threadsafe(lambda: on_open_callback(channel))
+
+    def close(self):
+        self.is_open = False
+        reason = pika.exceptions.ConnectionClosedByClient(200, 'Normal shutdown')
+        self.ioloop.add_callback_threadsafe(lambda: self._on_close(self, reason))
+
+    def drop(self, error):
+        """Simular la caída de la conexión desde otro hilo"""
+        def lost():
+            self.is_open = False
+            self._on_close(self, error)
+        self.ioloop.add_callback_threadsafe(lost)
+
+
+class FakeAsyncChannel:
+    """Canal asíncrono simulado en modo publisher confirms"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self.published = []
+        self._tag = 0
+        self._held = []
+        self._on_ack_nack = None
+
+    def _later(self, callback):
+        self.connection.ioloop.add_callback_threadsafe(callback)
+
+    def add_on_close_callback(self, callback):
+        pass
+
+    def confirm_delivery(self, ack_nack_callback, callback):
+        self._on_ack_nack = ack_nack_callback
+        self._later(lambda: callback(None))
+
+    def queue_declare(self, queue, durable, callback):
+        self._later(lambda: callback(None))
+
+    def exchange_declare(self, exchange, exchange_type, callback):
+        self._later(lambda: callback(None))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self._tag += 1
+        self.published.append((routing_key, body))
+        broker = self.connection.broker
+        if broker.nacks.get(body, 0) > 0:
+            broker.nacks[body] -= 1
+            self._confirm(pika.spec.Basic.Nack, self._tag)
+        elif broker.hold:
+            self._held.append(self._tag)
+        else:
+            self._confirm(pika.spec.Basic.Ack, self._tag)
+
+    def _confirm(self, method_class, tag, multiple=False):
+        frame = types.SimpleNamespace(method=method_class(delivery_tag=tag, multiple=multiple))
+        self._later(lambda: self._on_ack_nack(frame))
+
+    def ack_held(self):
+        if self._held:
+            self._confirm(pika.spec.Basic.Ack, self._held[-1], multiple=True)
+            self._held = []
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condición no alcanzada")
+        time.sleep(0.005)
+
+
+class TestBackgroundPdfPublisher(unittest.TestCase):
+    """Pruebas del publicador con SelectConnection y confirms asíncronos"""
+
+    def setUp(self):
+        self.broker = FakeBroker()
+        patcher = patch('rabbitmq_sender.pika.SelectConnection', self.broker.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pdf = tempfile.NamedTemporaryFile(suffix='.pdf')
+        self.addCleanup(pdf.close)
+        self.pdf_path = pdf.name
+
+    def test_publish_and_flush(self):
+        """Los mensajes encolados se publican y flush espera a sus confirmaciones"""
+        with BackgroundPdfPublisher({'host': 'h', 'queue_name': 'pdfs'}) as publisher:
+            for i in range(5):
+                self.assertTrue(publisher.publish(self.pdf_path, {'subject': str(i)}))
+            self.assertFalse(publisher.publish('/no/existe.pdf', {}))
+            self.assertTrue(publisher.flush(timeout=5))
+            self.assertEqual((publisher.confirmed, publisher.failed), (5, 0))
+
+        published = self.broker.channel.published
+        self.assertEqual([routing_key for routing_key, _ in published], ['pdfs'] * 5)
+        self.assertEqual(json.loads(published[0][1])['email_info']['subject'], '0')
+        self.assertFalse(self.broker.connections[-1].is_open)
+        with self.assertRaises(RuntimeError):
+            publisher.publish(self.pdf_path, {'subject': 'cerrado'})
+
+    def test_multiple_ack_settles_window(self):
+        """Un ack con multiple=True confirma todos los delivery tags anteriores"""
+        self.broker.hold = True
+        with BackgroundPdfPublisher({'host': 'h'}) as publisher:
+            for i in range(4):
+                publisher.publish_json({'n': i})
+            _wait_until(lambda: len(self.broker.channel.published) == 4)
+            self.assertFalse(publisher.flush(timeout=0.05))
+
+            self.broker.release()
+            self.assertTrue(publisher.flush(timeout=5))
+            self.assertEqual((publisher.confirmed, publisher.failed), (4, 0))
+
+    def test_nack_is_resent_once(self):
+        """Un nack se reenvía una vez; si se repite, el mensaje cuenta como fallido"""
+        once, twice = b'{"n": 1}', b'{"n": 2}'
+        self.broker.nacks = {once: 1, twice: 2}
+        with BackgroundPdfPublisher({'host': 'h'}) as publisher:
+            with self.assertLogs('rabbitmq_sender', level='WARNING') as logs:
+                publisher.publish_message(once, label='uno')
+                publisher.publish_message(twice, label='dos')
+                self.assertTrue(publisher.flush(timeout=5))
+            self.assertEqual((publisher.confirmed, publisher.failed), (1, 1))
+
+        bodies = [body for _, body in self.broker.channel.published]
+        self.assertEqual(sorted(bodies), [once, once, twice, twice])
+        self.assertTrue(any('rechazó' in line and 'dos' in line for line in logs.output))
+
+    def test_connection_loss_fails_unconfirmed(self):
+        """Si se cae la conexión, lo no confirmado cuenta como fallido y publish/flush lanzan"""
+        self.broker.hold = True
+        publisher = BackgroundPdfPublisher({'host': 'h'})
+        publisher.publish_json({'n': 1})
+        publisher.publish_json({'n': 2})
+        _wait_until(lambda: len(self.broker.channel.published) == 2)
+
+        error = pika.exceptions.StreamLostError("conexión perdida")
+        with self.assertLogs('rabbitmq_sender', level='ERROR'):
+            self.broker.connections[-1].drop(error)
+            with self.assertRaises(RuntimeError) as ctx:
+                publisher.flush(timeout=5)
+        self.assertIs(ctx.exception.__cause__, error)
+        self.assertEqual((publisher.confirmed, publisher.failed), (0, 2))
+        with self.assertRaises(RuntimeError):
+            publisher.publish_json({'n': 3})
+        publisher.close(timeout=5)
+        self.assertFalse(publisher._thread.is_alive())
+
+    def test_sender_batch_waits_once_per_batch(self):
+        """send_pdf_message_batch espera las confirmaciones una vez por tanda"""
+        with patch('rabbitmq_sender.pika.BlockingConnection', FakeConnection):
+            sender = RabbitMQSender({'host': 'h'})
+        self.addCleanup(sender.close)
+        self.addCleanup(RabbitMQConnectionPool._pools.clear)
+        items = [(self.pdf_path, {'subject': str(i)}) for i in range(5)] + [('/no/existe.pdf', {})]
+
+        with patch.object(BackgroundPdfPublisher, 'flush', autospec=True,
+                          side_effect=BackgroundPdfPublisher.flush) as flush:
+            self.assertEqual(sender.send_pdf_message_batch(items, batch_size=2), 5)
+        self.assertEqual(flush.call_count, 3)
+        self.assertEqual(len(self.broker.channel.published), 5)
+
+        # La conexión de confirmaciones se reutiliza entre tandas
+        self.assertEqual(sender.send_pdf_message_batch(items[:1]), 1)
+        self.assertEqual(len(self.broker.connections), 1)
+
+    def test_sender_batch_raises_on_connection_loss(self):
+        """Un error de la conexión de confirmaciones se propaga a quien envía la tanda"""
+        with patch('rabbitmq_sender.pika.BlockingConnection', FakeConnection):
+            sender = RabbitMQSender({'host': 'h'})
+        self.addCleanup(sender.close)
+        self.addCleanup(RabbitMQConnectionPool._pools.clear)
+        self.assertEqual(sender.send_pdf_message_batch([(self.pdf_path, {})]), 1)
+
+        self.broker.hold = True
+        with self.assertLogs('rabbitmq_sender', level='ERROR'):
+            self.broker.connections[-1].drop(pika.exceptions.StreamLostError("conexión perdida"))
+            with self.assertRaises(RuntimeError):
+                sender.send_pdf_message_batch([(self.pdf_path, {})])
+
+    def test_open_error_raises(self):
+        """Si no se puede conectar, el constructor lanza el error de conexión"""
+        self.broker.open_error = pika.exceptions.AMQPConnectionError("sin broker")
+        with self.assertLogs('rabbitmq_sender', level='ERROR'):
+            with self.assertRaises(pika.exceptions.AMQPConnectionError):
+                BackgroundPdfPublisher({'host': 'h'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Pruebas del token bucket y de las cabeceras de throttling (reloj simulado)
+"""
+import asyncio
+import types
+import unittest
+from unittest.mock import Mock, patch
+
+from utils import retry_utils
+from utils.retry_utils import (TokenBucket, RateLimitError, get_bucket, get_retry_after,
+                               rate_limit, retry_on_failure)
+
+
+class FakeClock:
+    """Sustituye al módulo time: sleep() solo avanza el reloj"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+        self.async_sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.async_sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(**headers):
+    """Respuesta simulada con las cabeceras indicadas"""
+    return Mock(headers=headers)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Pruebas de TokenBucket con un reloj controlado"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch('utils.retry_utils.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_acquire_waits_only_when_empty(self):
+        """La ráfaga inicial no espera; sin tokens se espera lo que falta para uno"""
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.clock.now += 0.25  # recarga medio token
+        with self.assertLogs('retry_utils', level='WARNING'):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [0.25])
+        self.assertAlmostEqual(bucket.tokens, 0.0)
+
+    def test_refill_is_capped(self):
+        """Los tokens no superan la capacidad aunque pase mucho tiempo"""
+        bucket = TokenBucket(rate=10, capacity=2)
+        bucket.acquire()
+        self.clock.now += 60
+        bucket.acquire()
+        self.assertEqual(bucket.tokens, 1)
+
+    def test_retry_after_blocks_bucket(self):
+        """Retry-After vacía el bucket y acquire espera hasta que vence"""
+        bucket = TokenBucket(rate=1, capacity=5)
+        bucket.consume_headers(_response(**{'Retry-After': '5'}))
+        self.assertEqual(bucket.tokens, 0)
+        self.assertEqual(bucket.blocked_until, self.clock.now + 5)
+
+        with self.assertLogs('retry_utils', level='WARNING'):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [5])
+
+    def test_retry_after_does_not_shorten_block(self):
+        """Un Retry-After menor no adelanta un bloqueo ya vigente"""
+        bucket = TokenBucket(rate=1, capacity=5)
+        bucket.consume_headers(_response(**{'Retry-After': '10'}))
+        bucket.consume_headers(_response(**{'Retry-After': '2'}))
+        self.assertEqual(bucket.blocked_until, self.clock.now + 10)
+
+    def test_ratelimit_remaining_clamps_tokens(self):
+        """RateLimit-Remaining limita los tokens, pero nunca los aumenta"""
+        bucket = TokenBucket(rate=1, capacity=10)
+        bucket.consume_headers(_response(**{'RateLimit-Remaining': '3'}))
+        self.assertEqual(bucket.tokens, 3)
+        bucket.consume_headers(_response(**{'RateLimit-Remaining': '8'}))
+        self.assertEqual(bucket.tokens, 3)
+
+    def test_throttle_percentage_scales_rate(self):
+        """x-ms-throttle-limit-percentage reduce la tasa entre 1.0 y 0.1 veces la base"""
+        bucket = TokenBucket(rate=10, capacity=10)
+        for percentage, expected in (('0.5', 10), ('0.8', 10), ('1.3', 5),
+                                     ('1.8', 1), ('2.5', 1), ('1.0', 8)):
+            bucket.consume_headers(_response(**{'x-ms-throttle-limit-percentage': percentage}))
+            self.assertAlmostEqual(bucket.rate, expected, msg=percentage)
+
+    def test_invalid_headers_are_ignored(self):
+        """Cabeceras no numéricas o ausentes no modifican el bucket"""
+        bucket = TokenBucket(rate=4, capacity=4)
+        bucket.consume_headers(_response(**{'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT',
+                                            'RateLimit-Remaining': 'n/a',
+                                            'x-ms-throttle-limit-percentage': ''}))
+        bucket.consume_headers(object())
+        self.assertEqual((bucket.tokens, bucket.rate, bucket.blocked_until), (4, 4, 0.0))
+
+
+class TestRetryAfterAndBuckets(unittest.TestCase):
+    """Pruebas de get_retry_after y get_bucket"""
+
+    def test_get_retry_after(self):
+        """Devuelve los segundos de Retry-After, o None si falta o no es numérico"""
+        self.assertEqual(get_retry_after(_response(**{'Retry-After': '12'})), 12.0)
+        self.assertEqual(get_retry_after(_response(**{'Retry-After': '0.5'})), 0.5)
+        self.assertIsNone(get_retry_after(_response()))
+        self.assertIsNone(get_retry_after(_response(**{'Retry-After': 'mañana'})))
+        self.assertIsNone(get_retry_after(None))
+
+    def test_get_bucket_is_shared_per_host(self):
+        """Cada host tiene un único bucket; rate y capacity solo cuentan al crearlo"""
+        self.addCleanup(retry_utils._buckets.pop, 'a.test', None)
+        self.addCleanup(retry_utils._buckets.pop, 'b.test', None)
+
+        first = get_bucket('a.test', rate=5, capacity=10)
+        self.assertIs(get_bucket('a.test', rate=1, capacity=1), first)
+        self.assertEqual((first.rate, first.capacity), (5, 10))
+        self.assertIsNot(get_bucket('b.test', rate=5, capacity=10), first)
+
+
+class TestAsyncDecorators(unittest.TestCase):
+    """Pruebas de los decoradores sobre corrutinas: esperan con asyncio.sleep"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        for target, value in (('utils.retry_utils.time', self.clock),
+                              ('utils.retry_utils.asyncio', types.SimpleNamespace(sleep=self.clock.async_sleep))):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_async_retry_honours_retry_after(self):
+        """Un RateLimitError se reintenta tras esperar su retry_after sin bloquear el loop"""
+        calls = []
+
+        @retry_on_failure(max_retries=2, delay=1.0, jitter=False)
+        async def fetch():
+            calls.append(self.clock.now)
+            if len(calls) == 1:
+                raise RateLimitError("429", retry_after=3)
+            return 'ok'
+
+        with self.assertLogs('retry_utils', level='WARNING'):
+            self.assertEqual(asyncio.run(fetch()), 'ok')
+        self.assertEqual(self.clock.async_sleeps, [3])
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(calls[1] - calls[0], 3)
+
+    def test_async_retry_gives_up(self):
+        """Agotados los reintentos se propaga la última excepción"""
+        @retry_on_failure(max_retries=2, delay=1.0, backoff_factor=2.0, exceptions=ValueError, jitter=False)
+        async def fail():
+            raise ValueError("siempre")
+
+        with self.assertLogs('retry_utils', level='ERROR'):
+            with self.assertRaises(ValueError):
+                asyncio.run(fail())
+        self.assertEqual(self.clock.async_sleeps, [1.0, 2.0])
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_async_rate_limit_waits_on_empty_bucket(self):
+        """Con el bucket vacío la corrutina espera con acquire_async hasta tener token"""
+        @rate_limit(max_calls=2, time_window=2.0)
+        async def call(i):
+            return i
+
+        async def run():
+            return [await call(i) for i in range(3)]
+
+        with self.assertLogs('retry_utils', level='WARNING'):
+            self.assertEqual(asyncio.run(run()), [0, 1, 2])
+        self.assertEqual(self.clock.async_sleeps, [1.0])
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertAlmostEqual(call.bucket.tokens, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
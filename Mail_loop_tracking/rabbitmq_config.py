@@ -30,6 +30,19 @@ RABBITMQ_CONNECTION_CONFIG = {
     'virtual_host': RABBITMQ_CONFIG['virtual_host']
 }
 
+# Publicadores y consumidores usan conexiones TCP separadas para que la
+# contrapresión de un consumidor lento no bloquee a los publicadores
+PUBLISHER_CONNECTION_CONFIG = {
+    **RABBITMQ_CONNECTION_CONFIG,
+    'heartbeat': int(os.getenv('RABBITMQ_PUBLISHER_HEARTBEAT', 60)),
+    'blocked_connection_timeout': int(os.getenv('RABBITMQ_BLOCKED_CONNECTION_TIMEOUT', 300))
+}
+
+CONSUMER_CONNECTION_CONFIG = {
+    **RABBITMQ_CONNECTION_CONFIG,
+    'heartbeat': int(os.getenv('RABBITMQ_CONSUMER_HEARTBEAT', 0))
+}
+
 def get_rabbitmq_config():
     """Obtener configuración de RabbitMQ"""
     return RABBITMQ_CONFIG.copy()
@@ -38,6 +51,14 @@ def get_connection_config():
     """Obtener configuración de conexión"""
     return RABBITMQ_CONNECTION_CONFIG.copy()
 
+def get_publisher_config():
+    """Obtener configuración de la conexión de publicación"""
+    return PUBLISHER_CONNECTION_CONFIG.copy()
+
+def get_consumer_config():
+    """Obtener configuración de la conexión de consumo"""
+    return CONSUMER_CONNECTION_CONFIG.copy()
+
 def validate_rabbitmq_config():
     """Validar configuración de RabbitMQ"""
     required_fields = ['host', 'port', 'username', 'password', 'queue_name']
@@ -10,7 +10,8 @@ Este script valida:
 """
 import sys
 import time
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple
 from outlook.graph_client import get_authenticated_session, validate_session
 from outlook.mail_reader import get_messages, get_messages_by_sender
 from outlook.attachments import get_attachment_info
@@ -202,17 +203,36 @@ def test_folders() -> bool:
         logger.error(f"❌ Error accediendo a carpetas: {e}")
         return False
 
+def _run_test(test_name: str, test_func: Callable[[], bool]) -> Tuple[bool, float]:
+    """
+    Ejecuta una prueba capturando cualquier excepción.
+    
+    Returns:
+        Tuple[bool, float]: Resultado de la prueba y duración en segundos
+    """
+    logger.info(f"🧪 Ejecutando: {test_name}")
+    start_time = time.time()
+    try:
+        result = test_func()
+    except Exception as e:
+        logger.error(f"❌ Error ejecutando {test_name}: {e}")
+        result = False
+    return result, time.time() - start_time
+
 def run_all_tests() -> Dict[str, bool]:
     """
     Ejecuta todas las pruebas del sistema.
     
+    La configuración se valida primero; el resto de pruebas solo espera a la
+    red, así que se ejecutan en paralelo y el tiempo total es el de la más lenta.
+    
     Returns:
-        Dict[str, bool]: Resultados de todas las pruebas
+        Dict[str, bool]: Resultados de todas las pruebas, en el orden declarado
     """
     logger.info("🚀 Iniciando pruebas completas del sistema")
     
+    prerequisite = ("Configuración", test_configuration)
     tests = {
-        "Configuración": test_configuration,
         "Autenticación": test_authentication,
         "Acceso a mensajes": test_mail_access,
         "Filtros": test_filters,
@@ -220,28 +240,24 @@ def run_all_tests() -> Dict[str, bool]:
         "Carpetas": test_folders
     }
     
-    results = {}
+    outcomes = {}
+    outcomes[prerequisite[0]] = _run_test(*prerequisite)
     
-    for test_name, test_func in tests.items():
-        logger.info(f"\n{'='*50}")
-        logger.info(f"🧪 Ejecutando: {test_name}")
-        logger.info(f"{'='*50}")
-        
-        try:
-            start_time = time.time()
-            result = test_func()
-            end_time = time.time()
-            
-            results[test_name] = result
-            
-            status = "✅ PASÓ" if result else "❌ FALLÓ"
-            duration = f"{end_time - start_time:.2f}s"
-            
-            logger.info(f"{status} {test_name} ({duration})")
-            
-        except Exception as e:
-            logger.error(f"❌ Error ejecutando {test_name}: {e}")
-            results[test_name] = False
+    # Los resultados solo se escriben desde este hilo, al completarse cada futuro
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = {
+            executor.submit(_run_test, test_name, test_func): test_name
+            for test_name, test_func in tests.items()
+        }
+        for future in as_completed(futures):
+            outcomes[futures[future]] = future.result()
+    
+    results = {}
+    for test_name in (prerequisite[0], *tests):
+        result, duration = outcomes[test_name]
+        results[test_name] = result
+        status = "✅ PASÓ" if result else "❌ FALLÓ"
+        logger.info(f"{status} {test_name} ({duration:.2f}s)")
     
     return results
 
@@ -3,11 +3,15 @@ Script de prueba específico para leer correos de la carpeta Iniciativa4
 Utiliza el módulo Mail_loop_tracking para acceder a Outlook
 """
 
+import io
 import sys
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import quote
 
 # Agregar el directorio actual al path para importar módulos
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -17,14 +21,107 @@ from outlook.folder_reader import (
     get_messages_from_folder_with_filter,
     get_folder_summary,
     list_available_folders,
-    get_folder_id
+    get_folder_id,
+    get_messages_delta,
+    build_folder_list,
+    build_folder_summary,
+    filter_folder_messages
 )
-from outlook.graph_client import get_authenticated_session, validate_session
-from config import validate_config, get_config_summary
+from outlook.graph_client import get_authenticated_session, validate_session, graph_batch
+from config import validate_config, get_config_summary, MAIL_USER
 from utils.logger_config import setup_logger
 
 logger = setup_logger("test_iniciativa4")
 
+# Mensajes que se descargan para el resumen (igual que get_folder_summary)
+SUMMARY_MESSAGES_TOP = 1000
+
+# Únicos campos de los mensajes que muestran las pruebas
+MESSAGE_FIELDS = ["subject", "from", "receivedDateTime", "isRead"]
+
+# Filtros de ejemplo usados en la prueba de mensajes filtrados
+EXAMPLE_ALLOWED_SENDERS = ["@empresa.com", "@outlook.com"]
+EXAMPLE_SUBJECT_KEYWORDS = ["importante", "urgente", "revisar"]
+
+# Pruebas de carpeta que se ejecutan a la vez (cada una espera sobre todo a Graph)
+PARALLEL_TESTS = 5
+
+class _ThreadBufferedStdout:
+    """
+    Sustituye a sys.stdout para que cada hilo trabajador escriba en su propio
+    buffer; el hilo principal sigue escribiendo directamente en la consola.
+    """
+    
+    def __init__(self):
+        self.original = sys.stdout
+        self._local = threading.local()
+    
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self.original).write(text)
+    
+    def flush(self):
+        self.original.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.original, name)
+    
+    def capture(self, func, *args):
+        """Ejecuta func en el hilo actual y devuelve (resultado, salida impresa)"""
+        self._local.buffer = io.StringIO()
+        try:
+            return func(*args), self._local.buffer.getvalue()
+        finally:
+            self._local.buffer = None
+    
+    def __enter__(self):
+        sys.stdout = self
+        return self
+    
+    def __exit__(self, *exc_info):
+        sys.stdout = self.original
+
+def prefetch_folder_data(folder_name: str) -> Optional[Dict]:
+    """
+    Descarga en un único $batch los datos que usan las pruebas de carpeta
+    
+    Resuelve el ID de la carpeta y después pide juntas la lista de carpetas,
+    la información de la carpeta y sus mensajes más recientes.
+    
+    Returns:
+        Dict: folder_id, folders, summary y messages; None si la carpeta no
+            existe o el $batch falla (las pruebas consultan entonces la API)
+    """
+    try:
+        folder_id = get_folder_id(folder_name)
+        if not folder_id:
+            return None
+        
+        user_path = f"/users/{MAIL_USER}/mailFolders"
+        order_by = quote("receivedDateTime desc")
+        folders_resp, folder_resp, messages_resp = graph_batch(get_authenticated_session(), [
+            {"id": "folders", "method": "GET", "url": user_path},
+            {"id": "folder", "method": "GET", "url": f"{user_path}/{folder_id}"},
+            {"id": "messages", "method": "GET",
+             "url": f"{user_path}/{folder_id}/messages?$top={SUMMARY_MESSAGES_TOP}&$orderby={order_by}"
+                    f"&$select={','.join(MESSAGE_FIELDS)}"}
+        ])
+        
+        if any(resp.get("status") != 200 for resp in (folders_resp, folder_resp, messages_resp)):
+            logger.warning("⚠️ $batch con respuestas fallidas, se usarán peticiones individuales")
+            return None
+        
+        messages = messages_resp["body"].get("value", [])
+        return {
+            "folder_id": folder_id,
+            "folders": build_folder_list(folders_resp["body"].get("value", [])),
+            "summary": build_folder_summary(folder_name, folder_id, folder_resp["body"], messages),
+            "messages": messages
+        }
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo precargar la carpeta '{folder_name}': {e}")
+        return None
+
 def test_configuration() -> bool:
     """Prueba la configuración del sistema"""
     print("🔧 Probando configuración del sistema...")
@@ -56,12 +153,12 @@ def test_authentication() -> bool:
         print(f"❌ Error de autenticación: {e}")
         return False
 
-def test_folder_access(folder_name: str = "Iniciativa4") -> bool:
+def test_folder_access(folder_name: str = "Iniciativa4", prefetched: Optional[Dict] = None) -> bool:
     """Prueba el acceso a la carpeta especificada"""
     print(f"📁 Probando acceso a la carpeta '{folder_name}'...")
     
     try:
-        folder_id = get_folder_id(folder_name)
+        folder_id = prefetched["folder_id"] if prefetched else get_folder_id(folder_name)
         if folder_id:
             print(f"✅ Carpeta '{folder_name}' encontrada con ID: {folder_id}")
             return True
@@ -72,62 +169,90 @@ def test_folder_access(folder_name: str = "Iniciativa4") -> bool:
         print(f"❌ Error accediendo a la carpeta: {e}")
         return False
 
-def test_list_folders():
+def test_list_folders(prefetched: Optional[Dict] = None):
     """Lista todas las carpetas disponibles"""
     print("📂 Listando carpetas disponibles...")
     
     try:
-        folders = list_available_folders()
+        folders = prefetched["folders"] if prefetched else list_available_folders()
         if folders:
-            print(f"✅ {len(folders)} carpetas encontradas:")
-            for folder in folders[:10]:  # Mostrar solo las primeras 10
-                print(f"   - {folder['display_name']} (ID: {folder['id'][:8]}...) - {folder['total_item_count']} mensajes")
-            if len(folders) > 10:
-                print(f"   ... y {len(folders) - 10} carpetas más")
+            total = len(folders)
+            lines = [f"✅ {total} carpetas encontradas:"]
+            lines.extend(
+                f"   - {folder['display_name']} (ID: {folder['id'][:8]}...) - {folder['total_item_count']} mensajes"
+                for folder in folders[:10]  # Mostrar solo las primeras 10
+            )
+            if total > 10:
+                lines.append(f"   ... y {total - 10} carpetas más")
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
             print("❌ No se encontraron carpetas")
     except Exception as e:
         print(f"❌ Error listando carpetas: {e}")
 
-def test_get_messages(folder_name: str = "Iniciativa4", top: int = 5):
+def test_get_messages(folder_name: str = "Iniciativa4", top: int = 5, prefetched: Optional[Dict] = None):
     """Prueba obtener mensajes de la carpeta"""
     print(f"📧 Obteniendo {top} mensajes de la carpeta '{folder_name}'...")
     
     try:
-        messages = get_messages_from_folder(folder_name, top=top)
+        if prefetched:
+            messages = prefetched["messages"][:top]
+        else:
+            messages = get_messages_from_folder(folder_name, top=top, select=MESSAGE_FIELDS)
         if messages:
-            print(f"✅ {len(messages)} mensajes obtenidos:")
+            lines = [f"✅ {len(messages)} mensajes obtenidos:\n"]
             for i, message in enumerate(messages, 1):
-                subject = message.get('subject', 'Sin asunto')
                 sender = message.get('from', {}).get('emailAddress', {}).get('address', 'Desconocido')
-                received = message.get('receivedDateTime', 'Fecha desconocida')
-                is_read = message.get('isRead', True)
-                
-                print(f"   {i}. {subject}")
-                print(f"      De: {sender}")
-                print(f"      Fecha: {received}")
-                print(f"      Leído: {'Sí' if is_read else 'No'}")
-                print()
+                lines.append(
+                    f"   {i}. {message.get('subject', 'Sin asunto')}\n"
+                    f"      De: {sender}\n"
+                    f"      Fecha: {message.get('receivedDateTime', 'Fecha desconocida')}\n"
+                    f"      Leído: {'Sí' if message.get('isRead', True) else 'No'}\n\n"
+                )
+            sys.stdout.write("".join(lines))
         else:
             print(f"❌ No se encontraron mensajes en la carpeta '{folder_name}'")
     except Exception as e:
         print(f"❌ Error obteniendo mensajes: {e}")
 
-def test_get_messages_with_filter(folder_name: str = "Iniciativa4", top: int = 10):
+def test_get_messages_delta(folder_name: str = "Iniciativa4", prefetched: Optional[Dict] = None):
+    """Prueba obtener solo los mensajes nuevos o modificados (consulta delta)"""
+    print(f"🔄 Obteniendo cambios de la carpeta '{folder_name}' desde la última ejecución...")
+    
+    try:
+        folder_id = prefetched["folder_id"] if prefetched else get_folder_id(folder_name)
+        if not folder_id:
+            print(f"❌ Carpeta '{folder_name}' no encontrada")
+            return
+        
+        messages = get_messages_delta(folder_id, select=MESSAGE_FIELDS)
+        removed = sum(1 for message in messages if "@removed" in message)
+        print(f"✅ {len(messages) - removed} mensajes nuevos o modificados, {removed} eliminados")
+        for i, message in enumerate((m for m in messages if "@removed" not in m), 1):
+            print(f"   {i}. {message.get('subject', 'Sin asunto')}")
+    except Exception as e:
+        print(f"❌ Error obteniendo cambios: {e}")
+
+def test_get_messages_with_filter(folder_name: str = "Iniciativa4", top: int = 10,
+                                  prefetched: Optional[Dict] = None):
     """Prueba obtener mensajes con filtros"""
     print(f"🔍 Obteniendo mensajes filtrados de '{folder_name}'...")
     
     try:
-        # Filtros de ejemplo
-        allowed_senders = ["@empresa.com", "@outlook.com"]
-        subject_keywords = ["importante", "urgente", "revisar"]
-        
-        messages = get_messages_from_folder_with_filter(
-            folder_name=folder_name,
-            allowed_senders=allowed_senders,
-            subject_keywords=subject_keywords,
-            top=top
-        )
+        if prefetched:
+            messages = filter_folder_messages(
+                prefetched["messages"][:top],
+                allowed_senders=EXAMPLE_ALLOWED_SENDERS,
+                subject_keywords=EXAMPLE_SUBJECT_KEYWORDS
+            )
+        else:
+            messages = get_messages_from_folder_with_filter(
+                folder_name=folder_name,
+                allowed_senders=EXAMPLE_ALLOWED_SENDERS,
+                subject_keywords=EXAMPLE_SUBJECT_KEYWORDS,
+                top=top,
+                select=["subject", "from"]
+            )
         
         if messages:
             print(f"✅ {len(messages)} mensajes filtrados obtenidos:")
@@ -140,12 +265,12 @@ def test_get_messages_with_filter(folder_name: str = "Iniciativa4", top: int = 1
     except Exception as e:
         print(f"❌ Error obteniendo mensajes filtrados: {e}")
 
-def test_folder_summary(folder_name: str = "Iniciativa4"):
+def test_folder_summary(folder_name: str = "Iniciativa4", prefetched: Optional[Dict] = None):
     """Prueba obtener resumen de la carpeta"""
     print(f"📊 Obteniendo resumen de la carpeta '{folder_name}'...")
     
     try:
-        summary = get_folder_summary(folder_name)
+        summary = prefetched["summary"] if prefetched else get_folder_summary(folder_name)
         if summary.get('success'):
             print("✅ Resumen de la carpeta:")
             print(f"   Nombre: {summary['folder_name']}")
@@ -158,8 +283,37 @@ def test_folder_summary(folder_name: str = "Iniciativa4"):
     except Exception as e:
         print(f"❌ Error obteniendo resumen: {e}")
 
-def main():
-    """Función principal de prueba"""
+def _run_test(test_name: str, test_func) -> Optional[bool]:
+    """Ejecuta una prueba imprimiendo su cabecera y su estado"""
+    print(f"\n{'='*50}")
+    print(f"PRUEBA: {test_name}")
+    print(f"{'='*50}")
+    
+    try:
+        result = test_func()
+        
+        if result is not None:  # Algunas funciones no retornan valor
+            status = "✅ PASÓ" if result else "❌ FALLÓ"
+            print(f"\n{status} - {test_name}")
+        return result
+        
+    except Exception as e:
+        print(f"\n❌ ERROR - {test_name}: {e}")
+        return False
+
+def main(use_delta: bool = False) -> int:
+    """
+    Función principal de prueba
+    
+    Las pruebas de carpeta solo se ejecutan si configuración y autenticación
+    pasan; si no, se marcan como omitidas.
+    
+    Args:
+        use_delta: Leer solo los cambios desde la ejecución anterior (--delta)
+        
+    Returns:
+        int: Código de salida (0 si todas las pruebas pasaron)
+    """
     print("=" * 70)
     print("PRUEBA DE LECTURA DE CORREOS - CARPETA INICIATIVA4")
     print("=" * 70)
@@ -169,37 +323,56 @@ def main():
     # Configurar carpeta a probar
     folder_name = "Iniciativa4"
     
-    # Ejecutar pruebas en orden
-    tests = [
+    # Las pruebas de carpeta comparten los datos de un solo $batch, que se
+    # descarga la primera vez que se necesitan (tras la autenticación)
+    @lru_cache(maxsize=None)
+    def folder_data() -> Optional[Dict]:
+        return prefetch_folder_data(folder_name)
+    
+    # Configuración y autenticación van primero; el resto son independientes
+    prerequisites = [
         ("Configuración", test_configuration),
-        ("Autenticación", test_authentication),
-        ("Listar carpetas", test_list_folders),
-        ("Acceso a carpeta", lambda: test_folder_access(folder_name)),
-        ("Resumen de carpeta", lambda: test_folder_summary(folder_name)),
-        ("Obtener mensajes", lambda: test_get_messages(folder_name, 5)),
-        ("Mensajes con filtros", lambda: test_get_messages_with_filter(folder_name, 10))
+        ("Autenticación", test_authentication)
+    ]
+    tests = [
+        ("Listar carpetas", lambda: test_list_folders(folder_data())),
+        ("Acceso a carpeta", lambda: test_folder_access(folder_name, folder_data())),
+        ("Resumen de carpeta", lambda: test_folder_summary(folder_name, folder_data())),
+        ("Obtener mensajes", (lambda: test_get_messages_delta(folder_name, folder_data())) if use_delta
+                             else (lambda: test_get_messages(folder_name, 5, folder_data()))),
+        ("Mensajes con filtros", lambda: test_get_messages_with_filter(folder_name, 10, folder_data()))
     ]
     
     results = []
+    skipped = set()
     
-    for test_name, test_func in tests:
-        print(f"\n{'='*50}")
-        print(f"PRUEBA: {test_name}")
-        print(f"{'='*50}")
-        
-        try:
-            result = test_func()
-            results.append((test_name, result))
-            
-            if result is not None:  # Algunas funciones no retornan valor
-                status = "✅ PASÓ" if result else "❌ FALLÓ"
-                print(f"\n{status} - {test_name}")
-            
-        except Exception as e:
-            print(f"\n❌ ERROR - {test_name}: {e}")
+    # Sin pausas fijas entre pruebas: el ritmo frente a Graph lo marca
+    # GRAPH_RATE_LIMITER, que solo espera si se agotan los tokens o si
+    # Graph devuelve Retry-After / cabeceras de throttling
+    for test_name, test_func in prerequisites:
+        results.append((test_name, _run_test(test_name, test_func)))
+    
+    if any(result is False for _, result in results):
+        # Sin configuración o sin sesión las pruebas de carpeta no tienen sentido
+        print("\n⏭️  Pruebas de carpeta omitidas: falló un requisito previo")
+        for test_name, _ in tests:
+            skipped.add(test_name)
             results.append((test_name, False))
+    else:
+        # Descargar los datos compartidos antes de repartir las pruebas entre hilos
+        folder_data()
         
-        time.sleep(1)  # Pausa entre pruebas
+        # Las pruebas de carpeta corren en paralelo; la salida de cada una se
+        # guarda aparte y se imprime en el orden declarado
+        with _ThreadBufferedStdout() as output, ThreadPoolExecutor(max_workers=PARALLEL_TESTS) as executor:
+            futures = [
+                executor.submit(output.capture, _run_test, test_name, test_func)
+                for test_name, test_func in tests
+            ]
+            for (test_name, _), future in zip(tests, futures):
+                result, printed = future.result()
+                sys.stdout.write(printed)
+                results.append((test_name, result))
     
     # Resumen final
     print(f"\n{'='*70}")
@@ -211,15 +384,19 @@ def main():
     
     for test_name, result in results:
         if result is not None:
-            status = "✅ PASÓ" if result else "❌ FALLÓ"
+            if test_name in skipped:
+                status = "⏭️  OMITIDA"
+            else:
+                status = "✅ PASÓ" if result else "❌ FALLÓ"
             print(f"{status} - {test_name}")
     
     print(f"\nResultado: {passed}/{total} pruebas pasaron")
     
     if passed == total:
         print("🎉 ¡Todas las pruebas pasaron exitosamente!")
-    else:
-        print("⚠️  Algunas pruebas fallaron. Revisa los errores arriba.")
+        return 0
+    print("⚠️  Algunas pruebas fallaron. Revisa los errores arriba.")
+    return 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main(use_delta="--delta" in sys.argv[1:]))
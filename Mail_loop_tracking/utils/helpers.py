@@ -1,11 +1,34 @@
+import re
+from functools import lru_cache
 from email.header import decode_header
+from typing import List, Optional, Pattern
+
+
+def _decodificar(valor):
+    return "".join(
+        parte.decode(cod or 'utf-8', errors='ignore') if isinstance(parte, bytes) else parte
+        for parte, cod in decode_header(valor)
+    )
+
+
+# Los mismos From/Subject se repiten entre mensajes de un mismo hilo
+_decodificar_cacheado = lru_cache(maxsize=4096)(_decodificar)
+
 
 def decodificar_header(valor):
-    partes = decode_header(valor)
-    resultado = ""
-    for parte, cod in partes:
-        if isinstance(parte, bytes):
-            resultado += parte.decode(cod or 'utf-8', errors='ignore')
-        else:
-            resultado += parte
-    return resultado
\ No newline at end of file
+    if isinstance(valor, str):
+        return _decodificar_cacheado(valor)
+    return _decodificar(valor)
+
+
+def compilar_palabras_clave(palabras: Optional[List[str]]) -> Optional[Pattern]:
+    """
+    Compila una lista de palabras clave en una única alternancia literal
+
+    Las más largas van primero para que la coincidencia reportada sea la más
+    específica. El texto a evaluar debe estar ya en minúsculas.
+    """
+    if not palabras:
+        return None
+    ordenadas = sorted({p.lower() for p in palabras}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in ordenadas))
@@ -4,12 +4,20 @@ Utilidades para manejo robusto de errores y reintentos.
 Este módulo proporciona decoradores y funciones para:
 - Reintentos automáticos con backoff exponencial
 - Manejo específico de errores de API
-- Rate limiting básico
+- Rate limiting con token bucket ajustado por las cabeceras de Graph
+
+Todos los decoradores aceptan también funciones async: en ese caso las
+esperas usan asyncio.sleep y no bloquean el event loop.
 """
+import asyncio
+import inspect
 import time
 import random
+import threading
+from dataclasses import dataclass, field
 from functools import wraps
-from typing import Callable, Any, Optional, Type, Union, List
+from typing import Callable, Any, Dict, Optional, Type, Union, List
+import requests
 from utils.logger_config import setup_logger
 
 logger = setup_logger("retry_utils")
@@ -24,7 +32,15 @@ class AuthenticationError(GraphAPIError):
 
 class RateLimitError(GraphAPIError):
     """Error de rate limiting"""
-    pass
+    
+    def __init__(self, message: str = "", retry_after: Optional[float] = None):
+        """
+        Args:
+            message: Descripción del error
+            retry_after: Segundos de espera indicados por la cabecera Retry-After
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
 
 class NetworkError(GraphAPIError):
     """Error de red o conectividad"""
@@ -44,6 +60,10 @@ def retry_on_failure(
     """
     Decorador para reintentos automáticos con backoff exponencial.
     
+    Si la excepción trae retry_after (RateLimitError con cabecera Retry-After),
+    se espera al menos ese tiempo, contado desde que falló el intento y sin
+    jitter.
+    
     Args:
         max_retries: Número máximo de reintentos
         delay: Delay inicial en segundos
@@ -55,108 +75,280 @@ def retry_on_failure(
         Decorador que aplica la lógica de reintentos
     """
     def decorator(func: Callable) -> Callable:
+        def retry_delay(e: Exception, attempt: int, failed_at: float) -> float:
+            """Segundos que faltan para el siguiente intento"""
+            # Calcular delay con backoff exponencial
+            current_delay = delay * (backoff_factor ** attempt)
+            retry_after = getattr(e, "retry_after", None)
+            
+            if retry_after is not None:
+                # Respetar la espera indicada por el servidor
+                current_delay = max(current_delay, retry_after)
+            elif jitter:
+                # Agregar jitter si está habilitado
+                jitter_amount = current_delay * 0.1  # 10% de jitter
+                current_delay += random.uniform(-jitter_amount, jitter_amount)
+                current_delay = max(0.1, current_delay)  # Mínimo 0.1 segundos
+            
+            logger.warning(
+                f"⚠️ Intento {attempt + 1}/{max_retries + 1} falló en {func.__name__}: {e}. "
+                f"Reintentando en {current_delay:.2f}s..."
+            )
+            return max(0.0, failed_at + current_delay - time.monotonic())
+        
+        def give_up(e: Exception):
+            logger.error(f"❌ Función {func.__name__} falló después de {max_retries} reintentos: {e}")
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                for attempt in range(max(max_retries, 0) + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        failed_at = time.monotonic()
+                        if attempt >= max_retries:
+                            give_up(e)
+                            raise
+                        await asyncio.sleep(retry_delay(e, attempt, failed_at))
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
-            
-            for attempt in range(max_retries + 1):
+            # El último intento siempre termina con return o con el raise del except
+            for attempt in range(max(max_retries, 0) + 1):
                 try:
                     return func(*args, **kwargs)
                     
                 except exceptions as e:
-                    last_exception = e
+                    failed_at = time.monotonic()
                     
-                    if attempt == max_retries:
-                        logger.error(f"❌ Función {func.__name__} falló después de {max_retries} reintentos: {e}")
+                    if attempt >= max_retries:
+                        give_up(e)
                         raise
                     
-                    # Calcular delay con backoff exponencial
-                    current_delay = delay * (backoff_factor ** attempt)
-                    
-                    # Agregar jitter si está habilitado
-                    if jitter:
-                        jitter_amount = current_delay * 0.1  # 10% de jitter
-                        current_delay += random.uniform(-jitter_amount, jitter_amount)
-                        current_delay = max(0.1, current_delay)  # Mínimo 0.1 segundos
-                    
-                    logger.warning(
-                        f"⚠️ Intento {attempt + 1}/{max_retries + 1} falló en {func.__name__}: {e}. "
-                        f"Reintentando en {current_delay:.2f}s..."
-                    )
-                    
-                    time.sleep(current_delay)
-            
-            # Nunca debería llegar aquí, pero por seguridad
-            raise last_exception
+                    time.sleep(retry_delay(e, attempt, failed_at))
             
         return wrapper
     return decorator
 
+# Excepción a lanzar según el código HTTP de la respuesta
+_STATUS_ERRORS: Dict[int, Type[GraphAPIError]] = {
+    401: AuthenticationError,
+    403: AuthenticationError,
+    408: NetworkError,
+    429: RateLimitError,
+    503: RateLimitError,
+    504: NetworkError,
+}
+
 def handle_graph_api_errors(func: Callable) -> Callable:
     """
     Decorador para manejo específico de errores de Microsoft Graph API.
     
+    Los errores HTTP se clasifican por su código de estado (_STATUS_ERRORS);
+    los errores de red de requests se convierten en NetworkError y los
+    GraphAPIError ya clasificados se propagan sin cambios.
+    
     Args:
         func: Función a decorar
         
     Returns:
         Función decorada con manejo de errores específicos
     """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except GraphAPIError:
+                raise
+            except Exception as e:
+                raise _classify_error(e) from e
+        
+        return async_wrapper
+    
     @wraps(func)
     def wrapper(*args, **kwargs) -> Any:
         try:
             return func(*args, **kwargs)
             
+        except GraphAPIError:
+            raise
         except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Clasificar errores específicos
-            if "unauthorized" in error_msg or "forbidden" in error_msg:
-                raise AuthenticationError(f"Error de autenticación: {e}")
-            elif "too many requests" in error_msg or "429" in error_msg:
-                raise RateLimitError(f"Rate limit excedido: {e}")
-            elif "timeout" in error_msg or "connection" in error_msg:
-                raise NetworkError(f"Error de conectividad: {e}")
-            else:
-                # Re-raise como GraphAPIError genérico
-                raise GraphAPIError(f"Error de Microsoft Graph API: {e}")
+            raise _classify_error(e) from e
     
     return wrapper
 
-def rate_limit(max_calls: int = 100, time_window: float = 60.0):
+def _classify_error(e: Exception) -> GraphAPIError:
+    """Convierte una excepción cualquiera en el GraphAPIError correspondiente"""
+    if isinstance(e, requests.HTTPError):
+        response = e.response
+        status = response.status_code if response is not None else None
+        error_class = _STATUS_ERRORS.get(status, GraphAPIError)
+        
+        if error_class is RateLimitError:
+            return RateLimitError(f"Rate limit excedido ({status}): {e}", get_retry_after(response))
+        return error_class(f"Error de Microsoft Graph API ({status}): {e}")
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return NetworkError(f"Error de conectividad: {e}")
+    # GraphAPIError genérico
+    return GraphAPIError(f"Error de Microsoft Graph API: {e}")
+
+class TokenBucket:
+    """
+    Token bucket thread-safe para limitar la tasa de llamadas.
+    
+    Cada llamada consume un token; los tokens se recargan a `rate` por segundo
+    hasta `capacity`. acquire() solo espera cuando no queda ningún token, y
+    consume_headers() ajusta el bucket con las cabeceras de throttling que
+    devuelve Microsoft Graph.
     """
-    Decorador para rate limiting básico.
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens recargados por segundo
+            capacity: Máximo de tokens acumulables (ráfaga permitida)
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+    
+    def _try_acquire(self) -> float:
+        """Consume un token si hay; si no, devuelve los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                wait = self.blocked_until - now
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            else:
+                wait = (1 - self.tokens) / self.rate
+        
+        logger.warning(f"⚠️ Rate limit alcanzado. Esperando {wait:.2f}s...")
+        return wait
+    
+    def acquire(self):
+        """Consume un token, esperando solo si el bucket está vacío o bloqueado"""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Igual que acquire(), pero esperando con asyncio.sleep"""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+    
+    def consume_headers(self, response: Any):
+        """
+        Ajusta el bucket con las cabeceras de throttling de una respuesta.
+        
+        - Retry-After: bloquea el bucket durante los segundos indicados
+        - RateLimit-Remaining: limita los tokens disponibles a la cuota restante
+        - x-ms-throttle-limit-percentage: entre 0.8 y 1.8, reduce la tasa de
+          recarga a medida que se acerca (o supera) el límite
+        """
+        headers = getattr(response, "headers", None) or {}
+        
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            
+            retry_after = _parse_float(headers.get("Retry-After"))
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.tokens = 0.0
+            
+            remaining = _parse_float(headers.get("RateLimit-Remaining"))
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+            
+            percentage = _parse_float(headers.get("x-ms-throttle-limit-percentage"))
+            if percentage is not None:
+                self.rate = self.base_rate * min(1.0, max(0.1, 1.8 - percentage))
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    """Convierte el valor de una cabecera a float, o None si no es numérico"""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def get_retry_after(response: Any) -> Optional[float]:
+    """Segundos indicados por la cabecera Retry-After de una respuesta, o None"""
+    headers = getattr(response, "headers", None) or {}
+    return _parse_float(headers.get("Retry-After"))
+
+# Buckets compartidos por host, para que todas las llamadas a un mismo
+# servicio respeten la misma cuota
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def get_bucket(host: str, rate: float, capacity: float) -> TokenBucket:
+    """
+    Obtiene (o crea) el token bucket compartido de un host.
     
     Args:
-        max_calls: Número máximo de llamadas permitidas
-        time_window: Ventana de tiempo en segundos
+        host: Host del servicio (ej: "graph.microsoft.com")
+        rate: Tokens por segundo si hay que crearlo
+        capacity: Capacidad si hay que crearlo
+        
+    Returns:
+        TokenBucket: Bucket compartido del host
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+def rate_limit(max_calls: int = 100, time_window: float = 60.0, bucket: Optional[TokenBucket] = None):
+    """
+    Decorador para rate limiting con token bucket.
+    
+    Args:
+        max_calls: Número máximo de llamadas permitidas en ráfaga
+        time_window: Ventana de tiempo en segundos para recargar max_calls
+        bucket: Bucket compartido a usar (por defecto uno propio de la función)
         
     Returns:
         Decorador que aplica rate limiting
     """
     def decorator(func: Callable) -> Callable:
-        # Variables para tracking
-        call_times = []
+        limiter = bucket or TokenBucket(rate=max_calls / time_window, capacity=max_calls)
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                await limiter.acquire_async()
+                return await func(*args, **kwargs)
+            
+            async_wrapper.bucket = limiter
+            return async_wrapper
         
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            current_time = time.time()
-            
-            # Limpiar llamadas fuera de la ventana de tiempo
-            call_times[:] = [t for t in call_times if current_time - t < time_window]
-            
-            # Verificar si se excedió el límite
-            if len(call_times) >= max_calls:
-                sleep_time = time_window - (current_time - call_times[0])
-                if sleep_time > 0:
-                    logger.warning(f"⚠️ Rate limit alcanzado. Esperando {sleep_time:.2f}s...")
-                    time.sleep(sleep_time)
-            
-            # Registrar la llamada actual
-            call_times.append(current_time)
-            
+            limiter.acquire()
             return func(*args, **kwargs)
         
+        wrapper.bucket = limiter
         return wrapper
     return decorator
 
@@ -177,37 +369,83 @@ def exponential_backoff(
         Decorador con backoff exponencial
     """
     def decorator(func: Callable) -> Callable:
+        def backoff_delay(e: Exception, attempt: int) -> float:
+            # Calcular delay con backoff exponencial
+            delay = min(base_delay * (2 ** attempt), max_delay)
+            
+            # Agregar jitter
+            jitter = delay * 0.1 * random.random()
+            delay += jitter
+            
+            logger.warning(
+                f"⚠️ Intento {attempt + 1}/{max_retries + 1} falló en {func.__name__}. "
+                f"Reintentando en {delay:.2f}s... Error: {e}"
+            )
+            return delay
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                for attempt in range(max(max_retries, 0) + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        if attempt >= max_retries:
+                            logger.error(f"❌ Función {func.__name__} falló definitivamente: {e}")
+                            raise
+                        await asyncio.sleep(backoff_delay(e, attempt))
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            for attempt in range(max_retries + 1):
+            # El último intento siempre termina con return o con el raise del except
+            for attempt in range(max(max_retries, 0) + 1):
                 try:
                     return func(*args, **kwargs)
                     
                 except Exception as e:
-                    if attempt == max_retries:
+                    if attempt >= max_retries:
                         logger.error(f"❌ Función {func.__name__} falló definitivamente: {e}")
                         raise
                     
-                    # Calcular delay con backoff exponencial
-                    delay = min(base_delay * (2 ** attempt), max_delay)
-                    
-                    # Agregar jitter
-                    jitter = delay * 0.1 * random.random()
-                    delay += jitter
-                    
-                    logger.warning(
-                        f"⚠️ Intento {attempt + 1}/{max_retries + 1} falló en {func.__name__}. "
-                        f"Reintentando en {delay:.2f}s... Error: {e}"
-                    )
-                    
-                    time.sleep(delay)
-            
-            # Nunca debería llegar aquí
-            raise Exception("Error inesperado en exponential_backoff")
+                    time.sleep(backoff_delay(e, attempt))
         
         return wrapper
     return decorator
 
+@dataclass
+class _CircuitState:
+    """Estado compartido de un circuit breaker, protegido por su lock"""
+    failure_count: int = 0
+    last_failure_time: float = 0.0
+    circuit_open: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    
+    def before_call(self, name: str, recovery_timeout: float, now: float):
+        """Lanza GraphAPIError si el circuito sigue abierto"""
+        with self.lock:
+            if self.circuit_open:
+                if now - self.last_failure_time >= recovery_timeout:
+                    logger.info(f"🔄 Circuito semi-abierto para {name}, probando...")
+                    self.circuit_open = False
+                else:
+                    raise GraphAPIError(f"Circuito abierto para {name}")
+    
+    def record_failure(self, name: str, failure_threshold: int, now: float):
+        with self.lock:
+            self.failure_count += 1
+            self.last_failure_time = now
+            
+            if self.failure_count >= failure_threshold and not self.circuit_open:
+                self.circuit_open = True
+                logger.error(f"🔴 Circuito abierto para {name} después de {self.failure_count} fallos")
+    
+    def record_success(self):
+        # Éxito: resetear contador de fallos
+        with self.lock:
+            self.failure_count = 0
+
 def circuit_breaker(
     failure_threshold: int = 5,
     recovery_timeout: float = 60.0,
@@ -225,40 +463,42 @@ def circuit_breaker(
         Decorador con circuit breaker
     """
     def decorator(func: Callable) -> Callable:
-        # Estado del circuit breaker
-        failure_count = 0
-        last_failure_time = 0
-        circuit_open = False
+        # Estado del circuit breaker (la llamada en sí se hace fuera del lock)
+        state = _CircuitState()
+        
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                current_time = time.time()
+                state.before_call(func.__name__, recovery_timeout, current_time)
+                try:
+                    result = await func(*args, **kwargs)
+                except expected_exception:
+                    state.record_failure(func.__name__, failure_threshold, current_time)
+                    raise
+                state.record_success()
+                return result
+            
+            async_wrapper.circuit_state = state
+            return async_wrapper
         
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            nonlocal failure_count, last_failure_time, circuit_open
-            
             current_time = time.time()
             
             # Verificar si el circuito está abierto
-            if circuit_open:
-                if current_time - last_failure_time >= recovery_timeout:
-                    logger.info(f"🔄 Circuito semi-abierto para {func.__name__}, probando...")
-                    circuit_open = False
-                else:
-                    raise GraphAPIError(f"Circuito abierto para {func.__name__}")
+            state.before_call(func.__name__, recovery_timeout, current_time)
             
             try:
                 result = func(*args, **kwargs)
-                # Éxito: resetear contador de fallos
-                failure_count = 0
-                return result
-                
-            except expected_exception as e:
-                failure_count += 1
-                last_failure_time = current_time
-                
-                if failure_count >= failure_threshold:
-                    circuit_open = True
-                    logger.error(f"🔴 Circuito abierto para {func.__name__} después de {failure_count} fallos")
                 
+            except expected_exception:
+                state.record_failure(func.__name__, failure_threshold, current_time)
                 raise
+            
+            state.record_success()
+            return result
         
+        wrapper.circuit_state = state
         return wrapper
     return decorator 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from .config import Config
+from .config import Config, get_config
 from .constants import *
 
-__all__ = ['Config']
+__all__ = ['Config', 'get_config']
@@ -1,50 +1,79 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 
+# Valores por defecto de las variables de entorno
+DEFAULTS = {
+    "RABBITMQ_URL": "amqp://localhost:5672",
+    "QUEUE_NAME": "pdf_processing_queue",
+    "PREFETCH": "8",
+    "ROOT_PATH": "/data",
+    "ON_MISSING_FILE": "nack",
+    "AWS_REGION": "us-east-1",
+    "TEST_MODE": "false",
+    "JSON_OUTPUT_PATH": "./output_json",
+}
+
+# Diferencias por perfil (PDF_CONSUMER_PROFILE). "dev" procesa siempre los PDFs
+# localmente; "prod" respeta TEST_MODE y exige S3_BUCKET fuera de modo test.
+PROFILES = {
+    "dev": {"force_test_mode": True, "S3_BUCKET": "test-bucket"},
+    "prod": {"force_test_mode": False, "S3_BUCKET": None},
+}
+DEFAULT_PROFILE = "dev"
+
+def _default_project_root() -> Path:
+    """
+    Raíz de fw-final según el directorio de trabajo: desde Pdf_Consumer se
+    sube un nivel; desde fw-final (o /app en Docker) se usa el propio directorio
+    """
+    current_dir = Path.cwd()
+    return current_dir.parent if current_dir.name == "Pdf_Consumer" else current_dir
+
 class Config:
     def __init__(self):
         self._load_config()
 
     def _env(self, name, default=None):
-        v = os.getenv(name, default)
+        v = os.environ.get(name)
         return v if v not in (None, "") else default
 
     def _load_config(self):
-        self.RABBITMQ_URL = self._env("RABBITMQ_URL", "amqp://localhost:5672")
-        self.QUEUE_NAME = self._env("QUEUE_NAME", "pdf_processing_queue")
-        self.PREFETCH = int(self._env("PREFETCH", "8"))
-        self.ROOT_PATH = Path(self._env("ROOT_PATH", "/data"))
-        self.ON_MISSING = self._env("ON_MISSING_FILE", "nack").lower()
-        self.AWS_REGION = self._env("AWS_REGION", "us-east-1")
-        self.S3_BUCKET = self._env("S3_BUCKET", "test-bucket")
-
-        # Nuevas configuraciones para modo test
-        self.TEST_MODE = self._env("TEST_MODE", "false").lower() == "true"
-        
-        # Forzar modo test para procesar PDFs localmente
-        self.TEST_MODE = True
+        self.PROFILE = self._env("PDF_CONSUMER_PROFILE", DEFAULT_PROFILE).lower()
+        if self.PROFILE not in PROFILES:
+            raise RuntimeError(f"PDF_CONSUMER_PROFILE desconocido: {self.PROFILE}")
+        profile = PROFILES[self.PROFILE]
+
+        self.RABBITMQ_URL = self._env("RABBITMQ_URL", DEFAULTS["RABBITMQ_URL"])
+        self.QUEUE_NAME = self._env("QUEUE_NAME", DEFAULTS["QUEUE_NAME"])
+        self.PREFETCH = int(self._env("PREFETCH", DEFAULTS["PREFETCH"]))
+        self.ROOT_PATH = Path(self._env("ROOT_PATH", DEFAULTS["ROOT_PATH"]))
+        self.ON_MISSING = self._env("ON_MISSING_FILE", DEFAULTS["ON_MISSING_FILE"]).lower()
+        self.AWS_REGION = self._env("AWS_REGION", DEFAULTS["AWS_REGION"])
+        self.S3_BUCKET = self._env("S3_BUCKET", profile["S3_BUCKET"])
+
+        # El perfil dev fuerza el modo test para procesar PDFs localmente
+        self.TEST_MODE = (profile["force_test_mode"]
+                          or self._env("TEST_MODE", DEFAULTS["TEST_MODE"]).lower() == "true")
 
         # Configuración especial para rutas en Docker
         if self.TEST_MODE:
             # En modo test, usar rutas de los PDFs descargados por Robot001
-            # Usar ruta absoluta desde el directorio Pdf_Consumer hacia robot001_attachments
-            current_dir = Path.cwd()
-            
-            # Si estamos ejecutando desde Pdf_Consumer, subir un nivel
-            if current_dir.name == "Pdf_Consumer":
-                project_root = current_dir.parent
-            else:
-                # Si estamos ejecutando desde fw-final (directorio raíz)
-                project_root = current_dir
-            
-            self.PDF_INPUT_PATH = Path(self._env("PDF_INPUT_PATH", str(project_root / "robot001_attachments")))
-            self.JSON_OUTPUT_PATH = Path(self._env("JSON_OUTPUT_PATH", "./output_json"))
+            # (el cwd solo se consulta si PDF_INPUT_PATH no está definido)
+            pdf_input_path = self._env("PDF_INPUT_PATH")
+            self.PDF_INPUT_PATH = (Path(pdf_input_path) if pdf_input_path
+                                   else _default_project_root() / "robot001_attachments")
         else:
             # En modo producción, usar rutas internas del contenedor
             self.PDF_INPUT_PATH = Path(self._env("PDF_INPUT_PATH", "./input_pdfs"))
-            self.JSON_OUTPUT_PATH = Path(self._env("JSON_OUTPUT_PATH", "./output_json"))
+        self.JSON_OUTPUT_PATH = Path(self._env("JSON_OUTPUT_PATH", DEFAULTS["JSON_OUTPUT_PATH"]))
+
+        if not self.TEST_MODE and not self.S3_BUCKET:
+            raise RuntimeError("S3_BUCKET no configurado.")
 
-        #if not self.TEST_MODE and not self.S3_BUCKET:
-           # raise RuntimeError("S3_BUCKET no configurado.")
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Configuración compartida del proceso, construida una sola vez"""
+    return Config()
 
-config = Config()
+config = get_config()
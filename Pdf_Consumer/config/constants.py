@@ -1,29 +1,124 @@
 import re
 import unicodedata
+from functools import cache, lru_cache
+from itertools import chain
 
 # =============== Normalización de texto =================
 
-def _strip_accents(s: str) -> str:
-    return "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_ASCII_RUN_RE = re.compile(r"[^\x00-\x7f]+")
 
-def _norm_phrase(s: str) -> str:
-    s = _strip_accents(s).lower()
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+class _CombiningTable(dict):
+    """Tabla para str.translate que borra las marcas combinantes; cada código se
+    clasifica la primera vez que aparece y queda guardado."""
+
+    def __missing__(self, code: int):
+        value = None if unicodedata.combining(chr(code)) else code
+        self[code] = value
+        return value
+
+_COMBINING_TABLE = _CombiningTable()
+
+def _strip_accents_nfkd(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).translate(_COMBINING_TABLE)
+
+# Tabla byte a byte para Latin-1 (á, É, ñ, ü, NBSP...): cada carácter que NFKD
+# reduce a una sola letra ASCII se traduce directamente con bytes.translate
+_LATIN1_ACCENT_TABLE = bytes(
+    ord(stripped) if len(stripped := _strip_accents_nfkd(chr(b))) == 1 and stripped.isascii() else b
+    for b in range(256)
+)
+
+# Los mismos candidatos y encabezados se repiten mucho entre páginas y documentos
+@lru_cache(maxsize=65536)
+def strip_accents(s: str) -> str:
+    """Quita tildes y diacríticos (equivale a NFKD sin marcas combinantes)"""
+    if s.isascii():
+        return s
+    try:
+        stripped = s.encode("latin-1").translate(_LATIN1_ACCENT_TABLE)
+    except UnicodeEncodeError:
+        return _strip_accents_nfkd(s)
+    # Si queda algún byte sin equivalente ASCII (ß, ½, ×...) se usa NFKD completo
+    return stripped.decode("ascii") if stripped.isascii() else _strip_accents_nfkd(s)
+
+class AccentFoldTable(dict):
+    """
+    Tabla para str.translate que quita tildes y diacríticos igual que NFKD sin
+    marcas combinantes, pero en una sola pasada en C sobre textos largos.
+
+    Cada carácter se calcula la primera vez que aparece y queda guardado.
+    `extra` reemplaza caracteres del resultado (ej. {"\u00AD": ""}).
+    """
+
+    def __init__(self, extra=None):
+        super().__init__()
+        self._extra = str.maketrans(extra or {})
+        self._ascii_fixed = all(code > 0x7F for code in self._extra)
+
+    def __missing__(self, code: int) -> str:
+        folded = _strip_accents_nfkd(chr(code)).translate(self._extra)
+        self[code] = folded
+        return folded
+
+    def _fold_run(self, m: "re.Match") -> str:
+        return m.group().translate(self)
+
+    def fold(self, s: str) -> str:
+        """
+        Igual que s.translate(self), pero solo traduce los tramos no ASCII: en
+        texto mayormente ASCII se evita consultar la tabla carácter a carácter.
+        """
+        if not self._ascii_fixed:
+            return s.translate(self)
+        return _NON_ASCII_RUN_RE.sub(self._fold_run, s)
+
+@lru_cache(maxsize=65536)
+def normalize_phrase(s: str) -> str:
+    """Quita tildes, pasa a minúsculas y colapsa espacios (forma de BLACKLIST_PHRASES)"""
+    return _WHITESPACE_RE.sub(" ", strip_accents(s).lower()).strip()
+
+def literal_alternation(words) -> "re.Pattern":
+    """
+    Compila una lista de literales como una alternancia en forma de trie
+    (prefijos comunes factorizados), para buscar todas a la vez de una pasada.
+    Con search() equivale a any(w in texto for w in words).
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    if not trie:
+        # Sin palabras any() es False: un patrón vacío coincidiría con todo
+        return re.compile(r"(?!)")
+
+    def build(node) -> str:
+        alts = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            return f"(?:{body})?" if len(alts) == 1 else body + "?"
+        return body
+
+    # Sin grupo en el nivel superior, re usa las primeras letras para saltar posiciones
+    return re.compile("|".join(re.escape(ch) + build(sub) for ch, sub in sorted(trie.items()) if ch))
 
 # ===================== Constantes / filtros =====================
 
-CONNECTORS = {"de","del","la","las","los","y","da","do","das","dos"}
+CONNECTORS = frozenset({"de","del","la","las","los","y","da","do","das","dos"})
 
-INSTITUTION_NOISE = {
+INSTITUTION_NOISE = frozenset({
     "REPUBLICA","COLOMBIA","REGISTRADURIA","NACIONAL","ESTADO","CIVIL","RAMA","JUDICIAL",
     "MINISTERIO","DIRECCION","SECRETARIA","GOBIERNO","FORMULARIO","CERTIFICADO","DOCUMENTO",
     "RADICADO","CONSULTA","WEB","NIT","DPI","ID","CC","C.C","C.C.","RESOLUCION","OFICIO",
     "ACTA","MUNICIPAL","DEPARTAMENTO","NRO","N°","NO","Nº","N"
-}
+})
 
 # Palabras “tóxicas” para que el barredor no tome encabezados/lugares/roles
-DISQUALIFY_TERMS = {
+DISQUALIFY_TERMS = frozenset({
     "SECCION","INVESTIGACIONES","POLICIA","JUDICIAL","CTI","FISCALIA","CORTE","SUPREMA",
     "JUSTICIA","SALA","CASACION","MAGISTRADO","MAGISTRADA","DOCTOR","DOCTORA",
     "JEFE","JEFA","LIDER","GRUPO","PROFESIONAL","INVESTIGADOR","INVESTIGADORA",
@@ -32,16 +127,16 @@ DISQUALIFY_TERMS = {
     "RECTOR","RECTORA","DEFENSOR","DEFENSORA","CURA","PARROCO","PÁRROCO",
     "COORDINADOR","COORDINADORA",
     "PRIMER APELLIDO", "NORTE DE SANTANDER", "LUGAR DE NACIMIENTO", "SEGUNDO APELLIDO", "NÚMERO DESPACHO"
-}
+})
 
 # Palabras comunes que NO son nombres (para el barredor genérico)
-NON_NAME_COMMON = {
+NON_NAME_COMMON = frozenset({
     "CADA","UNO","UNA","UNOS","UNAS","ELLOS","ELLAS","ESTE","ESTA","ESTOS","ESTAS",
     "ESE","ESA","ESOS","ESAS","AQUEL","AQUELLA","AQUELLOS","AQUELLAS",
     "ESPECIFICANDO","ESPECIFICACION","DETALLE","DETALLES","DOCUMENTACION"
-}
+})
 
-BLACKLIST_TOKENS = {
+BLACKLIST_TOKENS = frozenset({
     "OCR", "PÁGINA", "PAGINA", "PÚBLICO", "PUBLICO", "RAMA", "JUDICIAL",
     "JUZGADO", "CIRCUITO", "PENAL", "LABORAL", "CÓDIGO", "CODIGO", "POSTAL",
     "CÉDULA", "CEDULA", "CIUDADANÍA", "CIUDADANIA",
@@ -60,7 +155,7 @@ BLACKLIST_TOKENS = {
     "REGISTRO", "DEFUNCION", "DEFUNCIÓN", "MEDICINA", "LEGAL",
     "VIGILANCIA", "FISCAL", "CONTRALORIA", "CONTRALORÍA",
     "DESPACHO", "IDIOMAS", "TDIOMAS",
-}
+})
 
 BLACKLIST_PHRASES = {
     "ocr pagina",
@@ -71,122 +166,202 @@ BLACKLIST_PHRASES = {
     "identificacion",
 }
 
-BLACKLIST_REGEXES = [
-    re.compile(r"(?i)\bjuzgado\s+(?:primero|segundo|tercero|cuarto|quinto|sexto|séptimo|septimo|octavo|noveno|d[eé]cimo|\d+|[ivxlcdm]+)\s+(?:penal|laboral)\s+del\s+circuito\b"),
-    re.compile(r"(?i)\bjuzgado\s+(?:\w+\s+){0,4}(?:penal|laboral)\s+del\s+circuito\b"),
-    re.compile(r"(?i)\bn[uú]mer[o0]\s+de\s+preparaci[oóeé]n\b"),
-    re.compile(r"(?i)\bforma(?:to)?\s+dane(?:\s+\w+)?\b"),
-    re.compile(r"(?i)\borganizaci[oó]n\s+electoral\b"),
-    re.compile(r"(?i)\bnorte\s+de\s+santander\b"),
-    re.compile(r"(?i)\bvence\s+ejecutor[ií]a(?:\s+\w+)?\b"),
-    re.compile(r"(?i)\bhospital\s+[A-ZÁÉÍÓÚÑ ]{3,}\b"),
-    re.compile(r"(?i)\bfecha\s+de\s+expedici[oó]n\b"),
-    re.compile(r"(?i)\blugar\s+de\s+nacimient[oa]\b"),
-    re.compile(r"(?i)\bacreditar\s+parentesco\b"),
-    re.compile(r"(?i)\bregistro\s+de\s+defunci[oó]n\b"),
-    re.compile(r"(?i)\bmedicina\s+legal\b"),
-    re.compile(r"(?i)\bmedicina\s+legal\s+y\b"),
-    re.compile(r"(?i)\bn[uú]mero\s+(?:de\s+)?despacho\b"),
-    re.compile(r"(?i)\bdirecci[oó]n\s+de\s+vigilancia\s+fiscal\s+de\s+la\s+contralor[ií]a\b"),
-    re.compile(r"(?i)\bbol[ií]var\s+turbaco\b"),
-    re.compile(r"(?i)\bvalle\s+del\s+c(?:a[uú]ca|att?ca)\b"),
-    re.compile(r"(?i)\bn[uú]mer[o0]\s+de\s+preparac.{0,4}n\b"),
-    re.compile(r"(?i)\bnombres\b"),
-    re.compile(r"(?i)\bsegundo\s+apellido\b"),
-    re.compile(r"(?i)\b[ti]diomas\b"),
-    re.compile(r"(?i)\bfecha\b"),
-    re.compile(r"(?i)\bseguridad\s+social\b"),
-    re.compile(r"(?i)\bcancelada\s+por\s+muerte\b"),
-    re.compile(r"(?i)\bresoluci[oó]n\b"),
-    re.compile(r"(?i)\b(?:fecha|municipio)[' ]*de\s*preparac.{0,4}n\b"),
-    re.compile(r"(?i)\bparte\s+comple\w*\b"),
-    re.compile(r"(?i)\bsangu[ií]neo\b"),
-    re.compile(r"(?i)\bmoncaleano\s+radicaci[oó]n\b"),
-    re.compile(r"(?i)\bfactura\s+electr[oó]nica\s+de\s+venta\b"),
-    re.compile(r"(?i)\brepresentaci[oó]n\s+gr[aá]fica(?:\s+(?:de\s+)?datos)?\b"),
-    re.compile(r"(?i)\bsector\s+defensa\s+y\s+seguridad\b"),
-    re.compile(r"(?i)\bsuperintendencia\s+de\s+notariado(?:\s+y\s+registro)?\b"),
-    re.compile(r"(?i)\bmanizales\s+caldas\b"),
-    re.compile(r"(?i)\b(?:zona|municipio)[' ]*de\s*(?:preparac|expedici)[oóeé]n\b"),
-    re.compile(r"(?i)\bfresno['’]?\s+tol\b"),
-    re.compile(r"(?i)\bte\s+wor\s+es\b"),
-    re.compile(r"(?i)\bwerte\s+visibles\b"),
-    re.compile(r"(?i)\bbellawes\s+notoria\b"),
-    re.compile(r'(?i)\bnotar[ií]a\s+(?:[uú]nica|primera|segunda|tercera|cuarta|quinta|sexta|s[eé]ptima|octava|novena|d[eé]cima|[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+)(?:\s+del?\s+(?:c[ií]rculo|distrito|municipio)\s+de\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ ]+)?\b'),
-    re.compile(r"(?i)\bseccional\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b"),
-    re.compile(r"(?i)\bconsejo\s+superior\s+de\s+la\s+judicatura\b"),
-    re.compile(r"(?i)\bfiscal[ií]a\s+general\s+de\s+la\s+naci[oó]n\b"),
-    re.compile(r"(?i)\bprocuradur[ií]a\s+general\s+de\s+la\s+naci[oó]n\b"),
-    re.compile(r"(?i)\bdefensor[ií]a\s+del\s+pueblo\b"),
-    re.compile(r"(?i)\binstituto\s+colombiano\s+de\s+bienestar\s+familiar\b"),
-    re.compile(r"(?i)\bpacto\s+internacional\s+de\s+derechos\b"),
-    re.compile(r"(?i)\bconvenci[oó]n\s+americana\b"),
-    re.compile(r"(?i)\bderechos\s+humanos\b"),
-    re.compile(r"(?i)\bdecreto\s+ley\b"),
-    re.compile(r"(?i)\b(en\s+la\s+)?sentencia\s+[a-z]\b"),
-    re.compile(r"(?i)\b(d[eé]cimo\s+(?:primero|segundo|tercero|cuarto)|hechos\s+primero|pretensiones\s+primero)\b"),
-    re.compile(r"(?i)\blink\s+para\s+acceder\b"),
-    re.compile(r"(?i)\braz[oó]n\s+social\b"),
-    re.compile(r"(?i)\bactividad\s+econ[oó]mica\b"),
-    re.compile(r"(?i)\bdatos\s+del?\s+(?:emisor|adquirient[eo])\b"),
-    re.compile(r"(?i)\bretenciones?\b"),
-    re.compile(r"(?i)\brete\s+(?:iva|ica)\b"),
-    re.compile(r"(?i)\bmoneda\b"),
-    re.compile(r"(?i)\btasa\s+de\s+cambio\b"),
-    re.compile(r"(?i)\bn[uú]mero\s+(?:[úu]nico\s+)?de\s+transacci[oó]n\b"),
-    re.compile(r"(?i)\bhuella\s+impres[ao]\b"),
-    re.compile(r"(?i)\b[ií]ndice\s+(?:derecho|izquierdo)\b"),
-    re.compile(r"(?i)\bn[uú]mero\s+de\s+impresi[oó]n\b"),
-    re.compile(r"(?i)\bseñales\s+particulares\b"),
-    re.compile(r"(?i)\bsanta\s+rosa(?:\s+de\s+lima)?\b"),
-    re.compile(r"(?i)\bsantiago\s+de\s+cali\b"),
-    re.compile(r"(?i)\bibagu[eé]\s+tolima\b"),
-    re.compile(r"(?i)\briohacha\s+y\s+santa\s+marta\b"),
-    re.compile(r"(?i)\bdistrito\s+de\s+buenaventura\b"),
-    re.compile(r"(?i)\bvereda\s+la\s+fiel\b"),
-    re.compile(r"(?i)\bc[ií]rculo\s+de\s+barranquilla\b"),
-    re.compile(r"(?i)\bedificio\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+(?:\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+){0,3}\b"),
-    re.compile(r"(?i)\b(?:ok|kk)(?:\s+(?:ok|kk)){1,}\b"),
-    re.compile(r"(?i)\bnombres?\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\s+apellidos?\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b"),
-    re.compile(r"(?i)\beps\s+mutual\s*ser\b"),
-    re.compile(r"(?i)\bmutual\s*ser\b"),
-    re.compile(r"(?i)\badres\b"),
-    re.compile(r'(?i)\bnotar[ií]a\s+(?:[uú]nica|primera|segunda|tercera|cuarta|quinta|sexta|s[eé]ptima|octava|novena|d[eé]cima|[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+)(?:\s+del?\s+(?:c[ií]rculo|distrito|municipio)\s+de\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ ]+)?\b'),
-    re.compile(r"(?i)\b[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+(?:\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+){0,2}\s+notar[ií]a\b"),
-    re.compile(r"(?i)\bdirecci[oó]n\s+seccional\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b"),
-    re.compile(r"(?i)\bseccional\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b"),
-    re.compile(r"(?i)\bconsejo\s+superior\s+de\s+la\s+judicatura\b"),
-    re.compile(r"(?i)\bfiscal[ií]a\s+general\s+de\s+la\s+naci[oó]n\b"),
-    re.compile(r"(?i)\bprocuradur[ií]a\s+general\s+de\s+la\s+naci[oó]n\b"),
-    re.compile(r"(?i)\bdefensor[ií]a\s+del\s+pueblo\b"),
-    re.compile(r"(?i)\binstituto\s+colombiano\s+de\s+bienestar\s+familiar\b"),
-    re.compile(r"(?i)\b(link\s+para\s+acceder|hechos\s+primero|pretensiones\s+primero)\b"),
-    re.compile(r"(?i)\bdecreto\s+ley\b"),
-    re.compile(r"(?i)\bpacto\s+internacional\s+de\s+derechos\b"),
-    re.compile(r"(?i)\bconvenci[oó]n\s+americana\b"),
-    re.compile(r"(?i)\bderechos\s+humanos\b"),
-    re.compile(r"(?i)\bacceso\s+carnal\b"),
-    re.compile(r"(?i)\bacto\s+sexual\s+abusivo\b"),
-    re.compile(r"(?i)\bincapacidad\s+de\s+resistir\b"),
-    re.compile(r"(?i)\ben\s+averiguaci[oó]n\b"),
-    re.compile(r"(?i)\bolaya\s+herrera(?=,|\s+(?:aeropuerto|barrio|comuna|medell[ií]n|tulu[aá]|valle|cali)\b)"),
-    re.compile(r"(?i)\btul[uú]a\s+valle\b"),
-    re.compile(r"(?i)\bpopay[aá]n\b"),
-    re.compile(r"(?i)\bhuella\s+impres[ao]\b"),
-    re.compile(r"(?i)\b[ií]ndice\s+(?:derecho|izquierdo)\b"),
-    re.compile(r"(?i)\bn[uú]mero\s+de\s+impresi[oó]n\b"),
-    re.compile(r"(?i)\bseñales\s+particulares\b"),
-    re.compile(r"(?i)\bpublicaci[oó]n\s+por\s+equip\b"),
-    re.compile(r"(?i)\bdescuento\s+global\b"),
-    re.compile(r"(?i)\brecargo\s+global\b"),
-    re.compile(r"(?i)\banticipos?\b"),
-    re.compile(r"(?i)\binc\s+bolsas\b"),
-    re.compile(r"(?i)\biva\s+inc\s+bolsas\b"),
-    re.compile(r"(?i)\bn[uú]mero\s+(?:[úu]nico\s+)?de\s+transacci[oó]n\b"),
-    re.compile(r"(?i)\bexistencia\s+uni[oó]n\s+marital\s+de\s+hecho\b"),
-    re.compile(r"(?i)\bentre\s+calles\b"),
-    re.compile(r"(?i)\bapellidos?\s+y\s+nombres?\b"),
-]
+# Patrones de frases a descartar (sin flags: se compilan con IGNORECASE).
+# dict.fromkeys descarta repetidos conservando el orden.
+BLACKLIST_PATTERNS = tuple(dict.fromkeys((
+    r"\bjuzgado\s+(?:\w+\s+){0,4}(?:penal|laboral)\s+del\s+circuito\b",
+    r"\bforma(?:to)?\s+dane(?:\s+\w+)?\b",
+    r"\borganizaci[oó]n\s+electoral\b",
+    r"\bnorte\s+de\s+santander\b",
+    r"\bvence\s+ejecutor[ií]a(?:\s+\w+)?\b",
+    r"\bhospital\s+[A-ZÁÉÍÓÚÑ ]{3,}\b",
+    r"\bfecha\s+de\s+expedici[oó]n\b",
+    r"\blugar\s+de\s+nacimient[oa]\b",
+    r"\bacreditar\s+parentesco\b",
+    r"\bregistro\s+de\s+defunci[oó]n\b",
+    r"\bmedicina\s+legal\b",
+    r"\bn[uú]mero\s+(?:de\s+)?despacho\b",
+    r"\bdirecci[oó]n\s+de\s+vigilancia\s+fiscal\s+de\s+la\s+contralor[ií]a\b",
+    r"\bbol[ií]var\s+turbaco\b",
+    r"\bvalle\s+del\s+c(?:a[uú]ca|att?ca)\b",
+    r"\bn[uú]mer[o0]\s+de\s+preparac.{0,4}n\b",
+    r"\bnombres\b",
+    r"\bsegundo\s+apellido\b",
+    r"\b[ti]diomas\b",
+    r"\bfecha\b",
+    r"\bseguridad\s+social\b",
+    r"\bcancelada\s+por\s+muerte\b",
+    r"\bresoluci[oó]n\b",
+    r"\b(?:fecha|municipio)[' ]*de\s*preparac.{0,4}n\b",
+    r"\bparte\s+comple\w*\b",
+    r"\bsangu[ií]neo\b",
+    r"\bmoncaleano\s+radicaci[oó]n\b",
+    r"\bfactura\s+electr[oó]nica\s+de\s+venta\b",
+    r"\brepresentaci[oó]n\s+gr[aá]fica(?:\s+(?:de\s+)?datos)?\b",
+    r"\bsector\s+defensa\s+y\s+seguridad\b",
+    r"\bsuperintendencia\s+de\s+notariado(?:\s+y\s+registro)?\b",
+    r"\bmanizales\s+caldas\b",
+    r"\b(?:zona|municipio)[' ]*de\s*(?:preparac|expedici)[oóeé]n\b",
+    r"\bfresno['’]?\s+tol\b",
+    r"\bte\s+wor\s+es\b",
+    r"\bwerte\s+visibles\b",
+    r"\bbellawes\s+notoria\b",
+    r'\bnotar[ií]a\s+(?:[uú]nica|primera|segunda|tercera|cuarta|quinta|sexta|s[eé]ptima|octava|novena|d[eé]cima|[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+)(?:\s+del?\s+(?:c[ií]rculo|distrito|municipio)\s+de\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ ]+)?\b',
+    r"\bseccional\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b",
+    r"\bconsejo\s+superior\s+de\s+la\s+judicatura\b",
+    r"\bfiscal[ií]a\s+general\s+de\s+la\s+naci[oó]n\b",
+    r"\bprocuradur[ií]a\s+general\s+de\s+la\s+naci[oó]n\b",
+    r"\bdefensor[ií]a\s+del\s+pueblo\b",
+    r"\binstituto\s+colombiano\s+de\s+bienestar\s+familiar\b",
+    r"\bpacto\s+internacional\s+de\s+derechos\b",
+    r"\bconvenci[oó]n\s+americana\b",
+    r"\bderechos\s+humanos\b",
+    r"\bdecreto\s+ley\b",
+    r"\b(en\s+la\s+)?sentencia\s+[a-z]\b",
+    r"\b(d[eé]cimo\s+(?:primero|segundo|tercero|cuarto)|hechos\s+primero|pretensiones\s+primero)\b",
+    r"\blink\s+para\s+acceder\b",
+    r"\braz[oó]n\s+social\b",
+    r"\bactividad\s+econ[oó]mica\b",
+    r"\bdatos\s+del?\s+(?:emisor|adquirient[eo])\b",
+    r"\bretenciones?\b",
+    r"\brete\s+(?:iva|ica)\b",
+    r"\bmoneda\b",
+    r"\btasa\s+de\s+cambio\b",
+    r"\bn[uú]mero\s+(?:[úu]nico\s+)?de\s+transacci[oó]n\b",
+    r"\bhuella\s+impres[ao]\b",
+    r"\b[ií]ndice\s+(?:derecho|izquierdo)\b",
+    r"\bn[uú]mero\s+de\s+impresi[oó]n\b",
+    r"\bseñales\s+particulares\b",
+    r"\bsanta\s+rosa(?:\s+de\s+lima)?\b",
+    r"\bsantiago\s+de\s+cali\b",
+    r"\bibagu[eé]\s+tolima\b",
+    r"\briohacha\s+y\s+santa\s+marta\b",
+    r"\bdistrito\s+de\s+buenaventura\b",
+    r"\bvereda\s+la\s+fiel\b",
+    r"\bc[ií]rculo\s+de\s+barranquilla\b",
+    r"\bedificio\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+(?:\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+){0,3}\b",
+    r"\b(?:ok|kk)(?:\s+(?:ok|kk)){1,}\b",
+    r"\bnombres?\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\s+apellidos?\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+\b",
+    r"\bmutual\s*ser\b",
+    r"\badres\b",
+    r"\b[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+(?:\s+[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑ]+){0,2}\s+notar[ií]a\b",
+    r"\bacceso\s+carnal\b",
+    r"\bacto\s+sexual\s+abusivo\b",
+    r"\bincapacidad\s+de\s+resistir\b",
+    r"\ben\s+averiguaci[oó]n\b",
+    r"\bolaya\s+herrera(?=,|\s+(?:aeropuerto|barrio|comuna|medell[ií]n|tulu[aá]|valle|cali)\b)",
+    r"\btul[uú]a\s+valle\b",
+    r"\bpopay[aá]n\b",
+    r"\bpublicaci[oó]n\s+por\s+equip\b",
+    r"\bdescuento\s+global\b",
+    r"\brecargo\s+global\b",
+    r"\banticipos?\b",
+    r"\binc\s+bolsas\b",
+    r"\bexistencia\s+uni[oó]n\s+marital\s+de\s+hecho\b",
+    r"\bentre\s+calles\b",
+    r"\bapellidos?\s+y\s+nombres?\b",
+)))
+
+# Los regex de la blacklist se compilan en el primer uso y no al importar:
+# son la mayor parte del coste de importar este módulo
+
+@cache
+def blacklist_regexes() -> tuple:
+    """Cada BLACKLIST_PATTERNS compilado por separado (IGNORECASE)"""
+    return tuple(re.compile(p, re.IGNORECASE) for p in BLACKLIST_PATTERNS)
+
+# ---- Prefiltro de literales ----
+# Casi todos los patrones exigen una palabra fija (juzgado, notar, medicina...).
+# Si ninguna aparece en el texto, solo hace falta probar los patrones sin literal.
+
+_LITERAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789ñáéíóúü")
+
+# Caracteres que IGNORECASE iguala a una letra ASCII pero que str.lower() no
+# convierte en ella
+_IGNORECASE_FOLD = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+
+def _required_literal(pattern: str):
+    """
+    Devuelve el tramo literal más largo (en minúsculas) que toda coincidencia
+    del patrón debe contener, o None si no hay uno fiable de al menos 3 letras.
+    Solo mira el nivel superior: grupos, clases, escapes y cuantificadores cortan el tramo.
+    """
+    runs, cur, depth, i, n = [], "", 0, 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == "|" and depth == 0:
+            return None
+        if depth == 0 and ch in "?*+{":
+            cur = cur[:-1]   # el carácter anterior puede faltar o repetirse
+        if depth == 0 and ch.lower() in _LITERAL_CHARS:
+            cur += ch.lower()
+            i += 1
+            continue
+        runs.append(cur)
+        cur = ""
+        if ch == "\\":
+            i += 2
+        elif ch == "[":
+            i += 2 if pattern[i + 1:i + 2] == "]" else 1
+            while pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif ch == "{":
+            i = pattern.index("}", i) + 1
+        else:
+            depth += (ch == "(") - (ch == ")")
+            i += 1
+    runs.append(cur)
+    best = max(runs, key=len)
+    return best if len(best) >= 3 else None
+
+_BARE_WORD_PATTERN = re.compile(r"\\b((?:[a-zñáéíóúü]|\[[a-zñáéíóúü]+\])\??)+\\b")
+_BARE_WORD_PIECE = re.compile(r"([a-zñáéíóúü]|\[[a-zñáéíóúü]+\])(\?)?")
+
+def _bare_words(pattern: str):
+    """
+    Si el patrón es una palabra suelta (\\bfecha\\b, \\bpopay[aá]n\\b, \\banticipos?\\b),
+    devuelve todas las formas que acepta; si no, None.
+    """
+    if not _BARE_WORD_PATTERN.fullmatch(pattern):
+        return None
+    words = [""]
+    for chars, optional in _BARE_WORD_PIECE.findall(pattern[2:-2]):
+        options = list(chars.strip("[]")) + ([""] if optional else [])
+        words = [w + ch for w in words for ch in options]
+    return words
+
+@cache
+def _blacklist_matchers() -> tuple:
+    """
+    (prefiltro de literales, alternancia de los patrones sin literal,
+    palabras sueltas, alternancia del resto de patrones), compilados una sola vez.
+    """
+    literals = [_required_literal(p) for p in BLACKLIST_PATTERNS]
+    prefilter = literal_alternation(lit for lit in literals if lit)
+    # Patrones sin literal obligatorio: se prueban siempre
+    unanchored = re.compile(
+        "|".join(f"(?:{p})" for p, lit in zip(BLACKLIST_PATTERNS, literals) if not lit),
+        re.IGNORECASE,
+    )
+    # Las palabras sueltas van en un trie de literales, mucho más barato que
+    # una rama de regex por cada una
+    bare = {p: _bare_words(p) for p in BLACKLIST_PATTERNS}
+    bare_words = re.compile(
+        rf"\b(?:{literal_alternation(w for words in bare.values() if words for w in words).pattern})\b",
+        re.IGNORECASE,
+    )
+    # El resto de BLACKLIST_PATTERNS en una sola alternancia: una pasada por el
+    # texto en lugar de una por patrón
+    union = re.compile("|".join(f"(?:{p})" for p in BLACKLIST_PATTERNS if not bare[p]), re.IGNORECASE)
+    return prefilter, unanchored, bare_words, union
+
+def blacklist_search(text: str):
+    """Devuelve una coincidencia de cualquier blacklist_regexes() (o None)"""
+    prefilter, unanchored, bare_words, union = _blacklist_matchers()
+    if prefilter.search(text.translate(_IGNORECASE_FOLD).lower()) is None:
+        return unanchored.search(text)
+    return bare_words.search(text) or union.search(text)
 
 _NEW_FP_PHRASES = {
     "DATOS DE IA",
@@ -293,11 +468,11 @@ NEW_PHRASES_2 = {
     "NUMERO DE PREPARACLÉN",
 }
 
-# Actualizar sets con las nuevas frases
-BLACKLIST_PHRASES.update({_norm_phrase(p) for p in _NEW_FP_PHRASES})
-BLACKLIST_PHRASES.update({_norm_phrase(p) for p in _NEW_FP_PHRASES_v3})
-BLACKLIST_PHRASES.update({_norm_phrase(p) for p in NEW_PHRASES})
-BLACKLIST_PHRASES.update({_norm_phrase(p) for p in NEW_PHRASES_2})
+# Unir las nuevas frases (normalizadas) en una sola pasada
+BLACKLIST_PHRASES = frozenset(chain(
+    BLACKLIST_PHRASES,
+    map(normalize_phrase, chain(_NEW_FP_PHRASES, _NEW_FP_PHRASES_v3, NEW_PHRASES, NEW_PHRASES_2)),
+))
 
 # ===================== Tokens base para nombres =====================
 
@@ -314,49 +489,51 @@ NAME_TOKEN_CHARS= r"[A-Za-zÁÉÍÓÚÑÜáéíóúüñ'`´-]{2,}"
 RE_NAME_TOKENS  = re.compile(NAME_TOKEN_CHARS)
 
 # ===================== Patrones de frases =====================
+# Sin DOTALL: los nombres son tokens separados por espacios y ningún patrón
+# necesita que "." cruce saltos de línea.
 
 RE_CONTRA = re.compile(
     rf"\bcontra\s+(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})\s*(?=[,.;:)\]]|\s|$)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_A_NOMBRE = re.compile(
     rf"(?:a\s+nombre\s+del?\s+{SENOR_VARIANTS}|del?\s+{SENOR_VARIANTS}|como\s+del?\s+{SENOR_VARIANTS}|tanto\s+del?\s+{SENOR_VARIANTS})\s+"
     rf"(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})\s*(?=[,.;:)\]]|\s|$)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_SENOR = re.compile(
     rf"\b{SENOR_VARIANTS}\s+(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})\s*(?=[,.;:)\]]|\s|$)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_SLP = re.compile(
     rf"correspondiente\s+al\s+SLP\.?\s+(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_SIG_PERSONAS = re.compile(
     rf'de\s+las\s+siguientes\s+personas\s*:\s*["“”«»]?\s*(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})',
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_NOMBRE_DEL_SENOR = re.compile(
     rf"\bnombre\s+del?\s+{SENOR_VARIANTS}\s+"
     rf"(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})\s*(?=[,.;:)\]]|\s|$)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_ACCIONANTE = re.compile(
     rf"\baccionante\s*:\s*(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})\s*(?=,|\.|\n|$|\s+identificad[oa]\b|\s+c\.?c\.?\b|\s+cc\b)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_TUTELA_PROMOVIDA = re.compile(
     r"(?:acci[oó]n\s+de\s+)?tutela\s+promovida\s+por\s+"
     rf"(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})"
     r"\s*(?=,|\.|\n|$|\s+identificad[oa]\b|\s+c\.?c\.?\b|\s+cc\b)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_CONTRA_HEREDEROS = re.compile(
@@ -365,25 +542,46 @@ RE_CONTRA_HEREDEROS = re.compile(
     r"(?:\s+(?:e|y)\s+indeterminados?)?"
     r"\s+de\s+"
     rf"(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{0,6}})",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 RE_MAYOR_IDENT = re.compile(
     rf"(?P<name>{NAME_TOKEN}(?:\s+(?:{CONNECTOR_RE}|{NAME_TOKEN})){{1,6}})"
-    r"\s*,\s*mayor\s+de\s+edad\b.*?"
+    r"\s*,\s*mayor\s+de\s+edad\b[^\n]*?"
     r"(?=,|\.|\n|$|\s+identificad[oa]\b|\s+c\.?c\.?\b|\s+c[eé]dula\b)",
-    re.IGNORECASE | re.DOTALL
+    re.IGNORECASE
 )
 
 # ===================== Pre-contextos a omitir =====================
 
+# Palabras que, justo antes de un nombre, lo descartan (lugares y apoderados)
+# o lo marcan como autoridad; los espacios entre palabras admiten cualquier \s+
+PRE_CONTEXT_BLOCK_WORDS = (
+    "apoderado de", "apoderada de", "en calidad de apoderado de", "en calidad de apoderada de",
+    "poderdante", "edificio", "vereda", "parroquia", "corregimiento", "municipio", "barrio",
+    "comuna", "rancheria", "ranchería",
+)
+PRE_CONTEXT_AUTH_WORDS = (
+    "magistrado", "magistrada", "juez", "jueza", "relator", "relatora",
+    "secretario", "secretaria", "escribiente",
+)
+
+def _pre_context_alternation(words) -> str:
+    """Alternancia de las palabras con \\s+ entre sus partes"""
+    return "|".join(r"\s+".join(map(re.escape, w.split())) for w in words)
+
 PRE_CONTEXT_BLOCK = re.compile(
-    r"(?i)(apoderad[oa]\s+de|en\s+calidad\s+de\s+apoderad[oa]\s+de|poderdante|"
-    r"edificio|vereda|parroquia|corregimiento|municipio|barrio|comuna|rancher(?:i|í)a)\s*$"
+    rf"(?i)({_pre_context_alternation(PRE_CONTEXT_BLOCK_WORDS)})\s*$"
 )
 
 PRE_CONTEXT_AUTH = re.compile(
-    r"(?i)(?:por\s+el\s+se(?:ñ|n)or\s+)?(?:magistrad[oa]|juez|jueza|relator(?:a)?|secretari[oa]|escribiente)\s*$"
+    rf"(?i)(?:por\s+el\s+se(?:ñ|n)or\s+)?(?:{_pre_context_alternation(PRE_CONTEXT_AUTH_WORDS)})\s*$"
+)
+
+# Letras en que terminan PRE_CONTEXT_BLOCK y PRE_CONTEXT_AUTH antes del \s*$:
+# si el contexto (sin el espacio final) termina en otra, ninguno coincide
+PRE_CONTEXT_LAST_CHARS = frozenset(
+    c for w in (*PRE_CONTEXT_BLOCK_WORDS, *PRE_CONTEXT_AUTH_WORDS) for c in (w[-1].lower(), w[-1].upper())
 )
 
 # ===================== Bloques tras números grandes =====================
@@ -409,13 +607,28 @@ CEDULA_BLACKLIST_FIELDS = (
 )
 CEDULA_PRIMARY_TOKENS = r"\b(cedula|nuip|nip|cc|n[uú]mero\s+de\s+documento)\b"
 CEDULA_NO_FUZZ = r"(?:n[ou]mero|no\.?|n[°ºo])"
+# Cada tramo de espacios lo consume un solo \s*, sin cuantificadores seguidos
+# que se lo repartan: un "radicado" con muchos espacios y sin número falla en
+# tiempo lineal
 CEDULA_RAD_LABEL = re.compile(
     r"(?:radicaci[óo]n|radicad[oa]|rad\.)\s*"
-    r"(?:n(?:o\.?|[°º])|num(?:ero)?)?\s*[:\-]?\s*[\r\n\s]*"
+    r"(?:(?:n(?:o\.?|[°º])|num(?:ero)?)\s*)?(?:[:\-]\s*)?"
     r"((?:\d{1,6}(?:[.\-\s]\d{1,6}){2,}))",
     flags=re.DOTALL
 )
 
+# Versiones compiladas de los patrones de contexto: se evalúan en la ventana
+# de cada número candidato
+CEDULA_VERIF_RE = re.compile(CEDULA_VERIF_PAT)
+CEDULA_BLACKLIST_FIELDS_RE = re.compile(CEDULA_BLACKLIST_FIELDS)
+CEDULA_PRIMARY_TOKENS_RE = re.compile(CEDULA_PRIMARY_TOKENS)
+
+# Pistas de cédula sin \b para un barrido único del texto: toda coincidencia
+# de CEDULA_PRIMARY_TOKENS (o de "identificado con") en una ventana se solapa
+# con alguna de estas, así que un número sin pistas cerca se descarta sin
+# evaluar su ventana
+CEDULA_PRIMARY_HINTS_RE = re.compile(r"cedula|nuip|nip|cc|n[uú]mero\s+de\s+documento|identificado con")
+
 # ===================== Resumen =====================
 
 SUMMARY_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
@@ -429,7 +642,7 @@ CHUNK_SIZE = 4500
 SOFT_SPLIT = r"(?<=[\.\n])\s+"
 
 # Frases de contexto que invalidan un candidato cercano
-FRASES_PROHIBIDAS = [
+FRASES_PROHIBIDAS = (
     # originales
     "por el señor magistrado","por la señora magistrada",
     "por el señor juez","por la señora jueza",
@@ -454,36 +667,33 @@ FRASES_PROHIBIDAS = [
     # varias del dataset
     "edificio córdoba", "edificio comando", "brigada de selva",
     "delegación departamental", "rectificación de cédula",
-]
+)
 
 # Palabras que si aparecen como PRIMER token, descartamos (encabezados, secciones)
-HEADERS_BLACKLIST = {
+HEADERS_BLACKLIST = frozenset({
     "REPUBLICA","REPÚBLICA","JUZGADO","OFICIO","SEÑORES","DISTRITO","MUNICIPAL",
     "REGISTRADURIA","REGISTRADURÍA","ESTADO","CIVIL","HECHOS","PRETENSIONES",
     "PRUEBAS","ANEXOS","NOTIFICACIONES","COMPETENCIA","PROCEDIMIENTO",
     "FUNDAMENTOS","DERECHO","ARTICULO","ARTÍCULOS",
     # refuerzos anti-registro/certificaciones/plantillas
     "FONDO","ROTATORIO","FIEL","COPIA","ORIGINAL","REGISTRO","NACIMIENTO",
-    "DEFUNCION","DEFUNCIÓN","CERTIFICA","CERTIFICACION","CERTIFICACIÓN"
-}
-
-HEADERS_BLACKLIST |= {
+    "DEFUNCION","DEFUNCIÓN","CERTIFICA","CERTIFICACION","CERTIFICACIÓN",
     # institucional/órganos
     "CONSEJO","CORTE","SALA","FISCALIA","FISCALÍA","PROCURADURIA","PROCURADURÍA",
-    "PERSONERIA","PERSONERÍA","REGISTRADURIA","REGISTRADURÍA","HOSPITAL","EPS",
+    "PERSONERIA","PERSONERÍA","HOSPITAL","EPS",
     "NOTARIA","NOTARÍA","SECCIONAL","BRIGADA","UNIDAD","ADMINISTRATIVA","ESPECIAL",
     # plantillas/biométricos
     "CONSULTA","VISTA","GRUPO","SEÑALES","HUELLA","PULGAR","INDICE","ÍNDICE",
     "ANULAR","MEÑIQUE","ACTA","CLASE","TIPO","FECHA","NÚMERO","NUMERO","CÓDIGO","CODIGO",
     # actos/trámites
     "DEMANDA","PODER","ACCION","ACCIÓN","RESOLUCION","RESOLUCIÓN","CERTIFICADO",
-    "CERTIFICACION","CERTIFICACIÓN","REPARTO","RADICACION","RADICACIÓN",
+    "REPARTO","RADICACION","RADICACIÓN",
     # títulos comunes que llegan en OCR
     "SEÑOR","SEÑORA","SR.","SRA.",
-}
+})
 
 # Stopwords / ruido que INVALIDAN si aparecen en CUALQUIER token del candidato
-DEMONYM_STOPWORDS = {
+DEMONYM_STOPWORDS = frozenset({
     # (los que ya tenías)
     "italiano","italianos","italiana","italianas",
     "español","españoles","española","españolas",
@@ -502,9 +712,9 @@ DEMONYM_STOPWORDS = {
     # nuevos por tus casos
     "fondo","rotatorio","fiel","copia","original",
     "registro","nacimiento","defunción","defuncion"
-}
+})
 
-PHRASES_BLACKLIST = {
+PHRASES_BLACKLIST = frozenset({
     "fondo rotatorio de la registraduría",
     "fondo rotatorio de la registraduria",
     "fiel copia tomada del original",
@@ -512,10 +722,19 @@ PHRASES_BLACKLIST = {
     "registro de defunción",
     "registro de defuncion",
     "de registro nacimiento",
-}
+})
 
 # Partículas válidas en nombres hispanos que pueden ser cortas
-ALLOWED_PARTICLES = {"de","del","la","las","los","y","san","santa","da","do","das","dos"}
+ALLOWED_PARTICLES = frozenset({"de","del","la","las","los","y","san","santa","da","do","das","dos"})
+
+_UPPER_SEQ = r"\b[A-ZÁÉÍÓÚÑÜ]{2,}(?:[ \t]+[A-ZÁÉÍÓÚÑÜ]{2,}){1,6}\b"
+_TITLE_SEQ = r"\b[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:[ \t]+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,6}\b"
+
+UPPER_PAT = re.compile(rf"({_UPPER_SEQ})")
+TITLE_PAT = re.compile(rf"({_TITLE_SEQ})")
 
-UPPER_PAT = re.compile(r"\b([A-ZÁÉÍÓÚÑÜ]{2,}(?:[ \t]+[A-ZÁÉÍÓÚÑÜ]{2,}){1,6})\b")
-TITLE_PAT = re.compile(r"\b([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:[ \t]+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,6})\b")
+# Ambos barridos en una sola pasada; m.lastgroup indica cuál coincidió.
+# Los dos patrones solo aceptan palabras completas y disjuntas (todo mayúsculas
+# frente a inicial mayúscula + minúsculas), así que sus coincidencias nunca se
+# solapan y la unión encuentra exactamente las mismas que los dos por separado.
+NAME_SCAN = re.compile(rf"(?P<upper>{_UPPER_SEQ})|(?P<title>{_TITLE_SEQ})")
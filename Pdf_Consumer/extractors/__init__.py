@@ -1,31 +1,39 @@
 # Configurar variables de entorno antes de cualquier importación
 import os
+from importlib import import_module
+
 os.environ.setdefault('TEST_MODE', 'true')
 os.environ.setdefault('S3_BUCKET', 'test-bucket')
 
-try:
-    from .cedula_extractor import CedulaExtractor
-    from .name_extractor import NameExtractor
-except ImportError as e:
-    print(f"Warning: Could not import basic extractors: {e}")
-    CedulaExtractor = None
-    NameExtractor = None
-
-try:
-    from .cedula_extractor_comprehend import CedulaExtractorComprehend
-    from .name_extractor_comprehend import NameExtractorComprehend
-    from .summarize_text_extractor_comprehend import SummarizeTextExtractorComprehend
-except ImportError as e:
-    print(f"Warning: Could not import Comprehend extractors: {e}")
-    CedulaExtractorComprehend = None
-    NameExtractorComprehend = None
-    SummarizeTextExtractorComprehend = None
+# Cada extractor se importa la primera vez que se pide (PEP 562): quien solo
+# usa los extractores por regex no carga boto3 ni los módulos de Comprehend
+_EXTRACTOR_MODULES = {
+    'CedulaExtractor': '.cedula_extractor',
+    'NameExtractor': '.name_extractor',
+    'CedulaExtractorComprehend': '.cedula_extractor_comprehend',
+    'NameExtractorComprehend': '.name_extractor_comprehend',
+    'SummarizeTextExtractorComprehend': '.summarize_text_extractor_comprehend',
+    'SummarizeTextExtractor': '.summarize_text_extractor',
+}
 
-try:
-    from .summarize_text_extractor import SummarizeTextExtractor
-except ImportError as e:
-    print(f"Warning: Could not import SummarizeTextExtractor: {e}")
-    SummarizeTextExtractor = None
+def __getattr__(name):
+    module_name = _EXTRACTOR_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        extractor = getattr(import_module(module_name, __name__), name)
+    except ImportError as e:
+        # Dependencia opcional ausente: el None se cachea para no reintentar
+        # la importación (ni repetir el aviso) en cada acceso
+        print(f"Warning: Could not import {name}: {e}")
+        extractor = None
+    except AttributeError as e:
+        # El submódulo aún se está importando (importación circular): no se
+        # cachea, el siguiente acceso ya lo encontrará completo
+        print(f"Warning: Could not import {name}: {e}")
+        return None
+    globals()[name] = extractor
+    return extractor
 
 __all__ = [
     'CedulaExtractor',
@@ -1,13 +1,51 @@
 import re
-import unicodedata
+from bisect import bisect_right
 from typing import List, Optional, Dict, Any, Tuple
 import json
 
 from config.constants import (
-    CEDULA_NUM_ANY, CEDULA_VERIF_PAT, CEDULA_BLACKLIST_FIELDS,
-    CEDULA_PRIMARY_TOKENS, CEDULA_RAD_LABEL
+    CEDULA_NUM_ANY, CEDULA_VERIF_RE, CEDULA_BLACKLIST_FIELDS_RE,
+    CEDULA_PRIMARY_HINTS_RE, CEDULA_PRIMARY_TOKENS_RE, CEDULA_RAD_LABEL, AccentFoldTable
 )
 
+# Sin tildes + limpieza de caracteres invisibles, espacios y guiones de OCR,
+# todo con una sola tabla (AccentFoldTable.fold)
+_OCR_FOLD = AccentFoldTable({
+    "\u00AD": "", "\u200B": "", "\u200C": "", "\u200D": "", "\uFEFF": "",
+    "\u00A0": " ", "\u202F": " ", "\u2009": " ", "\u2007": " ",
+    "–": "-", "—": "-",
+})
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def _normalize(s: str) -> str:
+    return _OCR_FOLD.fold(s).lower()
+
+
+def _clean_digits(s: str) -> str:
+    return _NON_DIGIT_RE.sub("", s)
+
+
+def _valid_len(num: str) -> bool:
+    return 6 <= len(num) <= 10
+
+
+def _hint_spans(text: str) -> Tuple[List[int], List[int]]:
+    # Inicios y finales (ordenados) de las pistas de cédula en todo el texto
+    starts, ends = [], []
+    for m in CEDULA_PRIMARY_HINTS_RE.finditer(text):
+        starts.append(m.start())
+        ends.append(m.end())
+    return starts, ends
+
+
+def _has_hint(spans: Tuple[List[int], List[int]], lo: int, hi: int) -> bool:
+    # ¿Alguna pista se solapa con text[lo:hi]?
+    starts, ends = spans
+    i = bisect_right(ends, lo)
+    return i < len(starts) and starts[i] < hi
+
+
 class CedulaExtractor:
     """
     Encapsula la lógica para extraer números de cédula de un texto.
@@ -17,53 +55,44 @@ class CedulaExtractor:
         if not pdf_text:
             return ""
 
-        def normalize(s: str) -> str:
-            s = unicodedata.normalize("NFKD", s)
-            s = "".join(ch for ch in s if not unicodedata.combining(ch))
-            for bad in ("\u00AD", "\u200B", "\u200C", "\u200D", "\uFEFF"):
-                s = s.replace(bad, "")
-            s = (s.replace("\u00A0", " ").replace("\u202F", " ").replace("\u2009", " ").replace("\u2007", " ")
-                   .replace("–", "-").replace("—", "-")
-                   .replace("'", "'").replace("'","'").replace(""", '"').replace(""", '"'))
-            return s.lower()
-
-        def clean_digits(s: str) -> str:
-            return re.sub(r"\D", "", s)
-
-        def valid_len(num: str) -> bool:
-            return 6 <= len(num) <= 10
-
-        text = normalize(pdf_text)
+        text = _normalize(pdf_text)
         found = set()
         banned_numbers = set()
 
-        for mr in CEDULA_RAD_LABEL.finditer(text):
-            chain = re.sub(r"[^\d]", "", mr.group(1))
-            for L in range(6, 11):
-                for i in range(0, max(0, len(chain) - L + 1)):
-                    banned_numbers.add(chain[i:i+L])
+        # Cualquier tramo de un radicado queda prohibido: se guardan las cadenas
+        # completas unidas por "|" y se busca el candidato como subcadena
+        banned_chains = "|".join(_clean_digits(mr.group(1)) for mr in CEDULA_RAD_LABEL.finditer(text))
 
-        for mm in CEDULA_NUM_ANY.finditer(text):
-            digits = clean_digits(mm.group(0))
+        # Un solo barrido de números: sirve para los prohibidos y para los candidatos
+        num_matches = list(CEDULA_NUM_ANY.finditer(text))
+
+        for mm in num_matches:
+            digits = _clean_digits(mm.group(0))
             if 8 <= len(digits) <= 12 and digits.startswith("0"):
                 left = text[max(0, mm.start() - 60): mm.start()]
                 right = text[mm.end(): min(len(text), mm.end() + 60)]
-                if re.search(CEDULA_VERIF_PAT, left + right):
+                if CEDULA_VERIF_RE.search(left + right):
                     banned_numbers.add(digits)
 
-        for nm in CEDULA_NUM_ANY.finditer(text):
+        hints = _hint_spans(text)
+
+        for nm in num_matches:
             raw = nm.group(0)
-            digits = clean_digits(raw)
-            if not valid_len(digits) or digits in banned_numbers:
+            digits = _clean_digits(raw)
+            if not _valid_len(digits) or digits in banned_numbers or digits in banned_chains:
+                continue
+
+            # Sin pistas en la ventana izquierda no puede ser cédula
+            if not _has_hint(hints, nm.start() - 90, nm.start()):
                 continue
 
             left = text[max(0, nm.start()-90):nm.start()]
             right = text[nm.end():min(len(text), nm.end()+90)]
 
-            if re.search(CEDULA_BLACKLIST_FIELDS, left+right):
+            if CEDULA_BLACKLIST_FIELDS_RE.search(left+right):
                 continue
 
-            if re.search(CEDULA_PRIMARY_TOKENS, left) or "identificado con" in left or "cedula de" in left:
+            if "identificado con" in left or "cedula de" in left or CEDULA_PRIMARY_TOKENS_RE.search(left):
                 found.add(digits)
 
         return ",".join(sorted(found))
@@ -76,66 +105,52 @@ class CedulaExtractor:
         if not pages_text:
             return []
 
-        def normalize(s: str) -> str:
-            s = unicodedata.normalize("NFKD", s)
-            s = "".join(ch for ch in s if not unicodedata.combining(ch))
-            for bad in ("\u00AD", "\u200B", "\u200C", "\u200D", "\uFEFF"):
-                s = s.replace(bad, "")
-            s = (s.replace("\u00A0", " ").replace("\u202F", " ").replace("\u2009", " ").replace("\u2007", " ")
-                   .replace("–", "-").replace("—", "-")
-                   .replace("'", "'").replace("'","'").replace(""", '"').replace(""", '"'))
-            return s.lower()
-
-        def clean_digits(s: str) -> str:
-            return re.sub(r"\D", "", s)
-
-        def valid_len(num: str) -> bool:
-            return 6 <= len(num) <= 10
+        # Cada página se normaliza una sola vez; el texto completo se arma con
+        # las mismas cadenas (la normalización es carácter a carácter)
+        norm_pages = [(_normalize(page_text), page_num) for page_text, page_num in pages_text]
 
         # Primero, obtener números prohibidos de todo el documento
-        full_text = normalize(" ".join([page_text for page_text, _ in pages_text]))
+        full_text = " ".join(text for text, _ in norm_pages)
         banned_numbers = set()
 
-        for mr in CEDULA_RAD_LABEL.finditer(full_text):
-            chain = re.sub(r"[^\d]", "", mr.group(1))
-            for L in range(6, 11):
-                for i in range(0, max(0, len(chain) - L + 1)):
-                    banned_numbers.add(chain[i:i+L])
+        # Cualquier tramo de un radicado queda prohibido: se guardan las cadenas
+        # completas unidas por "|" y se busca el candidato como subcadena
+        banned_chains = "|".join(_clean_digits(mr.group(1)) for mr in CEDULA_RAD_LABEL.finditer(full_text))
 
         for mm in CEDULA_NUM_ANY.finditer(full_text):
-            digits = clean_digits(mm.group(0))
+            digits = _clean_digits(mm.group(0))
             if 8 <= len(digits) <= 12 and digits.startswith("0"):
                 left = full_text[max(0, mm.start() - 60): mm.start()]
                 right = full_text[mm.end(): min(len(full_text), mm.end() + 60)]
-                if re.search(CEDULA_VERIF_PAT, left + right):
+                if CEDULA_VERIF_RE.search(left + right):
                     banned_numbers.add(digits)
 
         # Ahora procesar página por página y mantener todas las páginas por cédula
-        cedulas_pages = {}  # {numero_cedula: [paginas]}
+        cedulas_pages = {}  # {numero_cedula: {paginas}}
 
-        for page_text, page_num in pages_text:
-            if not page_text.strip():
+        for text, page_num in norm_pages:
+            if not text.strip():
                 continue
 
-            text = normalize(page_text)
+            hints = _hint_spans(text)
 
             for nm in CEDULA_NUM_ANY.finditer(text):
                 raw = nm.group(0)
-                digits = clean_digits(raw)
-                if not valid_len(digits) or digits in banned_numbers:
+                digits = _clean_digits(raw)
+                if not _valid_len(digits) or digits in banned_numbers or digits in banned_chains:
+                    continue
+
+                if not _has_hint(hints, nm.start() - 90, nm.start()):
                     continue
 
                 left = text[max(0, nm.start()-90):nm.start()]
                 right = text[nm.end():min(len(text), nm.end()+90)]
 
-                if re.search(CEDULA_BLACKLIST_FIELDS, left+right):
+                if CEDULA_BLACKLIST_FIELDS_RE.search(left+right):
                     continue
 
-                if re.search(CEDULA_PRIMARY_TOKENS, left) or "identificado con" in left or "cedula de" in left:
-                    if digits not in cedulas_pages:
-                        cedulas_pages[digits] = []
-                    if page_num not in cedulas_pages[digits]:
-                        cedulas_pages[digits].append(page_num)
+                if "identificado con" in left or "cedula de" in left or CEDULA_PRIMARY_TOKENS_RE.search(left):
+                    cedulas_pages.setdefault(digits, set()).add(page_num)
 
         # Convertir a la estructura final con páginas ordenadas
         cedulas_found = []
@@ -1,7 +1,15 @@
 import re
-import unicodedata
 from typing import List, Tuple, Dict, Any
-import boto3
+
+try:
+    import boto3
+except ImportError:  # sin boto3 solo queda la extracción por regex
+    boto3 = None
+
+from config.constants import AccentFoldTable
+
+# Sin tildes ni caracteres invisibles de OCR, con una sola tabla
+_INVISIBLE_FOLD = AccentFoldTable(dict.fromkeys(("\u00AD", "\u200B", "\u200C", "\u200D", "\uFEFF"), ""))
 
 class CedulaExtractorComprehend:
     # --- Config ---
@@ -14,37 +22,46 @@ class CedulaExtractorComprehend:
     # Regex: 6–10 dígitos, con o sin separadores (puntos o espacios)
     # Evita capturar dentro de cifras más largas
     RE_CEDULA = re.compile(r"(?<!\d)(?:\d{1,3}(?:[.\s]\d{3}){1,3}|\d{6,10})(?!\d)")
+    RE_NON_DIGIT = re.compile(r"[^\d]")
+    RE_SENTENCE_END = re.compile(r"(?<=[\.\?\!\n])\s+")
+
+    def __init__(self):
+        self._clients: Dict[str, Any] = {}  # {region: cliente de Comprehend}
+
+    def _get_client(self, region_name: str):
+        """Devuelve el cliente de Comprehend de la región, creándolo una sola vez."""
+        client = self._clients.get(region_name)
+        if client is None:
+            client = self._clients[region_name] = boto3.client("comprehend", region_name=region_name)
+        return client
 
     @staticmethod
     def _normalize(s: str) -> str:
         # quita diacríticos y caracteres invisibles/comunes en OCR
-        s = unicodedata.normalize("NFKD", s)
-        s = "".join(ch for ch in s if not unicodedata.combining(ch))
-        for bad in ("\u00AD", "\u200B", "\u200C", "\u200D", "\uFEFF"):
-            s = s.replace(bad, "")
-        return s
+        return _INVISIBLE_FOLD.fold(s)
 
     @staticmethod
     def _chunk_text(s: str, max_chars: int = _MAX_CHARS) -> List[Tuple[str, int]]:
-        """Devuelve [(chunk, start_index)] respetando finales de oración/línea."""
+        """
+        Devuelve [(chunk, start_index)] respetando finales de oración/línea.
+        Cada chunk es el tramo s[start_index:...] tal cual, sin unir ni recortar.
+        """
         if len(s) <= max_chars:
             return [(s, 0)]
-        parts = re.split(r"(?<=[\.\?\!\n])\s+", s)
-        chunks, buf, cur = [], [], 0
-        acc = 0
-        for p in parts:
-            if cur + len(p) + 1 > max_chars and buf:
-                chunk = " ".join(buf).strip()
-                start = acc - len(chunk)
-                chunks.append((chunk, start))
-                buf, cur = [p], len(p)
-            else:
-                buf.append(p); cur += len(p) + 1
-            acc += len(p) + 1
-        if buf:
-            chunk = " ".join(buf).strip()
-            start = acc - len(chunk)
-            chunks.append((chunk, start))
+        # (fin de la oración, inicio de la siguiente) para cada separador
+        bounds = [(m.start(), m.end()) for m in CedulaExtractorComprehend.RE_SENTENCE_END.finditer(s)]
+        bounds.append((len(s), len(s)))
+        chunks = []
+        chunk_start, chunk_end, sent_start = 0, None, 0
+        for sent_end, next_start in bounds:
+            if sent_end > sent_start:
+                if chunk_end is not None and sent_end - chunk_start > max_chars:
+                    chunks.append((s[chunk_start:chunk_end], chunk_start))
+                    chunk_start = sent_start
+                chunk_end = sent_end
+            sent_start = next_start
+        if chunk_end is not None:
+            chunks.append((s[chunk_start:chunk_end], chunk_start))
         return chunks
 
     @classmethod
@@ -53,7 +70,7 @@ class CedulaExtractorComprehend:
         found = []
         for m in cls.RE_CEDULA.finditer(text_norm):
             raw = m.group(0)
-            digits = re.sub(r"[^\d]", "", raw)
+            digits = cls.RE_NON_DIGIT.sub("", raw)
             if not (6 <= len(digits) <= 10):
                 continue
             # filtro por contexto: busca keywords 40 chars antes
@@ -72,6 +89,27 @@ class CedulaExtractorComprehend:
                 seen.add(d); ordered.append(d)
         return ordered
 
+    def _pii_candidates(self, client, chunk: str) -> List[str]:
+        """Cédulas dentro (o alrededor) de las entidades ID_NUMBER/NATIONAL_ID del chunk."""
+        found = []
+        resp = client.detect_pii_entities(Text=chunk, LanguageCode="es")
+        for ent in resp.get("Entities", []):
+            etype = ent.get("Type", "")
+            if etype not in ("ID_NUMBER", "NATIONAL_ID"):
+                continue
+            # Recorta el fragmento y busca patrón de cédula dentro
+            b = int(ent.get("BeginOffset", 0))
+            e = int(ent.get("EndOffset", 0))
+            frag = chunk[b:e]
+            # Escaneo por regex dentro del fragmento y también ventana extendida
+            around_start = max(0, b - 20)
+            around_end = min(len(chunk), e + 20)
+            for candidate in self.RE_CEDULA.findall(chunk[around_start:around_end] or frag):
+                digits = self.RE_NON_DIGIT.sub("", candidate)
+                if 6 <= len(digits) <= 10:
+                    found.append(digits)
+        return found
+
     def extract_cedulas(self, texto: str, region_name: str = "us-east-1") -> str:
         """
         Devuelve cédulas colombianas como string separado por coma. Si no hay: "".
@@ -88,26 +126,11 @@ class CedulaExtractorComprehend:
         used_comprehend = False
         if boto3 is not None:
             try:
-                client = boto3.client("comprehend", region_name=region_name)
+                client = self._get_client(region_name)
                 for chunk, base in self._chunk_text(text_norm):
                     if not chunk:
                         continue
-                    resp = client.detect_pii_entities(Text=chunk, LanguageCode="es")
-                    for ent in resp.get("Entities", []):
-                        etype = ent.get("Type", "")
-                        if etype not in ("ID_NUMBER", "NATIONAL_ID"):
-                            continue
-                        # Recorta el fragmento y busca patrón de cédula dentro
-                        b = int(ent.get("BeginOffset", 0))
-                        e = int(ent.get("EndOffset", 0))
-                        frag = chunk[b:e]
-                        # Escaneo por regex dentro del fragmento y también ventana extendida
-                        around_start = max(0, b - 20)
-                        around_end = min(len(chunk), e + 20)
-                        for candidate in self.RE_CEDULA.findall(chunk[around_start:around_end] or frag):
-                            digits = re.sub(r"[^\d]", "", candidate)
-                            if 6 <= len(digits) <= 10:
-                                cedulas.append(digits)
+                    cedulas.extend(self._pii_candidates(client, chunk))
                 used_comprehend = True
             except Exception as e:
                 # Si hay permisos/límites/otros errores, caemos a regex puro
@@ -123,6 +146,30 @@ class CedulaExtractorComprehend:
 
         return ", ".join(cedulas) if cedulas else ""
 
+    def _page_candidates(self, text_norm: str, region_name: str, pii_cache: Dict[str, List[str]]) -> List[str]:
+        """Cédulas de una página normalizada: Comprehend reforzado con regex."""
+        page_cedulas = []
+
+        # --- 1) Intento con Comprehend ---
+        if boto3 is not None:
+            try:
+                client = self._get_client(region_name)
+                for chunk, base in self._chunk_text(text_norm):
+                    if not chunk:
+                        continue
+                    if chunk not in pii_cache:
+                        pii_cache[chunk] = self._pii_candidates(client, chunk)
+                    page_cedulas.extend(pii_cache[chunk])
+            except Exception as e:
+                # Si hay permisos/límites/otros errores, caemos a regex puro
+                pass
+
+        # --- 2) Fallback o refuerzo con regex puro ---
+        if not page_cedulas:
+            return self._regex_candidates(text_norm)
+        extra = self._regex_candidates(text_norm)
+        return list(dict.fromkeys(page_cedulas + extra))  # merge manteniendo orden
+
     def extract_cedulas_with_pages(self, pages_text: List[Tuple[str, int]], region_name: str = "us-east-1") -> List[Dict[str, Any]]:
         """
         Extrae números de cédula página por página y retorna un array JSON
@@ -131,55 +178,24 @@ class CedulaExtractorComprehend:
         if not pages_text:
             return []
 
-        cedulas_pages = {}  # {numero_cedula: [paginas]}
+        cedulas_pages = {}  # {numero_cedula: {paginas}}
+        # Páginas idénticas (formularios, anexos) y chunks repetidos entre
+        # páginas (encabezados, pies) se procesan una sola vez
+        page_cache: Dict[str, List[str]] = {}
+        pii_cache: Dict[str, List[str]] = {}
 
         for page_text, page_num in pages_text:
             if not page_text or not page_text.strip():
                 continue
 
             text_norm = self._normalize(page_text)
-            page_cedulas = []
-
-            # --- 1) Intento con Comprehend ---
-            if boto3 is not None:
-                try:
-                    client = boto3.client("comprehend", region_name=region_name)
-                    for chunk, base in self._chunk_text(text_norm):
-                        if not chunk:
-                            continue
-                        resp = client.detect_pii_entities(Text=chunk, LanguageCode="es")
-                        for ent in resp.get("Entities", []):
-                            etype = ent.get("Type", "")
-                            if etype not in ("ID_NUMBER", "NATIONAL_ID"):
-                                continue
-                            # Recorta el fragmento y busca patrón de cédula dentro
-                            b = int(ent.get("BeginOffset", 0))
-                            e = int(ent.get("EndOffset", 0))
-                            frag = chunk[b:e]
-                            # Escaneo por regex dentro del fragmento y también ventana extendida
-                            around_start = max(0, b - 20)
-                            around_end = min(len(chunk), e + 20)
-                            for candidate in self.RE_CEDULA.findall(chunk[around_start:around_end] or frag):
-                                digits = re.sub(r"[^\d]", "", candidate)
-                                if 6 <= len(digits) <= 10:
-                                    page_cedulas.append(digits)
-                except Exception as e:
-                    # Si hay permisos/límites/otros errores, caemos a regex puro
-                    pass
-
-            # --- 2) Fallback o refuerzo con regex puro ---
-            if not page_cedulas:
-                page_cedulas = self._regex_candidates(text_norm)
-            else:
-                extra = self._regex_candidates(text_norm)
-                page_cedulas = list(dict.fromkeys(page_cedulas + extra))  # merge manteniendo orden
+            page_cedulas = page_cache.get(text_norm)
+            if page_cedulas is None:
+                page_cedulas = page_cache[text_norm] = self._page_candidates(text_norm, region_name, pii_cache)
 
             # Agregar cédulas encontradas en esta página al diccionario
             for cedula in page_cedulas:
-                if cedula not in cedulas_pages:
-                    cedulas_pages[cedula] = []
-                if page_num not in cedulas_pages[cedula]:
-                    cedulas_pages[cedula].append(page_num)
+                cedulas_pages.setdefault(cedula, set()).add(page_num)
 
         # Convertir a la estructura final con páginas ordenadas
         cedulas_found = []
@@ -1,15 +1,14 @@
 import re
-import unicodedata
 from typing import List, Optional, Dict, Any, Tuple
 
 from config.constants import (
     CONNECTORS, INSTITUTION_NOISE, DISQUALIFY_TERMS, NON_NAME_COMMON,
-    BLACKLIST_PHRASES, BLACKLIST_REGEXES, BLACKLIST_TOKENS,
+    BLACKLIST_PHRASES, BLACKLIST_TOKENS, blacklist_search, normalize_phrase,
     RE_FIELD_LINE, RE_NAME_TOKENS, RE_CONTRA, RE_A_NOMBRE, RE_SENOR,
     RE_SLP, RE_SIG_PERSONAS, RE_NOMBRE_DEL_SENOR, RE_ACCIONANTE,
     RE_TUTELA_PROMOVIDA, RE_CONTRA_HEREDEROS, RE_MAYOR_IDENT,
-    PRE_CONTEXT_BLOCK, PRE_CONTEXT_AUTH, RE_NUM_LINE, RE_UPPER_TOKEN,
-    RE_GENERIC
+    PRE_CONTEXT_BLOCK, PRE_CONTEXT_AUTH, PRE_CONTEXT_LAST_CHARS, RE_NUM_LINE,
+    RE_UPPER_TOKEN, RE_GENERIC
 )
 from processors.text_utils import normalize_text
 
@@ -17,39 +16,46 @@ class NameExtractor:
     """
     Encapsula la lógica para extraer nombres de personas de un texto.
     """
+    # Patrones compilados una sola vez; se aplican por cada candidato y token
+    RE_SPACES = re.compile(r"\s+")
+    RE_SPACE_RUNS = re.compile(r"(\s+)")
+    RE_MULTI_SPACE = re.compile(r"\s{2,}")
+    RE_FRAG_PUNCT = re.compile(r"[\,;:]+")
+    RE_QEPD = re.compile(r"\(\s*q\.?\s*e\.?\s*p\.?\s*d\.?\s*\)", re.IGNORECASE)
+    RE_PERSON_TOKEN = re.compile(r"[A-Za-zÁÉÍÓÚÑÜáéíóúñü'``´\\-]{2,}")
+    RE_TRAILING_PUNCT = re.compile(r"[:;,\''`´.]+$")
+    RE_GERUND = re.compile(r"(?i)(ando|endo)$")
 
     def _norm_phrase(self, s: str) -> str:
-        s = "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
-        s = s.lower()
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
+        return normalize_phrase(s)
 
     def _contains_blacklisted_phrase(self, cand: str) -> bool:
         n = self._norm_phrase(cand)
         if n in BLACKLIST_PHRASES:
             return True
-        return any(rx.search(cand) for rx in BLACKLIST_REGEXES)
+        return blacklist_search(cand) is not None
 
     def smart_title(self, name: str) -> str:
-        parts = re.split(r"(\s+)", (name or "").strip().lower())
-        def fix(w: str) -> str:
-            return w if w in CONNECTORS else w.capitalize()
-        return "".join(fix(p) if p.strip() else p for p in parts)
+        # split con grupo alterna palabra/espacios: las palabras quedan en las
+        # posiciones pares y los espacios originales se conservan tal cual
+        parts = self.RE_SPACE_RUNS.split((name or "").strip().lower())
+        parts[::2] = [w if w in CONNECTORS else w.capitalize() for w in parts[::2]]
+        return "".join(parts)
 
     def clean_name_frag(self, s: str) -> str:
-        s = re.sub(r"[\,;:]+", " ", s or "")
-        s = re.sub(r"\s{2,}", " ", s)
-        s = re.sub(r"\(\s*q\.?\s*e\.?\s*p\.?\s*d\.?\s*\)", "", s, flags=re.IGNORECASE)
+        s = self.RE_FRAG_PUNCT.sub(" ", s or "")
+        s = self.RE_MULTI_SPACE.sub(" ", s)
+        s = self.RE_QEPD.sub("", s)
         return s.strip(" .,'``´-").strip()
 
     def plausible_person(self, name: str) -> bool:
-        toks = [t for t in name.split() if re.fullmatch(r"[A-Za-zÁÉÍÓÚÑÜáéíóúñü'``´\\-]{2,}", t)]
+        toks = [t for t in name.split() if self.RE_PERSON_TOKEN.fullmatch(t)]
         if len(toks) < 2:
             return False
         if toks[0].lower() in CONNECTORS or toks[-1].lower() in CONNECTORS:
             return False
         uppers = {t.upper() for t in toks}
-        if (uppers & INSTITUTION_NOISE) or (uppers & DISQUALIFY_TERMS):
+        if not (INSTITUTION_NOISE.isdisjoint(uppers) and DISQUALIFY_TERMS.isdisjoint(uppers)):
             return False
         return True
 
@@ -70,7 +76,7 @@ class NameExtractor:
             a2 = current["Segundo Apellido"].strip()
             parts = [n1, n2, a1, a2]
             full = " ".join(p for p in parts if p)
-            return self.smart_title(re.sub(r"\s{2,}"," ", full).strip()) if full else ""
+            return self.smart_title(self.RE_MULTI_SPACE.sub(" ", full).strip()) if full else ""
 
         i = 0
         while i < len(lines):
@@ -108,9 +114,15 @@ class NameExtractor:
                 seen.add(k); clean.append(n)
         return clean
 
+    def _context_before(self, text: str, start_idx: int) -> str:
+        # Los 100 caracteres previos sin el espacio final, o "" si su última
+        # letra no puede cerrar PRE_CONTEXT_*; así se evita probar la regex
+        pre = text[max(0, start_idx-100):start_idx].rstrip()
+        return pre if pre and pre[-1] in PRE_CONTEXT_LAST_CHARS else ""
+
     def _is_authority_context(self, text: str, start_idx: int) -> bool:
-        pre = text[max(0, start_idx-100):start_idx]
-        return PRE_CONTEXT_AUTH.search(pre) is not None
+        pre = self._context_before(text, start_idx)
+        return bool(pre) and PRE_CONTEXT_AUTH.search(pre) is not None
 
     def _extract_blocks_after_numbers(self, text: str, window_lines: int = 8) -> List[str]:
         lines = text.splitlines()
@@ -119,7 +131,7 @@ class NameExtractor:
         for i in idxs:
             block = []
             for j in range(i+1, min(i+1+window_lines, len(lines))):
-                tok = re.sub(r"[:;,\''`´.]+$", "", lines[j].strip().upper())
+                tok = self.RE_TRAILING_PUNCT.sub("", lines[j].strip().upper())
                 if not tok:
                     continue
                 if RE_NUM_LINE.search(tok):
@@ -145,21 +157,22 @@ class NameExtractor:
                 continue
 
             start = m.start()
-            pre = text[max(0, start-100):start]
-            if PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre):
+            pre = self._context_before(text, start)
+            if pre and (PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre)):
                 continue
 
             uppers = {t.upper().strip(".,;:") for t in tokens}
-            if uppers & (INSTITUTION_NOISE | DISQUALIFY_TERMS | NON_NAME_COMMON):
+            if not (INSTITUTION_NOISE.isdisjoint(uppers) and DISQUALIFY_TERMS.isdisjoint(uppers)
+                    and NON_NAME_COMMON.isdisjoint(uppers)):
                 continue
 
             if self._contains_blacklisted_phrase(cand):
                 continue
 
-            if any(tok in BLACKLIST_TOKENS for tok in uppers):
+            if not BLACKLIST_TOKENS.isdisjoint(uppers):
                 continue
 
-            if any(re.search(r"(?i)(ando|endo)$", t) for t in tokens):
+            if any(self.RE_GERUND.search(t) for t in tokens):
                 continue
 
             nm = self.smart_title(cand)
@@ -195,7 +208,7 @@ class NameExtractor:
         def _push(pos: int, cand: str):
             nm = self.smart_title(self.clean_name_frag(cand))
             if self.plausible_person(nm):
-                key = re.sub(r"\s+", " ", nm.lower()).strip()
+                key = self.RE_SPACES.sub(" ", nm.lower()).strip()
                 if key and key not in seen:
                     seen.add(key)
                     found.append((pos, nm))
@@ -215,8 +228,8 @@ class NameExtractor:
         # 2) Fallback genérico
         for mg in RE_GENERIC.finditer(t):
             start = mg.start()
-            pre = t[max(0, start-100):start]
-            if PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre):
+            pre = self._context_before(t, start)
+            if pre and (PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre)):
                 continue
             raw = self.clean_name_frag(mg.group(0))
             toks = [tok for tok in raw.split() if tok.lower() not in CONNECTORS]
@@ -224,28 +237,30 @@ class NameExtractor:
                 continue
 
             uppers = {tok.upper().strip(".,;:") for tok in toks}
-            if uppers & (INSTITUTION_NOISE | DISQUALIFY_TERMS | NON_NAME_COMMON):
+            if not (INSTITUTION_NOISE.isdisjoint(uppers) and DISQUALIFY_TERMS.isdisjoint(uppers)
+                    and NON_NAME_COMMON.isdisjoint(uppers)):
                 continue
             
             if self._contains_blacklisted_phrase(raw):
                 continue
-            if any(tok in BLACKLIST_TOKENS for tok in uppers):
+            if not BLACKLIST_TOKENS.isdisjoint(uppers):
                 continue
-            if any(re.search(r"(?i)(ando|endo)$", tok) for tok in toks):
+            if any(self.RE_GERUND.search(tok) for tok in toks):
                 continue
 
             _push(start, raw)
 
         # 3) Campos "Primer/Segundo …"
+        t_lower = t.lower()
         for idx, nm in enumerate(self._extract_by_field_lines_robusto(t)):
-            pos = t.lower().find(nm.lower())
+            pos = t_lower.find(nm.lower())
             if pos < 0:
                 pos = 10**9 + idx
             _push(pos, nm)
 
         # 4) Bloques después de números
         for idx, nm in enumerate(self._extract_blocks_after_numbers(t)):
-            pos = t.lower().find(nm.lower())
+            pos = t_lower.find(nm.lower())
             if pos < 0:
                 pos = 2*(10**9) + idx
             _push(pos, nm)
@@ -273,7 +288,7 @@ class NameExtractor:
             def _add_name(cand: str):
                 nm = self.smart_title(self.clean_name_frag(cand))
                 if self.plausible_person(nm):
-                    key = re.sub(r"\s+", " ", nm.lower()).strip()
+                    key = self.RE_SPACES.sub(" ", nm.lower()).strip()
                     if key and key not in seen_on_page:
                         seen_on_page.add(key)
                         if nm not in names_pages:
@@ -296,8 +311,8 @@ class NameExtractor:
             # 2) Fallback genérico
             for mg in RE_GENERIC.finditer(t):
                 start = mg.start()
-                pre = t[max(0, start-100):start]
-                if PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre):
+                pre = self._context_before(t, start)
+                if pre and (PRE_CONTEXT_BLOCK.search(pre) or PRE_CONTEXT_AUTH.search(pre)):
                     continue
                 raw = self.clean_name_frag(mg.group(0))
                 toks = [tok for tok in raw.split() if tok.lower() not in CONNECTORS]
@@ -305,14 +320,15 @@ class NameExtractor:
                     continue
 
                 uppers = {tok.upper().strip(".,;:") for tok in toks}
-                if uppers & (INSTITUTION_NOISE | DISQUALIFY_TERMS | NON_NAME_COMMON):
+                if not (INSTITUTION_NOISE.isdisjoint(uppers) and DISQUALIFY_TERMS.isdisjoint(uppers)
+                        and NON_NAME_COMMON.isdisjoint(uppers)):
                     continue
 
                 if self._contains_blacklisted_phrase(raw):
                     continue
-                if any(tok in BLACKLIST_TOKENS for tok in uppers):
+                if not BLACKLIST_TOKENS.isdisjoint(uppers):
                     continue
-                if any(re.search(r"(?i)(ando|endo)$", tok) for tok in toks):
+                if any(self.RE_GERUND.search(tok) for tok in toks):
                     continue
 
                 _add_name(raw)
@@ -1,7 +1,7 @@
 import boto3
 import os
 import re
-import unicodedata
+from functools import lru_cache
 from typing import Iterable, Optional, List, Dict, Any, Tuple
 
 from config.constants import (
@@ -11,15 +11,37 @@ from config.constants import (
     FRASES_PROHIBIDAS,
     HEADERS_BLACKLIST,
     LANG,
+    NAME_SCAN,
     PHRASES_BLACKLIST,
     SOFT_SPLIT,
     THRESHOLD,
-    TITLE_PAT,
-    UPPER_PAT,
+    literal_alternation,
+    strip_accents,
 )
 
 
+@lru_cache(maxsize=64)
+def _field_regex(label: str) -> re.Pattern:
+    # Las etiquetas de campo son pocas y se repiten en cada documento
+    return re.compile(rf"{label}\s*:?\s*(?:\n|\r\n)?\s*([^\n\r]+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=8)
+def _phrases_regex(phrases: tuple) -> re.Pattern:
+    # Una sola pasada por el texto para todas las frases, compilada una vez por lista
+    return literal_alternation(phrases)
+
+
 class NameExtractorComprehend:
+    # Patrones compilados una sola vez; estos métodos se llaman por cada token/candidato
+    RE_ZERO_WIDTH = re.compile(r"[\u200B\u200C\u200D\uFEFF]")
+    RE_SPACES = re.compile(r"\s+")
+    RE_MULTI_SPACE = re.compile(r"\s{2,}")
+    RE_TOKEN = re.compile(r"[A-Za-zÁÉÍÓÚÑÜáéíóúñü][A-Za-zÁÉÍÓÚÑÜáéíóúñü''\-\.]*")
+    RE_NON_ALPHA = re.compile(r"[^a-z\s]")
+    RE_LINE_BREAKS = re.compile(r"[\r\n]+")
+    RE_UPPER_RUN = re.compile(r"\b([A-ZÁÉÍÓÚÑÜ]{2,}(?:\s+[A-ZÁÉÍÓÚÑÜ]{2,}){1,5})\b")
+
     def __init__(self):
         self.client = boto3.client("comprehend", region_name=os.getenv("AWS_REGION", "us-east-1"))
 
@@ -42,10 +64,10 @@ class NameExtractorComprehend:
 
     def _sanitize(self, s: str) -> str:
         s = s.replace("\xa0", " ")
-        s = re.sub(r"[\u200B\u200C\u200D\uFEFF]", "", s)
-        s = re.sub(r"\s+", " ", s)
+        s = self.RE_ZERO_WIDTH.sub("", s)
+        s = self.RE_SPACES.sub(" ", s)
         s = s.strip().strip(",;:()[]{}<>""''\"'|/\\")
-        s = re.sub(r"\s{2,}", " ", s)
+        s = self.RE_MULTI_SPACE.sub(" ", s)
         return s
 
     def _valid_token(self, tok: str) -> bool:
@@ -55,7 +77,7 @@ class NameExtractorComprehend:
             return False
         if len(tok) <= 2 and tok.lower() not in ALLOWED_PARTICLES:
             return False
-        if not re.fullmatch(r"[A-Za-zÁÉÍÓÚÑÜáéíóúñü][A-Za-zÁÉÍÓÚÑÜáéíóúñü''\-\.]*", tok):
+        if not self.RE_TOKEN.fullmatch(tok):
             return False
         return True
 
@@ -64,15 +86,15 @@ class NameExtractorComprehend:
             return False
         name = self._sanitize(name)
         low = name.lower()
-        if any(p in low for p in PHRASES_BLACKLIST):
+        if _phrases_regex(tuple(PHRASES_BLACKLIST)).search(low):
             return False
 
-        tokens = re.split(r"\s+", name)
+        tokens = self.RE_SPACES.split(name)
         if len(tokens) < 2:
             return False
         if tokens[0].upper() in HEADERS_BLACKLIST:
             return False
-        if any(t.lower() in DEMONYM_STOPWORDS for t in tokens):
+        if not DEMONYM_STOPWORDS.isdisjoint(map(str.lower, tokens)):
             return False
 
         if any(not self._valid_token(t) for t in tokens):
@@ -84,11 +106,10 @@ class NameExtractorComprehend:
 
     def _context_forbidden(self, prefix: str) -> bool:
         low = prefix.lower()
-        return any(frase in low for frase in FRASES_PROHIBIDAS)
+        return _phrases_regex(tuple(FRASES_PROHIBIDAS)).search(low) is not None
 
     def _grab_field(self, text: str, label: str) -> Optional[str]:
-        pattern = rf"{label}\s*:?\s*(?:\n|\r\n)?\s*([^\n\r]+)"
-        m = re.search(pattern, text, flags=re.IGNORECASE)
+        m = _field_regex(label).search(text)
         if not m:
             return None
         val = self._sanitize(m.group(1))
@@ -115,8 +136,7 @@ class NameExtractorComprehend:
         return None
 
     def _regex_fallback(self, text: str) -> Optional[str]:
-        patron = re.compile(r"\b([A-ZÁÉÍÓÚÑÜ]{2,}(?:\s+[A-ZÁÉÍÓÚÑÜ]{2,}){1,5})\b")
-        for m in patron.finditer(text):
+        for m in self.RE_UPPER_RUN.finditer(text):
             cand = self._sanitize(m.group(1))
             if not self._looks_like_person(cand):
                 continue
@@ -164,22 +184,30 @@ class NameExtractorComprehend:
         return None
 
     def _norm_key(self, s: str) -> str:
-        s = self._sanitize(s).lower()
-        s = unicodedata.normalize("NFKD", s)
-        s = "".join(ch for ch in s if not unicodedata.combining(ch))
-        s = re.sub(r"[^a-z\s]", " ", s)
-        return re.sub(r"\s+", " ", s).strip()
+        s = strip_accents(self._sanitize(s).lower())
+        s = self.RE_NON_ALPHA.sub(" ", s)
+        return self.RE_SPACES.sub(" ", s).strip()
+
+    def _scan_name_spans(self, text: str) -> Iterable[re.Match]:
+        """Un solo barrido con NAME_SCAN; entrega primero los tramos en
+        mayúsculas y luego los de tipo título, en el orden de siempre."""
+        titles = []
+        for m in NAME_SCAN.finditer(text):
+            if m.lastgroup == "upper":
+                yield m
+            else:
+                titles.append(m)
+        yield from titles
 
     def _extract_people_from_fragment(self, s: str) -> list[str]:
         cands = []
         if not s:
             return cands
-        for line in re.split(r"[\r\n]+", s):
-            for pat in (UPPER_PAT, TITLE_PAT):
-                for m in pat.finditer(line):
-                    cand = self._sanitize(m.group(1))
-                    if self._looks_like_person(cand):
-                        cands.append(cand)
+        for line in self.RE_LINE_BREAKS.split(s):
+            for m in self._scan_name_spans(line):
+                cand = self._sanitize(m.group())
+                if self._looks_like_person(cand):
+                    cands.append(cand)
             cand_line = self._sanitize(line)
             if self._looks_like_person(cand_line):
                 cands.append(cand_line)
@@ -229,15 +257,8 @@ class NameExtractorComprehend:
                 pass
 
         if use_regex_fallback:
-            for m in UPPER_PAT.finditer(text):
-                span = m.group(1)
-                ctx = text[max(0, m.start() - 80) : m.start()]
-                if self._context_forbidden(ctx):
-                    continue
-                for cand in self._extract_people_from_fragment(span):
-                    _push(cand)
-            for m in TITLE_PAT.finditer(text):
-                span = m.group(1)
+            for m in self._scan_name_spans(text):
+                span = m.group()
                 ctx = text[max(0, m.start() - 80) : m.start()]
                 if self._context_forbidden(ctx):
                     continue
@@ -308,15 +329,8 @@ class NameExtractorComprehend:
 
             # 3) Fallback con regex si está habilitado
             if use_regex_fallback:
-                for m in UPPER_PAT.finditer(page_text):
-                    span = m.group(1)
-                    ctx = page_text[max(0, m.start() - 80) : m.start()]
-                    if self._context_forbidden(ctx):
-                        continue
-                    for cand in self._extract_people_from_fragment(span):
-                        _add_name(cand)
-                for m in TITLE_PAT.finditer(page_text):
-                    span = m.group(1)
+                for m in self._scan_name_spans(page_text):
+                    span = m.group()
                     ctx = page_text[max(0, m.start() - 80) : m.start()]
                     if self._context_forbidden(ctx):
                         continue
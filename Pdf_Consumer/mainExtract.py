@@ -85,6 +85,7 @@ def main():
     try:
         # 1. Cargar configuración
         log.info("Cargando configuración...")
+        # Instancia propia: forzar TEST_MODE no debe afectar a get_config()
         config = Config()
         
         # Forzar modo test para procesar solo localmente
@@ -3,7 +3,9 @@ import json
 import gzip
 import base64
 import uuid
+import hashlib
 import logging
+from collections import OrderedDict
 from pathlib import Path
 
 from extractors import (
@@ -20,6 +22,11 @@ from processors import DocumentProcessor, summarize_text, sanitize_for_json
 
 log = logging.getLogger(__name__)
 
+# PDFs recientes cuyas cédulas se recuerdan por hash del archivo: el mismo
+# adjunto llega a menudo en varios correos y así no se repite la extracción
+# (ni las llamadas a Comprehend)
+CEDULAS_CACHE_SIZE = 256
+
 class RabbitMQConsumer:
     def __init__(
             self, config: Config, aws_service: AWSServiceS3, doc_processor: DocumentProcessor, 
@@ -39,6 +46,7 @@ class RabbitMQConsumer:
         self.summarize_text_extractor = summarize_text_extractor
         self.connection = None
         self.channel = None
+        self._cedulas_cache = OrderedDict()  # {sha1 del PDF: (cedulas_with_pages, documents)}
 
     def _decode_pdf_from_message(self, msg: dict) -> bytes | None:
         # Nuevo formato: procesar lista de rutas de PDFs
@@ -98,6 +106,39 @@ class RabbitMQConsumer:
 
         return None
 
+    def _extract_cedulas(self, pdf_bytes: bytes, pages_text, content: str):
+        """
+        Cédulas por página y lista plana ("documents") de un PDF.
+
+        El resultado se guarda por hash del archivo (LRU de CEDULAS_CACHE_SIZE
+        entradas): un PDF ya visto no vuelve a pasar por los extractores.
+        """
+        key = hashlib.sha1(pdf_bytes).hexdigest()
+        cached = self._cedulas_cache.get(key)
+        if cached is not None:
+            self._cedulas_cache.move_to_end(key)
+            return cached
+
+        cedulas_with_pages = []
+        if pages_text:
+            cedulas_with_pages = self.cedula_extractor.find_cedulas_with_pages(pages_text)
+            if not cedulas_with_pages:
+                cedulas_with_pages = self.cedula_extractor_comprehend.extract_cedulas_with_pages(pages_text)
+
+        # Mantener compatibilidad con el formato anterior
+        documents = ",".join([cedula["number"] for cedula in cedulas_with_pages]) if cedulas_with_pages else ""
+
+        # Si no se encontraron cédulas con la nueva función, usar el método anterior
+        if not documents:
+            documents = self.cedula_extractor.find_cedulas(content)
+            if not documents:
+                documents = self.cedula_extractor_comprehend.extract_cedulas(content)
+
+        self._cedulas_cache[key] = (cedulas_with_pages, documents)
+        if len(self._cedulas_cache) > CEDULAS_CACHE_SIZE:
+            self._cedulas_cache.popitem(last=False)
+        return cedulas_with_pages, documents
+
     def on_message(self, ch, method, properties, body):
         try:
             msg = json.loads(body.decode("utf-8"))
@@ -151,11 +192,7 @@ class RabbitMQConsumer:
                     continue
 
                 # Extraer cédulas con información de página (nueva funcionalidad)
-                cedulas_with_pages = []
-                if pages_text:
-                    cedulas_with_pages = self.cedula_extractor.find_cedulas_with_pages(pages_text)
-                    if not cedulas_with_pages:
-                        cedulas_with_pages = self.cedula_extractor_comprehend.extract_cedulas_with_pages(pages_text)
+                cedulas_with_pages, documents = self._extract_cedulas(pdf_bytes, pages_text, content)
 
                 # Extraer nombres con información de página (nueva funcionalidad)
                 names_with_pages = []
@@ -164,15 +201,6 @@ class RabbitMQConsumer:
                     if not names_with_pages:
                         names_with_pages = self.name_extractor_comprehend.extract_names_with_pages(pages_text)
 
-                # Mantener compatibilidad con el formato anterior
-                documents = ",".join([cedula["number"] for cedula in cedulas_with_pages]) if cedulas_with_pages else ""
-
-                # Si no se encontraron cédulas con la nueva función, usar el método anterior
-                if not documents:
-                    documents = self.cedula_extractor.find_cedulas(content)
-                    if not documents:
-                        documents = self.cedula_extractor_comprehend.extract_cedulas(content)
-
                 # Mantener compatibilidad con el formato anterior para nombres
                 names = ",".join([name["name"] for name in names_with_pages]) if names_with_pages else ""
 
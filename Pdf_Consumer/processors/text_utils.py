@@ -18,6 +18,21 @@ class SimpleTokenizer:
     def to_words(self, sentence: str) -> List[str]:
         return SUMMARY_WORD_RE.findall(sentence or "")
 
+# Tabla y patrones de normalize_text, construidos una sola vez
+_QUOTES_TABLE = str.maketrans({"«": '"', "»": '"', "“": '"', "”": '"', "‘": "'", "’": "'"})
+_OCR_FIXES = [
+    (re.compile(pat, re.IGNORECASE), rep) for pat, rep in (
+        (r"\bSefior(?:a)?\b", "señor"),
+        (r"\bSenor(?:a)?\b", "señor"),
+        (r"\bSeñora\b", "señora"),
+        (r"\bSefior\.\b", "señor."),
+        (r"\bSefiora\.\b", "señora."),
+    )
+]
+_HYPHEN_BREAK_RE = re.compile(r"-\s*\n\s*")
+_BLANKS_RE = re.compile(r"[ \t]+")
+_EXTRA_NEWLINES_RE = re.compile(r"\n{3,}")
+
 def normalize_text(t: str) -> str:
     """Limpia y normaliza el texto extraído de los PDFs."""
     t = (t or "")
@@ -25,21 +40,14 @@ def normalize_text(t: str) -> str:
     t = t.replace("ﬁ", "fi").replace("ﬂ", "fl")
     t = t.replace("\u00A0", " ").replace("\u200B", "")
     t = t.replace("®", " ")
-    t = t.translate(str.maketrans({"«": '"', "»": '"', "“": '"', "”": '"', "‘": "'", "’": "'"}))
+    t = t.translate(_QUOTES_TABLE)
     
-    ocr_fixes = {
-        r"\bSefior(?:a)?\b": "señor",
-        r"\bSenor(?:a)?\b": "señor",
-        r"\bSeñora\b": "señora",
-        r"\bSefior\.\b": "señor.",
-        r"\bSefiora\.\b": "señora.",
-    }
-    for pat, rep in ocr_fixes.items():
-        t = re.sub(pat, rep, t, flags=re.IGNORECASE)
+    for rx, rep in _OCR_FIXES:
+        t = rx.sub(rep, t)
     
-    t = re.sub(r"-\s*\n\s*", "", t)
-    t = re.sub(r"[ \t]+", " ", t)
-    t = re.sub(r"\n{3,}", "\n\n", t)
+    t = _HYPHEN_BREAK_RE.sub("", t)
+    t = _BLANKS_RE.sub(" ", t)
+    t = _EXTRA_NEWLINES_RE.sub("\n\n", t)
     return t.strip()
 
 def summarize_text(text: str, sentence_count: int = 5) -> str:
@@ -4,7 +4,9 @@ Pruebas unitarias para la configuración - VERSIÓN ACTUALIZADA
 import unittest
 from unittest.mock import patch, MagicMock
 import os
+import re
 import sys
+from pathlib import Path
 
 # Agregar el directorio del proyecto al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -75,6 +77,118 @@ class TestConfig(unittest.TestCase):
         except ImportError:
             self.skipTest("Config module not available")
 
+class TestGetConfig(unittest.TestCase):
+    """Pruebas para get_config y las rutas por defecto de Config"""
+
+    def setUp(self):
+        try:
+            from config.config import get_config
+        except ImportError:
+            self.skipTest("Config module not available")
+        self.get_config = get_config
+        get_config.cache_clear()
+        self.addCleanup(get_config.cache_clear)
+
+    @patch.dict(os.environ, {'TEST_MODE': 'true', 'QUEUE_NAME': 'q1'})
+    def test_get_config_is_memoized(self):
+        """Prueba que get_config construye la configuración una sola vez"""
+        config = self.get_config()
+        self.assertIs(self.get_config(), config)
+
+        # Sin cache_clear() los cambios de entorno no se vuelven a leer
+        with patch.dict(os.environ, {'QUEUE_NAME': 'q2'}):
+            self.assertEqual(self.get_config().QUEUE_NAME, 'q1')
+            self.get_config.cache_clear()
+            self.assertEqual(self.get_config().QUEUE_NAME, 'q2')
+
+    @patch.dict(os.environ, {'TEST_MODE': 'true'}, clear=True)
+    def test_pdf_input_path_follows_cwd(self):
+        """Prueba que la ruta de robot001_attachments por defecto depende del cwd, como en Docker (/app)"""
+        from config.config import Config
+        cases = (
+            (Path('/app'), Path('/app/robot001_attachments')),
+            (Path('/src/fw-final'), Path('/src/fw-final/robot001_attachments')),
+            (Path('/src/fw-final/Pdf_Consumer'), Path('/src/fw-final/robot001_attachments')),
+        )
+        for cwd, expected in cases:
+            with patch('config.config.Path.cwd', return_value=cwd):
+                self.assertEqual(Config().PDF_INPUT_PATH, expected, cwd)
+
+        with patch.dict(os.environ, {'PDF_INPUT_PATH': '/data/pdfs'}), \
+                patch('config.config.Path.cwd') as cwd:
+            self.assertEqual(Config().PDF_INPUT_PATH, Path('/data/pdfs'))
+            cwd.assert_not_called()
+
+class TestProfiles(unittest.TestCase):
+    """Pruebas de los perfiles de PDF_CONSUMER_PROFILE sobre DEFAULTS"""
+
+    def setUp(self):
+        try:
+            from config.config import Config, DEFAULTS, DEFAULT_PROFILE, PROFILES
+        except ImportError:
+            self.skipTest("Config module not available")
+        self.Config = Config
+        self.DEFAULTS = DEFAULTS
+        self.DEFAULT_PROFILE = DEFAULT_PROFILE
+        self.PROFILES = PROFILES
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_default_profile_is_dev(self):
+        """Prueba que sin PDF_CONSUMER_PROFILE se usa el perfil dev, que fuerza el modo test"""
+        config = self.Config()
+        self.assertEqual(self.DEFAULT_PROFILE, 'dev')
+        self.assertEqual(config.PROFILE, 'dev')
+        self.assertTrue(config.TEST_MODE)
+        self.assertEqual(config.S3_BUCKET, self.PROFILES['dev']['S3_BUCKET'])
+        self.assertEqual(config.QUEUE_NAME, self.DEFAULTS['QUEUE_NAME'])
+        self.assertEqual(config.PREFETCH, int(self.DEFAULTS['PREFETCH']))
+
+    def test_dev_and_prod_selection(self):
+        """Prueba que dev ignora TEST_MODE=false y prod lo respeta (sin distinguir mayúsculas)"""
+        env = {'TEST_MODE': 'false', 'S3_BUCKET': 'bucket-real'}
+        with patch.dict(os.environ, dict(env, PDF_CONSUMER_PROFILE='dev'), clear=True):
+            self.assertTrue(self.Config().TEST_MODE)
+        with patch.dict(os.environ, dict(env, PDF_CONSUMER_PROFILE='PROD'), clear=True):
+            config = self.Config()
+            self.assertEqual(config.PROFILE, 'prod')
+            self.assertFalse(config.TEST_MODE)
+            self.assertEqual(config.PDF_INPUT_PATH, Path('./input_pdfs'))
+        with patch.dict(os.environ, {'PDF_CONSUMER_PROFILE': 'prod', 'TEST_MODE': 'true'}, clear=True):
+            config = self.Config()
+            self.assertTrue(config.TEST_MODE)
+            self.assertIsNone(config.S3_BUCKET)
+
+    @patch.dict(os.environ, {'PDF_CONSUMER_PROFILE': 'staging'}, clear=True)
+    def test_unknown_profile_raises(self):
+        """Prueba que un perfil desconocido lanza RuntimeError"""
+        with self.assertRaisesRegex(RuntimeError, 'staging'):
+            self.Config()
+
+    def test_prod_requires_s3_bucket(self):
+        """Prueba que prod fuera de modo test exige S3_BUCKET (vacío cuenta como ausente)"""
+        for env in ({'PDF_CONSUMER_PROFILE': 'prod'},
+                    {'PDF_CONSUMER_PROFILE': 'prod', 'TEST_MODE': 'false', 'S3_BUCKET': ''}):
+            with patch.dict(os.environ, env, clear=True):
+                with self.assertRaisesRegex(RuntimeError, 'S3_BUCKET'):
+                    self.Config()
+
+    @patch.dict(os.environ, {
+        'PDF_CONSUMER_PROFILE': 'dev',
+        'S3_BUCKET': 'otro-bucket',
+        'QUEUE_NAME': 'cola-propia',
+        'PREFETCH': '3',
+        'ON_MISSING_FILE': 'ACK',
+        'AWS_REGION': 'eu-west-1',
+    }, clear=True)
+    def test_env_overrides_profile_and_defaults(self):
+        """Prueba que las variables de entorno tienen prioridad sobre el perfil y DEFAULTS"""
+        config = self.Config()
+        self.assertEqual(config.S3_BUCKET, 'otro-bucket')
+        self.assertEqual(config.QUEUE_NAME, 'cola-propia')
+        self.assertEqual(config.PREFETCH, 3)
+        self.assertEqual(config.ON_MISSING, 'ack')
+        self.assertEqual(config.AWS_REGION, 'eu-west-1')
+
 class TestConstants(unittest.TestCase):
     """Pruebas para las constantes"""
 
@@ -82,8 +196,8 @@ class TestConstants(unittest.TestCase):
         """Prueba que las constantes se pueden importar"""
         try:
             from config.constants import CONNECTORS, BLACKLIST_PHRASES
-            self.assertIsInstance(CONNECTORS, (list, set, tuple))
-            self.assertIsInstance(BLACKLIST_PHRASES, (list, set, tuple))
+            self.assertIsInstance(CONNECTORS, (list, set, frozenset, tuple))
+            self.assertIsInstance(BLACKLIST_PHRASES, (list, set, frozenset, tuple))
         except ImportError:
             self.skipTest("Constants module not available")
 
@@ -96,5 +210,121 @@ class TestConstants(unittest.TestCase):
         except ImportError:
             self.skipTest("Constants module not available")
 
+    def test_blacklist_union_matches_individual_regexes(self):
+        """Prueba que blacklist_search coincide igual que recorrer blacklist_regexes()"""
+        try:
+            from config.constants import blacklist_regexes, blacklist_search
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        textos = [
+            "Juzgado Segundo Penal del Circuito",
+            "Olaya Herrera, Medellín",
+            "NOMBRES JUAN APELLIDOS PEREZ",
+            "Notaría Primera del Círculo de Bogotá",
+            "María Fernanda Gómez",
+            "Carlos Andrés Ruiz",
+            "ÍNDICE DERECHO",
+            "Pedro ok kk ok",
+            "Hechos primero",
+            "Ciudad de POPAYÁN",
+        ]
+        for texto in textos:
+            esperado = any(rx.search(texto) for rx in blacklist_regexes())
+            self.assertEqual(blacklist_search(texto) is not None, esperado, texto)
+
+        patrones = [rx.pattern for rx in blacklist_regexes()]
+        self.assertEqual(len(patrones), len(set(patrones)))
+
+    def test_name_scan_matches_upper_and_title(self):
+        """Prueba que NAME_SCAN encuentra lo mismo que UPPER_PAT y TITLE_PAT"""
+        try:
+            from config.constants import NAME_SCAN, TITLE_PAT, UPPER_PAT
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        texto = "Señor JUAN CARLOS PEREZ y María Fernanda Gómez, NIT AB 123\nPEDRO Luis Ruiz"
+        matches = list(NAME_SCAN.finditer(texto))
+        upper = [m.group() for m in matches if m.lastgroup == "upper"]
+        title = [m.group() for m in matches if m.lastgroup == "title"]
+        self.assertEqual(upper, [m.group(1) for m in UPPER_PAT.finditer(texto)])
+        self.assertEqual(title, [m.group(1) for m in TITLE_PAT.finditer(texto)])
+
+    def test_literal_alternation_matches_substrings(self):
+        """Prueba que literal_alternation equivale a buscar cada frase como subcadena"""
+        try:
+            from config.constants import FRASES_PROHIBIDAS, literal_alternation
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        patron = literal_alternation(FRASES_PROHIBIDAS)
+        textos = [
+            "auto proferido por el señor juez del circuito",
+            "juan carlos perez gomez",
+            "huella impresa del índice derecho",
+            "principal",
+            "",
+        ]
+        for texto in textos:
+            esperado = any(frase in texto for frase in FRASES_PROHIBIDAS)
+            self.assertEqual(patron.search(texto) is not None, esperado, texto)
+
+    def test_literal_alternation_empty_never_matches(self):
+        """Prueba que literal_alternation sin palabras no coincide con ningún texto"""
+        try:
+            from config.constants import literal_alternation
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        for palabras in ([], (), iter([])):
+            patron = literal_alternation(palabras)
+            for texto in ("auto proferido por el juez", "principal", ""):
+                self.assertIsNone(patron.search(texto), texto)
+        # Incrustado en otra alternancia tampoco coincide
+        self.assertIsNone(re.search(rf"\b(?:{literal_alternation([]).pattern})\b", "juez"))
+
+    def test_pre_context_last_chars_follow_words(self):
+        """Prueba que PRE_CONTEXT_LAST_CHARS cubre la última letra de cada palabra de PRE_CONTEXT_*"""
+        try:
+            from config.constants import (PRE_CONTEXT_AUTH, PRE_CONTEXT_AUTH_WORDS, PRE_CONTEXT_BLOCK,
+                                          PRE_CONTEXT_BLOCK_WORDS, PRE_CONTEXT_LAST_CHARS)
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        self.assertEqual(PRE_CONTEXT_LAST_CHARS, frozenset("aeorzAEORZ"))
+        for rx, palabras in ((PRE_CONTEXT_BLOCK, PRE_CONTEXT_BLOCK_WORDS),
+                             (PRE_CONTEXT_AUTH, PRE_CONTEXT_AUTH_WORDS)):
+            for palabra in palabras:
+                for texto in (palabra, palabra.upper(), "ante el " + palabra.replace(" ", " \n ") + "  "):
+                    self.assertIsNotNone(rx.search(texto), texto)
+                    self.assertIn(texto.rstrip()[-1], PRE_CONTEXT_LAST_CHARS, texto)
+
+    def test_cedula_rad_label_whitespace(self):
+        """Prueba CEDULA_RAD_LABEL con espacios entre etiqueta y número, y sin número"""
+        try:
+            from config.constants import CEDULA_RAD_LABEL
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        m = CEDULA_RAD_LABEL.search("radicado no. :\n  11001-31-03-001")
+        self.assertEqual(m.group(1), "11001-31-03-001")
+        m = CEDULA_RAD_LABEL.search("radicación num  - 2023 45 678")
+        self.assertEqual(m.group(1), "2023 45 678")
+        # Muchos espacios sin número: debe fallar sin retroceso polinómico
+        self.assertIsNone(CEDULA_RAD_LABEL.search("radicado" + " " * 5000 + "x"))
+
+    def test_accent_fold_table_fold_matches_translate(self):
+        """Prueba que AccentFoldTable.fold equivale a str.translate con la tabla"""
+        try:
+            from config.constants import AccentFoldTable
+        except ImportError:
+            self.skipTest("Constants module not available")
+
+        textos = ["", "Texto ASCII 123", "Cédula Nº 12.345.678 — Bogotá\u00A0D.C.", "ΑΣ ß ½ ﬁ\u200B"]
+        for extra in ({"\u200B": "", "\u00A0": " ", "—": "-"}, {"a": "4"}):
+            tabla = AccentFoldTable(extra)
+            for texto in textos:
+                self.assertEqual(tabla.fold(texto), texto.translate(AccentFoldTable(extra)), texto)
+
 if __name__ == '__main__':
     unittest.main()
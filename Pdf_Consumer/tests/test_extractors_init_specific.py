@@ -40,6 +40,39 @@ class TestExtractorsInitSpecific(unittest.TestCase):
         # Verificar que el módulo maneja el error correctamente
         self.assertTrue(hasattr(extractors, 'SummarizeTextExtractor'))
 
+    @staticmethod
+    def _restore(module, name, value):
+        """Deja el atributo del paquete como estaba antes de la prueba"""
+        vars(module).pop(name, None)
+        if value is not None:
+            setattr(module, name, value)
+
+    def test_failed_import_is_cached(self):
+        """Prueba que un extractor que no se puede importar se cachea como None y avisa una sola vez"""
+        import extractors
+        name = 'SummarizeTextExtractorComprehend'
+        self.addCleanup(self._restore, extractors, name, vars(extractors).pop(name, None))
+
+        with patch('extractors.import_module', side_effect=ImportError("sin boto3")) as mock_import, \
+                patch('builtins.print') as mock_print:
+            self.assertIsNone(extractors.SummarizeTextExtractorComprehend)
+            self.assertIsNone(extractors.SummarizeTextExtractorComprehend)
+            self.assertIsNone(getattr(extractors, name))
+
+        mock_import.assert_called_once()
+        mock_print.assert_called_once()
+        self.assertIn(name, vars(extractors))
+
+    def test_circular_import_is_not_cached(self):
+        """Prueba que un submódulo a medio importar no deja el extractor cacheado como None"""
+        import extractors
+        name = 'NameExtractorComprehend'
+        self.addCleanup(self._restore, extractors, name, vars(extractors).pop(name, None))
+
+        with patch('extractors.import_module', return_value=object()), patch('builtins.print'):
+            self.assertIsNone(extractors.NameExtractorComprehend)
+        self.assertNotIn(name, vars(extractors))
+
     def test_environment_variables_setup(self):
         """Prueba que las variables de entorno se configuran correctamente"""
         import extractors
@@ -158,6 +158,29 @@ Primer Apellido: Pérez"""
             result = self.extractor._is_authority_context("texto normal Juan Pérez", 20)
             self.assertFalse(result)
 
+    def test_context_before_matches_full_window(self):
+        """Prueba que _context_before no descarta contextos que PRE_CONTEXT_* aceptan"""
+        if not self.available:
+            self.skipTest("NameExtractor not available")
+
+        from config.constants import PRE_CONTEXT_AUTH, PRE_CONTEXT_BLOCK
+        textos = [
+            "ante el JUEZ \n Juan Pérez",
+            "por el señor magistrado   Juan Pérez",
+            "en calidad de apoderada de  María López",
+            "vive en la RANCHERÍA Pedro Ruiz",
+            "el poderdante Pedro Ruiz",
+            "el demandante Juan Pérez",
+            "Juan Pérez",
+        ]
+        for texto in textos:
+            start = texto.index(next(t for t in texto.split() if t in ("Juan", "María", "Pedro")))
+            ventana = texto[max(0, start-100):start]
+            pre = self.extractor._context_before(texto, start)
+            for rx in (PRE_CONTEXT_AUTH, PRE_CONTEXT_BLOCK):
+                self.assertEqual(bool(pre) and rx.search(pre) is not None,
+                                 rx.search(ventana) is not None, texto)
+
     def test_extract_blocks_after_numbers(self):
         """Prueba _extract_blocks_after_numbers con casos específicos"""
         if not self.available:
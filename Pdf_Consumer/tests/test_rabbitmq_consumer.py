@@ -281,5 +281,30 @@ class TestRabbitMQConsumer(unittest.TestCase):
         except ImportError:
             self.skipTest("RabbitMQConsumer module not available")
 
+    def test_extract_cedulas_cached_by_pdf_hash(self):
+        """Prueba que un PDF repetido reutiliza las cédulas ya extraídas"""
+        try:
+            from messaging.rabbitmq_consumer import RabbitMQConsumer
+        except ImportError:
+            self.skipTest("RabbitMQConsumer module not available")
+
+        cedula_extractor = MagicMock()
+        cedula_extractor.find_cedulas_with_pages.return_value = [
+            {"number": "12345678", "pagPdf": [1]}
+        ]
+        consumer = RabbitMQConsumer(
+            self.config, MagicMock(), MagicMock(), MagicMock(), cedula_extractor,
+            MagicMock(), MagicMock(), MagicMock(), MagicMock()
+        )
+        pages_text = [("Cédula 12345678", 1)]
+
+        primero = consumer._extract_cedulas(b"%PDF-1", pages_text, "Cédula 12345678")
+        segundo = consumer._extract_cedulas(b"%PDF-1", pages_text, "Cédula 12345678")
+        consumer._extract_cedulas(b"%PDF-2", pages_text, "Cédula 12345678")
+
+        self.assertEqual(primero, ([{"number": "12345678", "pagPdf": [1]}], "12345678"))
+        self.assertEqual(segundo, primero)
+        self.assertEqual(cedula_extractor.find_cedulas_with_pages.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
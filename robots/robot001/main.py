@@ -66,6 +66,7 @@ class Robot001:
         self.mail_reader = None
         self.attachment_downloader = None
         self.rabbitmq_sender = None
+        self.rabbitmq_publisher = None
         self.orchestrator = None
         self.is_running = False
         self.processed_messages = (
@@ -127,7 +128,7 @@ class Robot001:
                     get_authenticated_session,
                     validate_session,
                 )
-                from outlook.rabbitmq_sender import RabbitMQSender
+                from outlook.rabbitmq_sender import BackgroundPdfPublisher, RabbitMQSender
 
                 # Validar configuración de Mail_loop_tracking
                 validate_config()
@@ -159,6 +160,10 @@ class Robot001:
                 self.rabbitmq_sender = RabbitMQSender(rabbitmq_config)
                 logger.info("✅ Sender de RabbitMQ inicializado")
 
+                # Publicador en segundo plano (publisher confirms asíncronos)
+                self.rabbitmq_publisher = BackgroundPdfPublisher(rabbitmq_config)
+                logger.info("✅ Publicador de RabbitMQ en segundo plano inicializado")
+
             except ImportError as e:
                 logger.error(f"Error importando módulos de Mail_loop_tracking: {e}")
                 raise Exception("No se pudo importar el módulo Mail_loop_tracking")
@@ -240,7 +245,14 @@ class Robot001:
             logger.info("Deteniendo Robot001...")
             self.is_running = False
 
-            # Cerrar conexiones
+            # Cerrar conexiones (el publicador espera antes sus confirmaciones)
+            if self.rabbitmq_publisher:
+                self.rabbitmq_publisher.close(timeout=30)
+                logger.info(
+                    f"✅ Publicador RabbitMQ cerrado: {self.rabbitmq_publisher.confirmed} confirmados, "
+                    f"{self.rabbitmq_publisher.failed} fallidos"
+                )
+
             if self.rabbitmq_sender:
                 self.rabbitmq_sender.close()
                 logger.info("✅ Conexión RabbitMQ cerrada")
@@ -269,6 +281,7 @@ class Robot001:
                     "mail_reader": self.mail_reader is not None,
                     "attachment_downloader": self.attachment_downloader is not None,
                     "rabbitmq_sender": self.rabbitmq_sender is not None,
+                    "rabbitmq_publisher": self.rabbitmq_publisher is not None,
                     "orchestrator": self.orchestrator is not None,
                 },
                 "processing_stats": {
@@ -342,7 +355,8 @@ class Robot001:
             elif command == "process_emails":
                 """Procesar correos y enviar PDFs a RabbitMQ"""
                 if not all(
-                    [self.mail_reader, self.attachment_downloader, self.rabbitmq_sender]
+                    [self.mail_reader, self.attachment_downloader, self.rabbitmq_sender,
+                     self.rabbitmq_publisher]
                 ):
                     raise ValueError("Componentes necesarios no disponibles")
 
@@ -789,26 +803,22 @@ class Robot001:
             return False
 
     def _send_custom_message_to_rabbitmq(self, message: Dict) -> bool:
-        """Enviar mensaje personalizado a RabbitMQ"""
+        """
+        Enviar mensaje personalizado a RabbitMQ
+        
+        Se encola en el publicador en segundo plano, que lo publica como
+        persistente y espera la confirmación del broker sin bloquear aquí.
+        Un error de la conexión de publicación aparece como RuntimeError.
+        """
         try:
-            import json
-            import pika
-            
-            # Convertir a JSON
-            message_json = json.dumps(message, ensure_ascii=False)
-            
             # Obtener configuración de RabbitMQ
             queue_name = self.robot_config["rabbitmq_config"].get("queue_name", "pdf_processing_queue")
             
             # Enviar mensaje
-            self.rabbitmq_sender.channel.basic_publish(
-                exchange='',
+            self.rabbitmq_publisher.publish_json(
+                message,
                 routing_key=queue_name,
-                body=message_json.encode('utf-8'),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Hacer el mensaje persistente
-                    content_type='application/json'
-                )
+                label=message.get('guid', 'mensaje')
             )
             
             # 🎯 LOGS SIMPLIFICADOS